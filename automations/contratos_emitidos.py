@@ -1,31 +1,10 @@
-"""
-AUTOMAÇÃO MODELO — OdontoClean
---------------------------------
-Template para criar novas automações no padrão unificado.
-Basta ajustar:
- - NOME_AUTOMACAO
- - ETL_CONFIG (tabela, colunas, etc)
- - XPATHs e descrições nas ações de navegação/download
-"""
-
-import sys
+"""Automação de Contratos Emitidos (Movimentações › Contratos), executada por `executar_relatorio`."""
 import os
-import time
-from functions import get_downloads_dir, log
+import sys
 
-# Garante acesso aos módulos
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from functions import (
-    iniciar_chrome,
-    interagir_elementos,
-    realizar_login_codonto,
-    snapshot_downloads,
-    aguardar_novo_download,
-    fechar_navegador_assincrono,
-)
-from etl.etl_manager import rodar_etl_generico
-
+from functions import executar_relatorio
 
 # =========================================================
 # ========== CONFIGURAÇÕES GERAIS ==========================
@@ -34,15 +13,12 @@ PROJETO = "api-para-sheets-433311"
 DATASET = "Dados_OdontoClean"
 TABELA = "Contratos_Emitidos"
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", ".."))
-DIRETORIO_DOWNLOADS = os.path.join(ROOT_DIR, "automacoes_codonto", "downloads")
-os.makedirs(DIRETORIO_DOWNLOADS, exist_ok=True)
+CREDENCIAIS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "GBOQ.json"))
+NOME_PADRAO_ARQUIVO = "Contratos"
 
-CREDENCIAIS_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), "..", "GBOQ.json")
-)
-NOME_PADRAO_ARQUIVO = "Contratos"  # exemplo: "ControleODONTO Pagamentos"
+# Endpoint do botão "Download em formato Excel" para exportação sem navegador
+# (formato em functions.py, seção EXPORTAÇÃO DIRETA VIA HTTP). None = só Selenium.
+EXPORT_HTTP = None
 
 # =========================================================
 # ========== CONFIGURAÇÃO DE ETL ===========================
@@ -54,78 +30,63 @@ ETL_CONFIG = {
     "etl_especifico": "contratos",  # ex: "pagamentos", "contratos"
     "use_etl_pos": "",
     # ======== Upload BigQuery ========
+    "projeto": PROJETO,
+    "dataset": DATASET,
     "tabela": TABELA,
     "coluna_validacao": "total_tratamento",  # ex: "valor_pago", "valor_contrato"
     "periodo_coluna": "emissao",          # ex: "data_pagamento", "data_contrato"
     "limpar_periodo": True,
+    # "upload": "merge",                  # opcional: staging + MERGE do período (functions.py, UPLOAD BIGQUERY)
+    "incremental": True,                  # busca só os dias desde o último upload verificado
+    "lookback_dias": 7,                   # ... mais esta janela, para pegar correções recentes
     # ======== Extras ========
-    "chaves_particao": [],
+    "chaves_particao": [],                # colunas de CLUSTER BY ao criar a tabela (até 4)
     "credenciais_path": CREDENCIAIS_PATH,
 }
 
 
+# =========================================================
+# ========== RELATÓRIO (NAVEGAÇÃO, FILTROS, EXPORTAÇÃO) ====
+# =========================================================
+RELATORIO = {
+    "nome": "Contratos",
+    # Abre Movimentações uma vez e recarrega a página antes do menu
+    "preparo": [
+        {"xpath": "//span[@class='icon fa fa-clock']", "descricao": "Ícone Relógio",
+         "esperar": [{"tipo": "aparecer", "xpath": "//span[@class='icon fa fa-archive']"}]},
+        {"xpath": "//span[@class='icon fa fa-archive']", "descricao": "Movimentacoes", "esperar": [{"tipo": "rede_ociosa"}]},
+    ],
+    "menu": [
+        {"xpath": "//span[@class='icon fa fa-clock']", "descricao": "Ícone Relógio",
+         "esperar": [{"tipo": "aparecer", "xpath": "//span[@class='icon fa fa-archive']"}]},
+        {"xpath": "//span[@class='icon fa fa-archive']", "descricao": "Movimentacoes", "esperar": [{"tipo": "rede_ociosa"}]},
+        {"xpath": "//a[@href='#maintabMovimentacao-contratos']", "descricao": "Contratos", "esperar": [{"tipo": "rede_ociosa"}]},
+    ],
+    "filtros": [
+        {"xpath": "//span[@title='Mostrar Período']", "n": 2, "descricao": "Mostrar Período",
+         "esperar": [{"tipo": "aparecer", "xpath": "//input[@name='ContratoDataInicio']"}]},
+        {"xpath": "//input[@name='ContratoDataInicio']", "acao": "digitar", "texto": "{data_inicio}", "descricao": "Data Início", "esperar": []},
+        {"xpath": "//input[@name='ContratoDataTermino']", "acao": "digitar", "texto": "{data_fim}", "descricao": "Data Fim", "esperar": []},
+        {"xpath": "//a[@id='Filtrar']", "n": 2, "descricao": "Botão Filtrar",
+         "esperar": [{"tipo": "rede_ociosa", "quieta_ms": 800}, {"tipo": "spinner"}]},
+    ],
+    "exportar": [
+        {"xpath": "//a[@title='Download em formato Excel']", "descricao": "Download Excel"},
+    ],
+    "arquivo": NOME_PADRAO_ARQUIVO,
+    "intervalo_polls": 0.3,
+    "export_http": EXPORT_HTTP,
+    "etl": ETL_CONFIG,
+}
+
+
 # =========================================================
 # ========== FUNÇÃO PRINCIPAL ==============================
 # =========================================================
-def executar_contratos(usuario, senha, data_inicio, data_fim, zoom=0.8, pasta_download=None):
+def executar_contratos(usuario, senha, data_inicio, data_fim, zoom=0.8, pasta_download=None, driver=None, rodar_etl=True):
     """
-    Executa a automação de 'NOME_AUTOMACAO'.
+    Executa a automação de 'Contratos Emitidos'.
     Retorna o dicionário de resposta do ETL.
+    Com rodar_etl=False, retorna apenas o caminho do arquivo baixado.
     """
-    if not pasta_download:
-        pasta_download = get_downloads_dir()
-        log("⚠️ pasta_download não informado — usando padrão.", "WARN")
-
-    driver = iniciar_chrome(
-        url_inicial="https://codonto.aplicativo.net/",
-        zoom=zoom,
-        pasta_download=pasta_download,
-    )
-
-    try:
-        # 1️⃣ Login
-        realizar_login_codonto(driver, usuario, senha)
-        acoes_antes = [ 
-            {"xpath": "//span[@class='icon fa fa-clock']", "descricao": "Ícone Relógio"},
-            {"xpath": "//span[@class='icon fa fa-archive']", "descricao": "Movimentacoes"},
-        ]
-        # 2️⃣ Navegação e filtros (ajustar XPATHs e descrições)
-        acoes_fluxo = [
-            {"xpath": "//span[@class='icon fa fa-clock']", "descricao": "Ícone Relógio"},
-            {"xpath": "//span[@class='icon fa fa-archive']", "descricao": "Movimentacoes"},
-            {"xpath": "//a[@href='#maintabMovimentacao-contratos']", "descricao": "Contratos"},
-            {"xpath": "//span[@title='Mostrar Período']", "n":2, "descricao": "Mostrar Período"},
-            {"xpath": "//input[@name='ContratoDataInicio']", "acao": "digitar", "texto": data_inicio, "descricao": "Data Início"},
-            {"xpath": "//input[@name='ContratoDataTermino']", "acao": "digitar", "texto": data_fim, "descricao": "Data Fim"},
-            {"xpath": "//a[@id='Filtrar']", "n": 2, "descricao": "Botão Filtrar"},
-        ]
-        interagir_elementos(driver, acoes_antes)
-        driver.refresh()
-        interagir_elementos(driver, acoes_fluxo)
-        time.sleep(5.5)
-
-        # 3️⃣ Download
-        snap_antes = snapshot_downloads(pasta_download)
-        acoes_download = [
-            {"xpath": "//a[@title='Download em formato Excel']", "descricao": "Download Excel"},
-        ]
-        interagir_elementos(driver, acoes_download)
-
-        caminho_arquivo = aguardar_novo_download(
-            pasta_download=pasta_download,
-            snapshot_anterior=snap_antes,
-            nome_substring=NOME_PADRAO_ARQUIVO,
-            timeout=45,
-            intervalo_polls=0.3,
-        )
-
-        # 4️⃣ Fecha navegador e executa ETL
-        fechar_navegador_assincrono(driver, timeout=3.0)
-        resp = rodar_etl_generico(caminho_arquivo, ETL_CONFIG)
-
-        return resp  # ⚡ essencial p/ limpeza automática funcionar
-
-    except Exception as e:
-        log(f"❌ Falha geral em {TABELA}: {e}", "ERRO")
-        driver.quit()
-        raise
+    return executar_relatorio(RELATORIO, usuario, senha, data_inicio, data_fim, zoom, pasta_download, driver, rodar_etl)
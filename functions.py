@@ -16,15 +16,33 @@ import os, time
 import os
 import re
 import time
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import platform
+import select
+import shutil
+import sqlite3
+import struct
+import queue
 import subprocess
+import uuid
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
 from datetime import datetime
-from threading import Thread
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock, Thread, current_thread, local
+from functools import wraps
 from typing import Dict, Set, Optional, List, Tuple
 
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -61,6 +79,15 @@ def get_downloads_dir() -> str:
     log(f"[DEBUG] Pasta de downloads configurada: {downloads}")
     return downloads
 
+def get_estado_dir() -> str:
+    """
+    Retorna a pasta de estado persistente (progresso de backfill, caches) dentro
+    de automacoes_codonto e garante que ela exista.
+    """
+    estado = os.path.normpath(os.path.join(get_base_dir(), "estado"))
+    os.makedirs(estado, exist_ok=True)
+    return estado
+
 # =========================================================
 # ========== LOGS E TEMPORIZAÇÃO ==========================
 # =========================================================
@@ -93,6 +120,134 @@ def log(msg: str, tipo: str = "INFO") -> None:
     print(f"{prefix} {simbolo} {msg}")
 
 
+# =========================================================
+# ========== INSTRUMENTAÇÃO (TEMPO POR ETAPA) ==============
+# =========================================================
+# `medir` registra duração (e, se informado, linhas/bytes) de cada etapa:
+#     with medir("etl", linhas=len(df)) as m:
+#         ...
+#         m["bytes"] = os.path.getsize(saida)
+# `medido("login")` faz o mesmo como decorator. `contexto_medicao(automacao=...)`
+# anexa atributos a tudo que for medido na thread. No fim do modo,
+# `relatorio_execucao` imprime a tabela-resumo e grava o JSON em estado/relatorios.
+_MEDICOES: List[dict] = []
+_LOCK_MEDICOES = Lock()
+_CONTEXTO_MEDICAO = local()
+_INICIO_MEDICOES = time.time()
+# Etapas de topo de cada automação (somadas por automação no resumo)
+ETAPAS_AUTOMACAO = ("download", "etl", "upload")
+
+
+def iniciar_medicoes() -> None:
+    """Zera as medições (início de um modo/execução)."""
+    global _INICIO_MEDICOES
+    with _LOCK_MEDICOES:
+        _MEDICOES.clear()
+        _INICIO_MEDICOES = time.time()
+
+
+@contextmanager
+def contexto_medicao(**atributos):
+    """Atributos (ex.: automacao="Recebidos") herdados pelas medições desta thread."""
+    anterior = getattr(_CONTEXTO_MEDICAO, "atributos", {})
+    _CONTEXTO_MEDICAO.atributos = {**anterior, **atributos}
+    try:
+        yield
+    finally:
+        _CONTEXTO_MEDICAO.atributos = anterior
+
+
+@contextmanager
+def medir(etapa: str, **atributos):
+    """Mede a duração do bloco; o dict devolvido aceita "linhas", "bytes" etc."""
+    registro = {
+        **getattr(_CONTEXTO_MEDICAO, "atributos", {}),
+        "etapa": etapa,
+        **atributos,
+        "inicio": round(time.time() - _INICIO_MEDICOES, 3),
+        "thread": current_thread().name,
+    }
+    t0 = time.perf_counter()
+    try:
+        yield registro
+    except BaseException:
+        registro["erro"] = True
+        raise
+    finally:
+        registro["segundos"] = round(time.perf_counter() - t0, 4)
+        with _LOCK_MEDICOES:
+            _MEDICOES.append(registro)
+
+
+def medido(etapa: str):
+    """Decorator: `medir(etapa)` em volta de cada chamada da função."""
+    def decorador(func):
+        @wraps(func)
+        def envolvida(*args, **kwargs):
+            with medir(etapa):
+                return func(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def _resumir_medicoes(medicoes: List[dict], chave: str) -> Dict[str, dict]:
+    resumo: Dict[str, dict] = {}
+    for m in medicoes:
+        item = resumo.setdefault(m.get(chave) or "-", {"qtd": 0, "segundos": 0.0, "max": 0.0,
+                                                        "linhas": 0, "bytes": 0, "erros": 0})
+        item["qtd"] += 1
+        item["segundos"] += m["segundos"]
+        item["max"] = max(item["max"], m["segundos"])
+        item["linhas"] += int(m.get("linhas") or 0)
+        item["bytes"] += int(m.get("bytes") or 0)
+        item["erros"] += 1 if m.get("erro") else 0
+    return resumo
+
+
+def relatorio_execucao(modo: str, salvar: bool = True) -> dict:
+    """Imprime a tabela-resumo das medições e grava o relatório JSON da execução.
+
+    Etapas aninhadas (ex.: "acao" dentro de "download") aparecem cada uma na
+    sua linha, então a soma da coluna total não é o tempo de parede.
+    """
+    with _LOCK_MEDICOES:
+        medicoes = list(_MEDICOES)
+    duracao = time.time() - _INICIO_MEDICOES
+    por_etapa = _resumir_medicoes(medicoes, "etapa")
+    por_automacao = _resumir_medicoes([m for m in medicoes if m.get("etapa") in ETAPAS_AUTOMACAO], "automacao")
+
+    print(f"\n{'etapa':<22}{'qtd':>6}{'total(s)':>11}{'média(s)':>10}{'máx(s)':>9}{'linhas':>10}{'MB':>9}")
+    for etapa, r in sorted(por_etapa.items(), key=lambda kv: -kv[1]["segundos"]):
+        mb = f"{r['bytes'] / 2**20:.1f}" if r["bytes"] else ""
+        erros = f"  ({r['erros']} erro(s))" if r["erros"] else ""
+        print(f"{etapa:<22}{r['qtd']:>6}{r['segundos']:>11.1f}{r['segundos'] / r['qtd']:>10.2f}"
+              f"{r['max']:>9.1f}{r['linhas'] or '':>10}{mb:>9}{erros}")
+    for automacao, r in sorted(por_automacao.items()):
+        print(f"  {automacao:<20} {r['segundos']:.1f}s em download/ETL/upload")
+    acoes = sorted((m for m in medicoes if m["etapa"] == "acao"), key=lambda m: -m["segundos"])[:5]
+    if acoes:
+        print("  ações mais lentas: " + ", ".join(f"{m['descricao']} ({m['segundos']:.1f}s)" for m in acoes))
+    log(f"📊 Execução '{modo}' levou {duracao:.1f}s ({len(medicoes)} medições)")
+
+    relatorio = {
+        "modo": modo,
+        "inicio": datetime.fromtimestamp(_INICIO_MEDICOES).isoformat(timespec="seconds"),
+        "duracao_segundos": round(duracao, 3),
+        "por_etapa": por_etapa,
+        "por_automacao": por_automacao,
+        "medicoes": medicoes,
+    }
+    if salvar:
+        pasta = os.path.join(get_estado_dir(), "relatorios")
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"execucao_{datetime.now():%Y%m%d_%H%M%S}_{modo}.json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=1, default=str)
+        relatorio["caminho"] = caminho
+        log(f"Relatório da execução salvo em {caminho}")
+    return relatorio
+
+
 # =========================================================
 # ========== FECHAMENTO DE NAVEGADOR =======================
 # =========================================================
@@ -171,6 +326,160 @@ def _match_por_regex_ou_substring(nome: str, regex: Optional[str], substring: Op
     return False
 
 
+def _novo_download_compativel(
+    pasta_download: str,
+    snap: Set[str],
+    regex_nome: Optional[str],
+    nome_substring: Optional[str],
+) -> Tuple[Optional[str], Set[str]]:
+    """Faz uma varredura da pasta e devolve (caminho do novo arquivo compatível, snapshot atualizado).
+
+    Arquivos novos que não casam com o filtro entram no snapshot e passam a ser ignorados.
+    """
+    atuais_dict = _listar_arquivos_validos(pasta_download)
+    atuais = set(atuais_dict.keys())
+    if atuais == snap:
+        return None, snap
+
+    novos = [n for n in atuais if n not in snap]
+    candidatos = [n for n in novos if _match_por_regex_ou_substring(n, regex_nome, nome_substring)]
+    if not candidatos:
+        return None, atuais
+
+    candidatos.sort(key=lambda n: atuais_dict.get(n, 0.0), reverse=True)
+    return os.path.join(pasta_download, candidatos[0]), atuais
+
+
+def _aguardar_download_polling(
+    pasta_download: str,
+    snapshot_anterior: Set[str],
+    nome_substring: Optional[str],
+    regex_nome: Optional[str],
+    timeout: float,
+    intervalo_polls: float,
+) -> str:
+    """Estratégia de fallback: varre a pasta a cada `intervalo_polls` segundos."""
+    t0 = time.time()
+    snap = set(snapshot_anterior)
+
+    while True:
+        if time.time() - t0 > timeout:
+            raise TimeoutError("Tempo limite aguardando novo download compatível.")
+
+        caminho, snap = _novo_download_compativel(pasta_download, snap, regex_nome, nome_substring)
+        if caminho:
+            return caminho
+
+        time.sleep(intervalo_polls)
+
+
+# ---------- inotify (Linux) ----------
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENTO = struct.Struct("iIII")  # wd, mask, cookie, len
+
+_libc_inotify = None
+
+
+def _carregar_libc_inotify():
+    """Carrega a libc com as funções de inotify (None fora do Linux ou se indisponível)."""
+    global _libc_inotify
+    if _libc_inotify is None:
+        _libc_inotify = False
+        if platform.system() == "Linux":
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                _libc_inotify = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc_inotify or None
+
+
+def inotify_disponivel() -> bool:
+    """Indica se o observador de downloads por inotify pode ser usado neste sistema."""
+    return _carregar_libc_inotify() is not None
+
+
+class _ObservadorInotify:
+    """Observa uma pasta e entrega os nomes de arquivos finalizados (fechados ou renomeados para ela)."""
+
+    def __init__(self, pasta: str) -> None:
+        libc = _carregar_libc_inotify()
+        if libc is None:
+            raise OSError("inotify indisponível neste sistema.")
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(pasta), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+        if wd < 0:
+            erro = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(erro, f"inotify_add_watch falhou para {pasta}")
+
+    def __enter__(self) -> "_ObservadorInotify":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        os.close(self.fd)
+
+    def eventos(self, timeout: float) -> List[str]:
+        """Bloqueia até `timeout` segundos e retorna os nomes dos arquivos que geraram eventos."""
+        prontos, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not prontos:
+            return []
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        nomes, pos = [], 0
+        while pos + _INOTIFY_EVENTO.size <= len(dados):
+            _, _, _, tamanho = _INOTIFY_EVENTO.unpack_from(dados, pos)
+            pos += _INOTIFY_EVENTO.size
+            nome = dados[pos:pos + tamanho].rstrip(b"\0")
+            pos += tamanho
+            if nome:
+                nomes.append(os.fsdecode(nome))
+        return nomes
+
+
+def _aguardar_download_inotify(
+    pasta_download: str,
+    snapshot_anterior: Set[str],
+    nome_substring: Optional[str],
+    regex_nome: Optional[str],
+    timeout: float,
+) -> str:
+    """Aguarda o download bloqueando nos eventos de inotify (sem varrer a pasta em loop)."""
+    t_limite = time.time() + timeout
+
+    with _ObservadorInotify(pasta_download) as observador:
+        # O download pode ter terminado antes do watch existir: uma varredura única cobre isso.
+        caminho, snap = _novo_download_compativel(
+            pasta_download, set(snapshot_anterior), regex_nome, nome_substring
+        )
+        if caminho:
+            return caminho
+
+        while True:
+            restante = t_limite - time.time()
+            if restante <= 0:
+                raise TimeoutError("Tempo limite aguardando novo download compatível.")
+
+            for nome in observador.eventos(restante):
+                if nome in snap or nome.lower().endswith(TEMP_SUFFIXES):
+                    continue
+                if not _match_por_regex_ou_substring(nome, regex_nome, nome_substring):
+                    continue
+                caminho = os.path.join(pasta_download, nome)
+                if os.path.isfile(caminho):
+                    return caminho
+
+
 def aguardar_novo_download(
     pasta_download: str,
     snapshot_anterior: Set[str],
@@ -178,16 +487,22 @@ def aguardar_novo_download(
     regex_nome: Optional[str] = None,
     timeout: int = 45,
     intervalo_polls: float = 0.1,
+    usar_inotify: bool = True,
 ) -> str:
     """Aguarda até que um novo arquivo (não temporário) apareça na pasta.
 
+    No Linux, espera pelos eventos de inotify (fechamento do arquivo ou rename
+    do `.crdownload` para o nome final). Nos demais sistemas, ou se o inotify
+    falhar, usa a varredura periódica da pasta.
+
     Args:
         pasta_download: Caminho da pasta de downloads.
         snapshot_anterior: Snapshot anterior para comparação.
         nome_substring: Filtro de nome parcial (opcional).
         regex_nome: Filtro regex de nome (opcional).
         timeout: Tempo máximo em segundos.
-        intervalo_polls: Intervalo entre verificações.
+        intervalo_polls: Intervalo entre verificações (somente no modo varredura).
+        usar_inotify: Se False, força o modo varredura.
 
     Returns:
         Caminho completo do novo arquivo detectado.
@@ -196,34 +511,20 @@ def aguardar_novo_download(
         TimeoutError: Se nenhum arquivo novo for detectado dentro do limite.
     """
     t0 = time.time()
-    snap = set(snapshot_anterior)
-
-    while True:
-        if time.time() - t0 > timeout:
-            raise TimeoutError("Tempo limite aguardando novo download compatível.")
-
-        atuais_dict = _listar_arquivos_validos(pasta_download)
-        atuais = set(atuais_dict.keys())
-
-        if atuais != snap:
-            novos = [n for n in atuais if n not in snap]
-            if not novos:
-                snap = atuais
-                time.sleep(intervalo_polls)
-                continue
-
-            candidatos = [n for n in novos if _match_por_regex_ou_substring(n, regex_nome, nome_substring)]
-            if not candidatos:
-                snap = atuais
-                time.sleep(intervalo_polls)
-                continue
-
-            candidatos.sort(key=lambda n: atuais_dict.get(n, 0.0), reverse=True)
-            escolhido = candidatos[0]
-            caminho = os.path.join(pasta_download, escolhido)
-            return caminho
-
-        time.sleep(intervalo_polls)
+    if usar_inotify and inotify_disponivel():
+        try:
+            return _aguardar_download_inotify(
+                pasta_download, snapshot_anterior, nome_substring, regex_nome, timeout
+            )
+        except TimeoutError:
+            raise
+        except OSError as e:
+            log(f"inotify indisponível ({e}) — usando varredura da pasta.", "WARN")
+
+    restante = max(timeout - (time.time() - t0), 0)
+    return _aguardar_download_polling(
+        pasta_download, snapshot_anterior, nome_substring, regex_nome, restante, intervalo_polls
+    )
 
 def apagar_arquivos_seguro(caminhos, pasta_padrao: Optional[str] = None) -> bool:
     """
@@ -297,12 +598,48 @@ def gerar_periodos(data_inicial: str, data_final: str, meses_por_bloco: int = 6)
     return periodos
 
 
+def periodo_mes_atual(hoje: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Do dia 1 do mês corrente até hoje."""
+    hoje = hoje or datetime.today()
+    return hoje.replace(day=1), hoje
+
+
+def periodo_mes_anterior(hoje: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Mês anterior completo (do dia 1 ao último dia)."""
+    hoje = hoje or datetime.today()
+    mes_anterior = hoje - pd.DateOffset(months=1)
+    data_inicio = mes_anterior.replace(day=1)
+    ultimo_dia = (hoje.replace(day=1) - pd.Timedelta(days=1)).day
+    data_fim = mes_anterior.replace(day=ultimo_dia)
+    return data_inicio, data_fim
+
+
+PERIODOS_NOMEADOS = {"mes_atual": periodo_mes_atual, "mes_anterior": periodo_mes_anterior}
+
+
+def resolver_periodo(periodo: str = "mes_atual", inicio: Optional[str] = None,
+                     fim: Optional[str] = None) -> Tuple[datetime, datetime]:
+    """Período sem interação: "mes_atual", "mes_anterior" ou datas explícitas (dd/mm/aaaa).
+
+    Raises:
+        ValueError: nome de período desconhecido, data inválida ou início depois do fim.
+    """
+    if inicio or fim:
+        if not (inicio and fim):
+            raise ValueError("Informe as duas datas (início e fim).")
+        data_inicio, data_fim = datetime.strptime(inicio, "%d/%m/%Y"), datetime.strptime(fim, "%d/%m/%Y")
+        if data_inicio > data_fim:
+            raise ValueError("A data inicial não pode ser maior que a final.")
+        return data_inicio, data_fim
+    if periodo not in PERIODOS_NOMEADOS:
+        raise ValueError(f"Período desconhecido: {periodo!r} (use {', '.join(PERIODOS_NOMEADOS)} ou datas).")
+    return PERIODOS_NOMEADOS[periodo]()
+
+
 def obter_periodo_usuario(pergunta_tipo: bool = True) -> Tuple[datetime, datetime]:
     """Obtém o intervalo de datas conforme escolha do usuário, com validação robusta."""
-    hoje = datetime.today()
-
     if not pergunta_tipo:
-        return hoje.replace(day=1), hoje
+        return periodo_mes_atual()
 
     while True:
         print("\n📅 Escolha o período desejado:")
@@ -317,14 +654,10 @@ def obter_periodo_usuario(pergunta_tipo: bool = True) -> Tuple[datetime, datetim
             continue
 
         if tipo == "1":
-            return hoje.replace(day=1), hoje
+            return periodo_mes_atual()
 
         elif tipo == "2":
-            mes_anterior = hoje - pd.DateOffset(months=1)
-            data_inicio = mes_anterior.replace(day=1)
-            ultimo_dia = (hoje.replace(day=1) - pd.Timedelta(days=1)).day
-            data_fim = mes_anterior.replace(day=ultimo_dia)
-            return data_inicio, data_fim
+            return periodo_mes_anterior()
 
         else:
             # Loop de validação para datas manuais
@@ -359,59 +692,175 @@ def periodo_str(data_inicio: datetime, data_fim: datetime) -> str:
 
 import platform
 
+# Perfis de lançamento do Chrome (ver `iniciar_chrome`):
+#   "completo": janela normal (headless só em servidor sem DISPLAY), carrega tudo.
+#   "enxuto":   sempre headless (--headless=new), page load "eager", sem imagens,
+#               fontes, mídia e animações CSS, sem rede em segundo plano nem
+#               atualização de componentes. Feito para baixar relatórios.
+PERFIS_CHROME = {
+    "completo": {
+        "headless": False,
+        "argumentos": ["--start-maximized"],
+        "prefs": {},
+        "estrategia_carregamento": "normal",
+        "bloquear_urls": [],
+        "sem_animacoes": False,
+    },
+    "enxuto": {
+        "headless": True,
+        "argumentos": [
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+            "--no-first-run",
+            "--mute-audio",
+            "--metrics-recording-only",
+            "--blink-settings=imagesEnabled=false",
+        ],
+        "prefs": {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.media_stream": 2,
+            "profile.default_content_setting_values.geolocation": 2,
+        },
+        "estrategia_carregamento": "eager",
+        "bloquear_urls": [
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico", "*.bmp",
+            "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+            "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav",
+        ],
+        "sem_animacoes": True,
+    },
+}
+PERFIL_CHROME = "completo"
+
+_JS_SEM_ANIMACOES = """
+document.addEventListener('DOMContentLoaded', () => {
+    const s = document.createElement('style');
+    s.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; }';
+    document.head.appendChild(s);
+});
+"""
+
+
+def definir_perfil_chrome(perfil: str) -> None:
+    """Troca o perfil padrão dos próximos `iniciar_chrome` (ex.: pela linha de comando)."""
+    global PERFIL_CHROME
+    if perfil not in PERFIS_CHROME:
+        raise ValueError(f"Perfil de Chrome desconhecido: {perfil!r} (use {', '.join(PERFIS_CHROME)})")
+    PERFIL_CHROME = perfil
+
+
+@medido("chrome_inicio")
 def iniciar_chrome(
     url_inicial: Optional[str] = None,
     modo_headless: bool = False,
     zoom: float = 1.0,
-    pasta_download: Optional[str] = None
+    pasta_download: Optional[str] = None,
+    eventos_download: Optional[bool] = None,
+    perfil: Optional[str] = None,
+) -> webdriver.Chrome:
+    """Inicia o navegador Chrome configurado para automações.
+
+    Com `eventos_download=True` (padrão: EVENTOS_DOWNLOAD_CDP), o Chrome passa a
+    reportar o progresso dos downloads via DevTools, permitindo usar
+    `aguardar_download_cdp` em vez de observar a pasta.
+
+    `perfil` escolhe entre os PERFIS_CHROME (padrão: PERFIL_CHROME).
+
+    Com o pré-lançamento ativo (`ativar_prelancamento`) e a mesma configuração,
+    devolve um Chrome já aberto na tela de login em vez de abrir outro.
+    """
+    prelancador = _PRELANCADOR
+    if prelancador is not None and prelancador.compativel(url_inicial, modo_headless, eventos_download, perfil):
+        return prelancador.obter(pasta_download, zoom)
+    return _lancar_chrome(url_inicial, modo_headless, zoom, pasta_download, eventos_download, perfil)
+
+
+def _lancar_chrome(
+    url_inicial: Optional[str] = None,
+    modo_headless: bool = False,
+    zoom: float = 1.0,
+    pasta_download: Optional[str] = None,
+    eventos_download: Optional[bool] = None,
+    perfil: Optional[str] = None,
 ) -> webdriver.Chrome:
-    """Inicia o navegador Chrome configurado para automações."""
+    """Abre um Chrome novo (corpo de `iniciar_chrome`, sem o pré-lançamento)."""
     import platform
 
+    if eventos_download is None:
+        eventos_download = EVENTOS_DOWNLOAD_CDP
+    conf = PERFIS_CHROME[perfil or PERFIL_CHROME]
+
     # 🧠 Detecta se está em servidor Linux sem interface
-    if platform.system() == "Linux" and not os.environ.get("DISPLAY"):
+    if conf["headless"]:
+        modo_headless = True
+    elif platform.system() == "Linux" and not os.environ.get("DISPLAY"):
         modo_headless = True
         log("🌐 Modo headless ativado automaticamente (ambiente servidor).", "INFO")
 
-    """Inicia o navegador Chrome configurado para automações."""
     chrome_options = Options()
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--start-maximized")
     chrome_options.add_argument("--disable-extensions")
     chrome_options.add_argument("--disable-infobars")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
     chrome_options.add_argument("--log-level=3")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
-    chrome_options.add_experimental_option("prefs", {"profile.default_content_setting_values.notifications": 2})
+    chrome_options.page_load_strategy = conf["estrategia_carregamento"]
+    for argumento in conf["argumentos"]:
+        if not (modo_headless and argumento == "--start-maximized"):
+            chrome_options.add_argument(argumento)
 
     if modo_headless:
-        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--headless=new" if conf["headless"] else "--headless")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-
 
+    # Um único "prefs": chamar add_experimental_option de novo substituiria o anterior
+    prefs = {"profile.default_content_setting_values.notifications": 2, **conf["prefs"]}
     if pasta_download:
         os.makedirs(pasta_download, exist_ok=True)
-        prefs = {
+        prefs.update({
             "download.default_directory": os.path.abspath(pasta_download),
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
             "safebrowsing.enabled": True,
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
+        })
     else:
         log("Nenhuma pasta de download definida — usando padrão do sistema", "WARN")
+    chrome_options.add_experimental_option("prefs", prefs)
+
+    if eventos_download:
+        # eventos do DevTools ficam disponíveis em driver.get_log("performance"); o log
+        # do chromedriver só repassa os domínios Network/Page (os de download vêm em Page.*)
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": False, "enablePage": True})
 
-    with open(os.devnull, 'w') as devnull:
-        old_out, old_err = os.dup(1), os.dup(2)
-        os.dup2(devnull.fileno(), 1)
-        os.dup2(devnull.fileno(), 2)
-        driver = webdriver.Chrome(options=chrome_options)
-        os.dup2(old_out, 1)
-        os.dup2(old_err, 2)
+    # Saída do chromedriver (e do Chrome, que herda dele) vai para o devnull. Sem dup2
+    # nos fds 1/2 do processo: o Chrome também é aberto em threads (paralelo, pré-lançamento).
+    driver = webdriver.Chrome(options=chrome_options, service=Service(log_output=subprocess.DEVNULL))
+
+    if eventos_download:
+        try:
+            ativar_eventos_download(driver, pasta_download or get_downloads_dir())
+        except Exception as e:
+            log(f"Falha ao ativar eventos de download via CDP: {e}", "WARN")
+
+    try:
+        if conf["bloquear_urls"]:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": conf["bloquear_urls"]})
+        if conf["sem_animacoes"]:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _JS_SEM_ANIMACOES})
+    except Exception as e:
+        log(f"Falha ao aplicar bloqueios do perfil '{perfil or PERFIL_CHROME}' via CDP: {e}", "WARN")
+    if FECHAR_AVISOS_AUTOMATICO:
+        try:
+            instalar_fechamento_automatico_avisos(driver)
+        except Exception as e:
+            log(f"Falha ao instalar o fechamento automático de avisos: {e}", "WARN")
 
     if url_inicial:
         driver.get(url_inicial)
@@ -424,279 +873,2713 @@ def iniciar_chrome(
 
 
 # =========================================================
-# ========== SELENIUM: INTERAÇÕES ==========================
+# ========== PRÉ-LANÇAMENTO DO CHROME ======================
 # =========================================================
-def interagir_elementos(
-    driver,
-    acoes: List[Dict[str, Optional[str]]],
-    max_retries: int = 3,
-    timeout: int = 55,
-    delay_apos_acao: float = 1
-) -> None:
-    """Executa múltiplas ações sequenciais em elementos Selenium, com robustez contra bloqueios."""
-
-    avisos_xpaths = [
-        "//button[@class='bt bt-primary bt-outline bt-small']",
-        "//button[contains(@class,'swal2-confirm')]",
-        "//button[text()='OK' or text()='Ok' or text()='ok']",
-        "//div[@role='dialog']//button[@type='button']",
-        "//button[contains(@class,'confirmar') or contains(.,'Confirmar')]",
-    ]
+PRELANCAMENTO_MAX_OCIOSOS = 1       # Chromes prontos (ociosos) ao mesmo tempo; cada um ocupa ~150-300 MB
+PRELANCAMENTO_MAX_MINUTOS = 15      # ocioso há mais tempo que isso é fechado em vez de entregue
 
-    def fechar_avisos() -> None:
-        """Tenta fechar quaisquer avisos modais ou popups que bloqueiem a interação."""
-        for aviso_xpath in avisos_xpaths:
+_PRELANCADOR = None
+
+
+class PrelancadorChrome:
+    """Mantém Chromes abertos em segundo plano na tela de login, prontos para a próxima automação.
+
+    `obter` entrega um deles na hora (ajustando pasta de download e zoom) e já
+    dispara o lançamento do substituto; se nenhum estiver pronto, abre um na
+    hora, como `iniciar_chrome`. Prontos + em lançamento nunca passam de
+    `max_ociosos`.
+    """
+
+    def __init__(
+        self,
+        max_ociosos: int = PRELANCAMENTO_MAX_OCIOSOS,
+        url_inicial: Optional[str] = None,
+        eventos_download: Optional[bool] = None,
+        max_minutos: float = PRELANCAMENTO_MAX_MINUTOS,
+        lancar: Optional[Callable] = None,
+        perfil: Optional[str] = None,
+    ) -> None:
+        self.max_ociosos = max(0, max_ociosos)
+        self.url_inicial = url_inicial or URL_CODONTO
+        self.eventos_download = EVENTOS_DOWNLOAD_CDP if eventos_download is None else eventos_download
+        self.perfil = perfil or PERFIL_CHROME
+        self.max_minutos = max_minutos
+        self._lancar = lancar or _lancar_chrome
+        self._prontos: List[Tuple[object, float]] = []
+        self._lancando = 0
+        self._lock = Lock()
+        self._encerrado = False
+
+    def compativel(self, url_inicial: Optional[str], modo_headless: bool, eventos_download: Optional[bool],
+                   perfil: Optional[str] = None) -> bool:
+        """Se um pedido a `iniciar_chrome` pode ser atendido por um Chrome pré-lançado."""
+        eventos = EVENTOS_DOWNLOAD_CDP if eventos_download is None else eventos_download
+        return (url_inicial == self.url_inicial and not modo_headless and eventos == self.eventos_download
+                and (perfil or PERFIL_CHROME) == self.perfil)
+
+    def _abrir(self):
+        return self._lancar(self.url_inicial, False, 1.0, get_downloads_dir(), self.eventos_download, self.perfil)
+
+    def _lancar_em_segundo_plano(self) -> None:
+        try:
+            with medir("chrome_prelancamento"):
+                driver = self._abrir()
+        except Exception as e:
+            log(f"Pré-lançamento do Chrome falhou: {e}", "WARN")
+            with self._lock:
+                self._lancando -= 1
+            return
+        with self._lock:
+            self._lancando -= 1
+            if not self._encerrado:
+                self._prontos.append((driver, time.time()))
+                return
+        fechar_navegador_assincrono(driver)
+
+    def repor(self) -> None:
+        """Dispara lançamentos em segundo plano até `max_ociosos` (prontos + em andamento)."""
+        with self._lock:
+            if self._encerrado:
+                return
+            faltam = self.max_ociosos - len(self._prontos) - self._lancando
+            self._lancando += max(faltam, 0)
+        for _ in range(faltam):
+            Thread(target=self._lancar_em_segundo_plano, name="prelancamento-chrome", daemon=True).start()
+
+    def _pronto(self):
+        """Retira o Chrome pronto mais recente; descarta os velhos ou que não respondem."""
+        while True:
+            with self._lock:
+                if not self._prontos:
+                    return None
+                driver, criado_em = self._prontos.pop()
+            if (time.time() - criado_em) / 60 >= self.max_minutos:
+                fechar_navegador_assincrono(driver)
+                continue
             try:
-                botoes = driver.find_elements(By.XPATH, aviso_xpath)
-                for btn in botoes:
-                    if btn.is_displayed() and btn.is_enabled():
-                        btn.click()
-                        time.sleep(0.3)
-                        log(f"Aviso fechado: {aviso_xpath}", "WARN")
+                _ = driver.current_url
+                return driver
             except Exception:
-                pass
+                fechar_navegador_assincrono(driver)
 
-    for item in acoes:
-        xpath = item.get("xpath")
-        acao = item.get("acao", "clicar")
-        texto = item.get("texto")
-        n = item.get("n")
-        descricao = item.get("descricao", xpath)
+    def obter(self, pasta_download: Optional[str] = None, zoom: float = 1.0):
+        """Entrega um Chrome na tela de login (pré-lançado se houver) e repõe o estoque."""
+        driver = self._pronto()
+        if driver is None:
+            driver = self._abrir()
+        else:
+            log("🚀 Chrome pré-lançado entregue", "INFO")
+        self.repor()
 
-        for tentativa in range(1, max_retries + 1):
-            try:
-                # Caso tenha índice, esperamos a lista completa
-                if n is not None:
-                    elementos = WebDriverWait(driver, min(timeout, 15)).until(
-                        EC.presence_of_all_elements_located((By.XPATH, xpath))
-                    )
+        if pasta_download:
+            definir_pasta_download(driver, pasta_download)
+        try:
+            driver.execute_script(f"document.body.style.zoom = '{zoom}'")
+        except Exception:
+            log("Falha ao aplicar zoom", "WARN")
+        return driver
+
+    def encerrar(self) -> None:
+        """Fecha os Chromes prontos; os ainda em lançamento fecham ao terminar."""
+        with self._lock:
+            self._encerrado = True
+            prontos, self._prontos = self._prontos, []
+        for driver, _ in prontos:
+            fechar_navegador_assincrono(driver)
+
+
+def ativar_prelancamento(max_ociosos: int = PRELANCAMENTO_MAX_OCIOSOS, **kwargs) -> Optional[PrelancadorChrome]:
+    """Liga o pré-lançamento para todo `iniciar_chrome` no Codonto (pool e automações) e já lança o primeiro."""
+    global _PRELANCADOR
+    desativar_prelancamento()
+    if max_ociosos <= 0:
+        return None
+    _PRELANCADOR = PrelancadorChrome(max_ociosos, **kwargs)
+    _PRELANCADOR.repor()
+    return _PRELANCADOR
+
+
+def desativar_prelancamento() -> None:
+    """Desliga o pré-lançamento e fecha os Chromes ociosos."""
+    global _PRELANCADOR
+    prelancador, _PRELANCADOR = _PRELANCADOR, None
+    if prelancador is not None:
+        prelancador.encerrar()
 
-                    if not elementos or n >= len(elementos):
-                        raise TimeoutException(
-                            f"Número insuficiente de elementos para {descricao}: len={len(elementos)} < n={n}"
-                        )
 
-                    elemento = elementos[n]
-                    WebDriverWait(driver, min(timeout, 10)).until(lambda d: elemento.is_displayed())
-                    WebDriverWait(driver, min(timeout, 10)).until(lambda d: elemento.is_enabled())
+# =========================================================
+# ========== SELENIUM: DOWNLOADS VIA DEVTOOLS (CDP) ========
+# =========================================================
 
-                    # Log de debug
-                    try:
-                        debug_textos = []
-                        for idx, el in enumerate(elementos):
-                            t = (el.text or "").strip()
-                            debug_textos.append(
-                                f"{idx}: vis={el.is_displayed()} hab={el.is_enabled()} txt='{t or '(vazio)'}'"
-                            )
-                        #log(f"[DEBUG] '{descricao}' matches -> {len(elementos)} | {', '.join(debug_textos)}", "DEBUG")
-                    except Exception:
-                        pass
-                else:
-                    # Caminho padrão (sem índice)
-                    elemento = WebDriverWait(driver, min(timeout, 10)).until(
-                        EC.visibility_of_element_located((By.XPATH, xpath))
-                    )
+EVENTOS_DOWNLOAD_CDP = False
+ESPERA_EVENTO_DOWNLOAD_S = 5   # sem Page.downloadWillBegin até aqui, procura o arquivo <GUID> na pasta
+_LOCK_RENOMEAR_DOWNLOAD = Lock()
+_RE_NOME_GUID = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_EXTENSAO_POR_ASSINATURA = ((b"PK\x03\x04", ".xlsx"), (b"\xd0\xcf\x11\xe0", ".xls"))
 
-                # ====== AÇÃO PRINCIPAL ======
-                if acao == "clicar":
-                    try:
-                        elemento.click()
-                        #log(f"Clique realizado: {descricao}", "INFO")
-                    except (ElementClickInterceptedException, ElementNotInteractableException):
-                        log(f"Tentativa {tentativa} falhou: {descricao} (bloqueado)", "WARN")
-                        fechar_avisos()
-                        time.sleep(0.5)
-                        driver.execute_script("window.scrollBy(0, -120);")
-                        time.sleep(0.5)
-                        elemento = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, xpath)))
-                        elemento.click()
-                        log(f"Clique refeito após scroll: {descricao}", "INFO")
-                    time.sleep(delay_apos_acao)
-                    break
 
-                elif acao == "digitar":
-                    elemento.clear()
-                    elemento.send_keys(texto)
-                    time.sleep(delay_apos_acao)
-                    #log(f"Texto digitado em: {descricao}", "INFO")
-                    break
+def ativar_eventos_download(driver, pasta_download: str) -> None:
+    """Liga os eventos de download do Chrome (Browser.setDownloadBehavior).
 
-            except (TimeoutException, StaleElementReferenceException):
-                fechar_avisos()
-                if tentativa == max_retries:
-                    log(f"Falha definitiva em {descricao}", "ERRO")
-                    raise
-                else:
-                    tempo_espera = 0.5 * tentativa
-                    log(f"Tentativa {tentativa} falhou: {descricao}, aguardando {tempo_espera:.1f}s", "WARN")
-                    time.sleep(tempo_espera)
+    Com `allowAndName`, cada download é salvo na pasta com o GUID como nome,
+    o que torna o caminho final exato e imune a outros arquivos da pasta.
+    """
+    pasta = os.path.abspath(pasta_download)
+    os.makedirs(pasta, exist_ok=True)
+    driver.execute_cdp_cmd(
+        "Browser.setDownloadBehavior",
+        {"behavior": "allowAndName", "downloadPath": pasta, "eventsEnabled": True},
+    )
+    driver.pasta_download_cdp = pasta
 
-            except Exception as e:
-                log(f"Erro inesperado em {descricao}: {e}", "ERRO")
-                fechar_avisos()
-                if tentativa == max_retries:
-                    raise
-                time.sleep(0.5)
 
+def eventos_download_ativos(driver) -> bool:
+    """Indica se o driver foi configurado com `ativar_eventos_download`."""
+    return bool(getattr(driver, "pasta_download_cdp", None))
 
 
+def descartar_eventos_cdp(driver) -> None:
+    """Esvazia o buffer de eventos do DevTools (equivalente ao snapshot antes do clique)."""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
 
-# =========================================================
-# ========== LOGIN PADRÃO CODONTO ==========================
-# =========================================================
 
-def realizar_login_codonto(driver, usuario: str, senha: str) -> None:
-    """Executa login no sistema Codonto com credenciais fornecidas."""
-    acoes_login = [
-        {"xpath": "//input[@id='login']", "acao": "digitar", "texto": usuario, "descricao": "Campo Usuário"},
-        {"xpath": "//input[@id='pass']", "acao": "digitar", "texto": senha, "descricao": "Campo Senha"},
-        {"xpath": "//input[@id='checkTermsOfUse']", "descricao": "Termos de Uso"},
-        {"xpath": "//button[@id='btnSubmit']", "acao": "clicar", "descricao": "Botão Entrar"},
-    ]
-    interagir_elementos(driver, acoes_login)
-    time.sleep(2)
+def _mover_download_cdp(pasta: str, guid: str, nome_sugerido: str) -> str:
+    """Renomeia o arquivo salvo como GUID para o nome sugerido pelo servidor (sem sobrescrever)."""
+    base, ext = os.path.splitext(nome_sugerido or guid)
+    with _LOCK_RENOMEAR_DOWNLOAD:
+        destino = os.path.join(pasta, base + ext)
+        i = 1
+        while os.path.exists(destino):
+            destino = os.path.join(pasta, f"{base} ({i}){ext}")
+            i += 1
+        os.replace(os.path.join(pasta, guid), destino)
+    return destino
 
-# =========================================================
-# ========== FUNÇÕES DE INPUT VALIDADO ====================
-# =========================================================
-def obter_opcao_usuario(
-    prompt: str,
-    opcoes_validas: list[str],
-    mensagem_erro: str = "Opção inválida, tente novamente."
-) -> str:
-    """Solicita uma entrada ao usuário e garante que seja uma das opções válidas.
 
-    Args:
-        prompt: Texto mostrado ao usuário.
-        opcoes_validas: Lista de strings com as opções permitidas.
-        mensagem_erro: Mensagem a exibir se o valor for inválido.
+def _extensao_por_conteudo(caminho: str) -> str:
+    """Extensão deduzida dos primeiros bytes (xlsx/xls); vazia se desconhecida."""
+    with open(caminho, "rb") as f:
+        inicio = f.read(8)
+    return next((ext for assinatura, ext in _EXTENSAO_POR_ASSINATURA if inicio.startswith(assinatura)), "")
 
-    Returns:
-        A opção digitada, garantidamente válida.
-    """
-    while True:
-        resposta = input(prompt).strip()
-        if resposta in opcoes_validas:
-            return resposta
-        log(mensagem_erro, "WARN")
 
+def _download_guid_concluido(pasta: str, snapshot_anterior: Set[str], tamanhos: Dict[str, int]) -> Optional[str]:
+    """GUID de um arquivo novo salvo pelo `allowAndName` com tamanho estável entre dois polls."""
+    nomes = set(os.listdir(pasta))
+    for nome in nomes - snapshot_anterior:
+        if not _RE_NOME_GUID.match(nome) or f"{nome}.crdownload" in nomes:
+            continue
+        tamanho = os.path.getsize(os.path.join(pasta, nome))
+        if tamanho > 0 and tamanhos.get(nome) == tamanho:
+            return nome
+        tamanhos[nome] = tamanho
+    return None
 
-def obter_lista_de_opcoes(
-    prompt: str,
-    opcoes_validas: list[str],
-    mensagem_erro: str = "Entrada inválida, tente novamente."
-) -> list[str]:
-    """Solicita ao usuário uma lista de números separados por vírgula e valida.
 
-    Args:
-        prompt: Texto mostrado ao usuário.
-        opcoes_validas: Lista de opções numéricas válidas (ex: ['1','2','3']).
-        mensagem_erro: Mensagem de erro em caso de opções fora do permitido.
+def aguardar_download_cdp(
+    driver,
+    nome_substring: Optional[str] = None,
+    regex_nome: Optional[str] = None,
+    timeout: int = 45,
+    intervalo_polls: float = 0.1,
+    snapshot_anterior: Optional[Set[str]] = None,
+) -> str:
+    """Aguarda o Chrome reportar um download `completed` e retorna o caminho exato do arquivo.
 
-    Returns:
-        Lista de strings contendo as opções válidas digitadas.
+    Lê `Page.downloadWillBegin`/`Page.downloadProgress` do log de performance (o
+    chromedriver não repassa o domínio Browser); o filtro por substring/regex é
+    aplicado ao nome sugerido. Se nenhum `downloadWillBegin` chegar em
+    ESPERA_EVENTO_DOWNLOAD_S, aceita um arquivo <GUID> novo e estável na pasta
+    (sem o nome sugerido, não há filtro: ganha extensão pelo conteúdo).
+
+    Raises:
+        TimeoutError: Se nenhum download compatível terminar dentro do limite.
+        RuntimeError: Se o download compatível for cancelado pelo Chrome.
     """
+    pasta = getattr(driver, "pasta_download_cdp", None)
+    if not pasta:
+        raise RuntimeError("Eventos de download não ativados neste driver (use eventos_download=True).")
+
+    t_limite = time.time() + timeout
+    t_sem_evento = time.time() + ESPERA_EVENTO_DOWNLOAD_S
+    if snapshot_anterior is None:
+        snapshot_anterior = set(os.listdir(pasta))
+    pendentes: Dict[str, str] = {}  # guid -> nome sugerido
+    tamanhos: Dict[str, int] = {}
+    evento_recebido = False
+
     while True:
-        entrada = input(prompt).strip()
-        if not entrada:
-            log("Nenhuma opção digitada.", "WARN")
-            continue
+        for entrada in driver.get_log("performance"):
+            try:
+                mensagem = json.loads(entrada["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            metodo = mensagem.get("method", "")
+            params = mensagem.get("params", {})
+
+            if metodo == "Page.downloadWillBegin":
+                evento_recebido = True
+                nome = params.get("suggestedFilename", "")
+                if not (nome_substring or regex_nome) or _match_por_regex_ou_substring(nome, regex_nome, nome_substring):
+                    pendentes[params.get("guid")] = nome
+
+            elif metodo == "Page.downloadProgress" and params.get("guid") in pendentes:
+                estado = params.get("state")
+                if estado == "completed":
+                    guid = params["guid"]
+                    return _mover_download_cdp(pasta, guid, pendentes.pop(guid))
+                if estado == "canceled":
+                    raise RuntimeError(f"Download cancelado pelo Chrome: {pendentes[params['guid']]}")
+
+        if not evento_recebido and time.time() > t_sem_evento:
+            guid = _download_guid_concluido(pasta, snapshot_anterior, tamanhos)
+            if guid:
+                log("Chrome não reportou eventos de download — usando o arquivo <GUID> da pasta.", "WARN")
+                return _mover_download_cdp(pasta, guid, guid + _extensao_por_conteudo(os.path.join(pasta, guid)))
+
+        if time.time() > t_limite:
+            raise TimeoutError("Tempo limite aguardando evento de download concluído.")
+        time.sleep(intervalo_polls)
 
-        escolhas = [x.strip() for x in entrada.split(",") if x.strip()]
-        escolhas_validas = [e for e in escolhas if e in opcoes_validas]
 
-        if not escolhas_validas:
-            log(mensagem_erro, "WARN")
-            continue
+def preparar_espera_download(driver, pasta_download: str) -> Set[str]:
+    """Marca o ponto de partida antes de clicar em download (eventos CDP + snapshot da pasta)."""
+    if eventos_download_ativos(driver):
+        descartar_eventos_cdp(driver)
+    return snapshot_downloads(pasta_download)
 
-        return escolhas_validas
 
-# =========================================================
-# ========== GERENCIADORES DE EXECUÇÃO (MODOS) ============
-# =========================================================
+def aguardar_download(
+    driver,
+    pasta_download: str,
+    snapshot_anterior: Set[str],
+    nome_substring: Optional[str] = None,
+    regex_nome: Optional[str] = None,
+    timeout: int = 45,
+    intervalo_polls: float = 0.1,
+) -> str:
+    """Aguarda o download pelo melhor meio disponível: eventos CDP se ativos, senão a pasta."""
+    with medir("espera_download") as m:
+        if eventos_download_ativos(driver):
+            m["meio"] = "cdp"
+            caminho = aguardar_download_cdp(driver, nome_substring, regex_nome, timeout, intervalo_polls,
+                                            snapshot_anterior)
+        else:
+            m["meio"] = "pasta"
+            caminho = aguardar_novo_download(
+                pasta_download=pasta_download,
+                snapshot_anterior=snapshot_anterior,
+                nome_substring=nome_substring,
+                regex_nome=regex_nome,
+                timeout=timeout,
+                intervalo_polls=intervalo_polls,
+            )
+        m["bytes"] = os.path.getsize(caminho)
+    return caminho
+
 
 # =========================================================
-# ========== UTILITÁRIO DE TEXTO PARA LOGS ================
+# ========== SELENIUM: ESPERAS POR CONDIÇÃO ================
 # =========================================================
-def periodo_str(data_inicio: datetime, data_fim: datetime) -> str:
-    """Formata período em string curta."""
-    return f"{data_inicio.strftime('%d/%m/%Y')} → {data_fim.strftime('%d/%m/%Y')}"
 
+# Indicadores de carregamento usados pela condição "spinner"
+ESPERA_SPINNER_XPATH = (
+    "//*[contains(@class,'spinner')] | //*[contains(@class,'loading')]"
+    " | //div[contains(@class,'blockUI')] | //div[contains(@class,'swal2-loading')]"
+)
 
-# =========================================================
-# ========== EXECUÇÃO DE UMA AUTOMAÇÃO =====================
-# =========================================================
-import os
-import time
-from typing import Callable
-from datetime import datetime
-def executar_automacao(
-    nome: str,
+_JS_XPATH_VISIVEL = """
+const r = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < r.snapshotLength; i++) {
+    const el = r.snapshotItem(i);
+    if (el.getClientRects().length && getComputedStyle(el).visibility !== 'hidden') return true;
+}
+return false;
+"""
+
+_JS_ESTADO_REDE = """
+return [
+    document.readyState,
+    window.jQuery ? window.jQuery.active : 0,
+    performance.getEntriesByType('resource').length
+];
+"""
+
+_TEMPO_ESPERA = {"fixa": 0.0, "condicional": 0.0}
+_LOCK_TEMPO_ESPERA = Lock()
+
+
+def registrar_espera(segundos: float, tipo: str = "fixa") -> None:
+    """Acumula tempo de espera da execução ("fixa" = sleep, "condicional" = condição de página)."""
+    with _LOCK_TEMPO_ESPERA:
+        _TEMPO_ESPERA[tipo] = _TEMPO_ESPERA.get(tipo, 0.0) + segundos
+
+
+def esperar(segundos: float) -> None:
+    """`time.sleep` contabilizado no resumo de esperas."""
+    time.sleep(segundos)
+    registrar_espera(segundos, "fixa")
+
+
+def resumo_tempo_espera(resetar: bool = True) -> Dict[str, float]:
+    """Loga (e opcionalmente zera) o tempo total gasto esperando na execução."""
+    with _LOCK_TEMPO_ESPERA:
+        resumo = dict(_TEMPO_ESPERA)
+        if resetar:
+            for k in _TEMPO_ESPERA:
+                _TEMPO_ESPERA[k] = 0.0
+    total = sum(resumo.values())
+    log(
+        f"⏱️ Tempo em espera: {total:.1f}s "
+        f"(fixa {resumo.get('fixa', 0.0):.1f}s | condicional {resumo.get('condicional', 0.0):.1f}s)"
+    )
+    return resumo
+
+
+def _rede_ociosa(driver, timeout: float, quieta_ms: int = 400) -> None:
+    """Espera documento carregado, sem AJAX do jQuery ativo e sem novos recursos por `quieta_ms`."""
+    t_limite = time.time() + timeout
+    ultimo, desde = None, time.time()
+    while True:
+        estado, ativos, recursos = driver.execute_script(_JS_ESTADO_REDE)
+        atual = (estado, ativos, recursos)
+        if atual != ultimo:
+            ultimo, desde = atual, time.time()
+        elif estado == "complete" and not ativos and (time.time() - desde) * 1000 >= quieta_ms:
+            return
+        if time.time() > t_limite:
+            raise TimeoutException("Rede não ficou ociosa dentro do limite.")
+        time.sleep(0.1)
+
+
+def _aguardar_condicao(driver, condicao: Dict, url_antes: str, timeout: float) -> None:
+    """Aguarda uma única condição declarada em `esperar` (ver `interagir_elementos`)."""
+    tipo = condicao.get("tipo")
+    timeout = condicao.get("timeout", timeout)
+    espera = WebDriverWait(driver, timeout, poll_frequency=0.1)
+
+    if tipo == "aparecer":
+        espera.until(lambda d: d.execute_script(_JS_XPATH_VISIVEL, condicao["xpath"]))
+    elif tipo == "sumir":
+        espera.until(lambda d: not d.execute_script(_JS_XPATH_VISIVEL, condicao["xpath"]))
+    elif tipo == "spinner":
+        xpath = condicao.get("xpath", ESPERA_SPINNER_XPATH)
+        espera.until(lambda d: not d.execute_script(_JS_XPATH_VISIVEL, xpath))
+    elif tipo == "rede_ociosa":
+        _rede_ociosa(driver, timeout, condicao.get("quieta_ms", 400))
+    elif tipo == "url":
+        contem = condicao.get("contem")
+        if contem:
+            espera.until(EC.url_contains(contem))
+        else:
+            espera.until(EC.url_changes(url_antes))
+    else:
+        raise ValueError(f"Condição de espera desconhecida: {tipo}")
+
+
+def aguardar_condicoes(driver, condicoes, url_antes: str = "", timeout: float = 15) -> float:
+    """Aguarda todas as condições em sequência e retorna o tempo gasto.
+
+    Condições que estouram o tempo geram apenas WARN: a próxima ação ainda
+    espera pelo próprio elemento e tem suas tentativas de retry.
+    """
+    if isinstance(condicoes, dict):
+        condicoes = [condicoes]
+    t0 = time.time()
+    for condicao in condicoes or []:
+        try:
+            _aguardar_condicao(driver, condicao, url_antes, timeout)
+        except TimeoutException:
+            log(f"Condição de espera não atingida em {condicao.get('timeout', timeout)}s: {condicao}", "WARN")
+    gasto = time.time() - t0
+    registrar_espera(gasto, "condicional")
+    return gasto
+
+
+# =========================================================
+# ========== SELENIUM: AVISOS E MODAIS =====================
+# =========================================================
+# Botões que fecham avisos/popups que bloqueiam cliques (usados nos retries)
+AVISOS_XPATHS = [
+    "//button[@class='bt bt-primary bt-outline bt-small']",
+    "//button[contains(@class,'swal2-confirm')]",
+    "//button[text()='OK' or text()='Ok' or text()='ok']",
+    "//div[@role='dialog']//button[@type='button']",
+    "//button[contains(@class,'confirmar') or contains(.,'Confirmar')]",
+]
+# Fechamento automático (MutationObserver): só avisos informativos. Os botões
+# "Confirmar"/swal2-confirm ficam de fora porque os fluxos clicam neles de
+# propósito (ex.: "Confirmar Download") e a ação seguinte não os acharia.
+FECHAR_AVISOS_AUTOMATICO = False
+AVISOS_XPATHS_AUTOMATICO = [
+    "//button[@class='bt bt-primary bt-outline bt-small']",
+    "//button[text()='OK' or text()='Ok' or text()='ok']",
+]
+
+_JS_FECHAR_AVISOS_FUNCAO = """
+function fecharAvisos(xpaths) {
+    const fechados = [];
+    for (const xp of xpaths) {
+        const r = document.evaluate(xp, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < r.snapshotLength; i++) {
+            const b = r.snapshotItem(i);
+            if (b.disabled || !b.getClientRects().length || getComputedStyle(b).visibility === 'hidden') continue;
+            b.click();
+            fechados.push(xp + ' ' + JSON.stringify((b.innerText || '').trim().slice(0, 40)));
+        }
+    }
+    return fechados;
+}
+"""
+
+_JS_FECHAR_AVISOS = _JS_FECHAR_AVISOS_FUNCAO + "return fecharAvisos(arguments[0]);"
+
+_JS_OBSERVADOR_AVISOS = _JS_FECHAR_AVISOS_FUNCAO + """
+(function (xpaths) {
+    if (window.__observadorAvisos) return;
+    window.__avisosFechados = window.__avisosFechados || [];
+    let agendado = false;
+    const verificar = () => {
+        agendado = false;
+        window.__avisosFechados.push(...fecharAvisos(xpaths));
+    };
+    const iniciar = () => {
+        window.__observadorAvisos = new MutationObserver(() => {
+            if (!agendado) { agendado = true; setTimeout(verificar, 50); }
+        });
+        window.__observadorAvisos.observe(document.documentElement,
+            {childList: true, subtree: true, attributes: true, attributeFilter: ['style', 'class']});
+        verificar();
+    };
+    if (document.documentElement) iniciar(); else document.addEventListener('DOMContentLoaded', iniciar);
+})(%s);
+"""
+
+
+def fechar_avisos(driver, xpaths: Optional[List[str]] = None) -> List[str]:
+    """Fecha numa só chamada os avisos/modais visíveis e devolve o que foi fechado."""
+    try:
+        fechados = driver.execute_script(_JS_FECHAR_AVISOS, xpaths or AVISOS_XPATHS) or []
+    except Exception:
+        return []
+    for aviso in fechados:
+        log(f"Aviso fechado: {aviso}", "WARN")
+    if fechados:
+        time.sleep(0.3)
+    return fechados
+
+
+def instalar_fechamento_automatico_avisos(driver, xpaths: Optional[List[str]] = None) -> None:
+    """Instala um MutationObserver que fecha avisos assim que aparecem, nesta página e nas próximas.
+
+    O que ele fechou fica em `window.__avisosFechados` (ver `avisos_fechados_automaticamente`).
+    """
+    script = _JS_OBSERVADOR_AVISOS % json.dumps(xpaths or AVISOS_XPATHS_AUTOMATICO)
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": script})
+    try:
+        driver.execute_script(script)
+    except Exception:
+        pass
+
+
+def avisos_fechados_automaticamente(driver) -> List[str]:
+    """Avisos fechados pelo observador na página atual (e zera a lista)."""
+    try:
+        return driver.execute_script(
+            "const f = window.__avisosFechados || []; window.__avisosFechados = []; return f;"
+        ) or []
+    except Exception:
+        return []
+
+
+# =========================================================
+# ========== SELENIUM: AÇÕES EM LOTE (JAVASCRIPT) ==========
+# =========================================================
+# Com ACOES_EM_LOTE_JS (ou `interagir_elementos(..., lote_js=True)`), cada trecho
+# de ações consecutivas vira um único execute_async_script: a espera pelo
+# elemento, o clique/digitação e as condições de "esperar" rodam na página, sem
+# uma ida e volta ao chromedriver por passo. Ações com "url" em "esperar" ou
+# com "lote": False seguem pelo caminho elemento a elemento.
+ACOES_EM_LOTE_JS = False
+_TIPOS_ESPERA_LOTE = {"aparecer", "sumir", "spinner", "rede_ociosa"}
+
+_JS_EXECUTAR_ACOES = r"""
+const [acoes, chave, spinnerXpath] = arguments;
+const concluir = arguments[arguments.length - 1];
+const dormir = ms => new Promise(r => setTimeout(r, ms));
+const nos = xp => {
+    const r = document.evaluate(xp, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const l = [];
+    for (let i = 0; i < r.snapshotLength; i++) l.push(r.snapshotItem(i));
+    return l;
+};
+const visivel = el => el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden';
+const algumVisivel = xp => nos(xp).some(visivel);
+const progresso = (feitas, esperasOk) =>
+    sessionStorage.setItem(chave, JSON.stringify({feitas: feitas, esperas_ok: esperasOk}));
+
+async function ate(cond, ms) {
+    const fim = Date.now() + ms;
+    for (;;) {
+        const v = cond();
+        if (v) return v;
+        if (Date.now() > fim) return null;
+        await dormir(50);
+    }
+}
+
+async function redeOciosa(ms, quietaMs) {
+    const fim = Date.now() + ms;
+    let ultimo = null, desde = Date.now();
+    while (Date.now() <= fim) {
+        const atual = [document.readyState, window.jQuery ? window.jQuery.active : 0,
+                       performance.getEntriesByType('resource').length].join('|');
+        if (atual !== ultimo) { ultimo = atual; desde = Date.now(); }
+        else if (atual.startsWith('complete|0|') && Date.now() - desde >= quietaMs) return true;
+        await dormir(100);
+    }
+    return false;
+}
+
+async function esperar(c) {
+    const ms = c.timeout * 1000;
+    if (c.tipo === 'aparecer') return await ate(() => algumVisivel(c.xpath), ms);
+    if (c.tipo === 'sumir') return await ate(() => !algumVisivel(c.xpath), ms);
+    if (c.tipo === 'spinner') return await ate(() => !algumVisivel(c.xpath || spinnerXpath), ms);
+    if (c.tipo === 'rede_ociosa') return await redeOciosa(ms, c.quieta_ms || 400);
+    return true;
+}
+
+(async () => {
+    const avisos = [];
+    let esperaMs = 0, i = 0;
+    try {
+        for (; i < acoes.length; i++) {
+            const a = acoes[i];
+            const el = await ate(() => {
+                const l = nos(a.xpath);
+                const e = l[a.n === null ? 0 : a.n];
+                return e && visivel(e) && !e.disabled ? e : null;
+            }, a.timeout_elemento * 1000);
+            if (!el) throw new Error('elemento não ficou visível/habilitado: ' + a.descricao);
+
+            if (a.acao === 'digitar') {
+                el.focus();
+                el.value = a.texto;
+                for (const tipo of ['input', 'keyup', 'change']) el.dispatchEvent(new Event(tipo, {bubbles: true}));
+                if (el.value !== a.texto) throw new Error('valor não aceito em ' + a.descricao + ': ' + el.value);
+            } else {
+                el.scrollIntoView({block: 'center'});
+                el.click();
+            }
+            progresso(i + 1, false);
+
+            const t0 = Date.now();
+            if (a.esperar === null) {
+                await dormir(a.delay * 1000);
+            } else {
+                for (const c of a.esperar) {
+                    if (!(await esperar(c))) avisos.push(a.descricao + ': ' + JSON.stringify(c));
+                }
+            }
+            esperaMs += Date.now() - t0;
+            progresso(i + 1, true);
+        }
+        concluir({feitas: i, espera_ms: esperaMs, avisos: avisos});
+    } catch (e) {
+        concluir({feitas: i, espera_ms: esperaMs, avisos: avisos, erro: String(e && e.message || e)});
+    }
+})();
+"""
+
+
+def _acao_em_lote(item: Dict) -> bool:
+    """Se a ação pode rodar dentro do script em lote."""
+    if item.get("lote") is False or item.get("acao", "clicar") not in ("clicar", "digitar"):
+        return False
+    if item.get("n") == "auto":
+        return False
+    condicoes = item.get("esperar")
+    if isinstance(condicoes, dict):
+        condicoes = [condicoes]
+    return all(c.get("tipo") in _TIPOS_ESPERA_LOTE for c in condicoes or [])
+
+
+def _trechos_de_acoes(acoes: List[Dict], lote_js: bool) -> List[Tuple[bool, List[Dict]]]:
+    """Agrupa ações consecutivas em trechos (em_lote, ações)."""
+    trechos: List[Tuple[bool, List[Dict]]] = []
+    for item in acoes:
+        em_lote = lote_js and _acao_em_lote(item)
+        if trechos and trechos[-1][0] == em_lote:
+            trechos[-1][1].append(item)
+        else:
+            trechos.append((em_lote, [item]))
+    return trechos
+
+
+def executar_acoes_em_lote(driver, acoes: List[Dict], timeout: int = 55, delay_apos_acao: float = 1) -> int:
+    """Executa as ações num único execute_async_script, com as esperas feitas na página.
+
+    Devolve quantas ações foram concluídas (com as esperas). Se o script parar no
+    meio (erro, página recarregada por um clique), as esperas pendentes da última
+    ação feita são completadas pelo caminho normal; quem chama continua a partir
+    do índice devolvido.
+    """
+    chave = f"_acoes_lote_{uuid.uuid4().hex[:8]}"
+    roteiro, limite = [], 5.0
+    for item in acoes:
+        condicoes = item.get("esperar")
+        if isinstance(condicoes, dict):
+            condicoes = [condicoes]
+        timeout_elemento = min(timeout, 15 if item.get("n") is not None else 10)
+        condicoes = None if condicoes is None else [
+            {**c, "timeout": c.get("timeout", min(timeout, 30))} for c in condicoes
+        ]
+        roteiro.append({
+            "xpath": item["xpath"],
+            "acao": item.get("acao", "clicar"),
+            "texto": item.get("texto"),
+            "n": item.get("n"),
+            "descricao": item.get("descricao", item["xpath"]),
+            "timeout_elemento": timeout_elemento,
+            "esperar": condicoes,
+            "delay": delay_apos_acao,
+        })
+        limite += timeout_elemento + (delay_apos_acao if condicoes is None else sum(c["timeout"] for c in condicoes))
+
+    descricao = " → ".join(a["descricao"] for a in roteiro)
+    with medir("acoes_lote_js", descricao=descricao, acoes=len(roteiro)) as m:
+        anterior = getattr(getattr(driver, "timeouts", None), "script", None)
+        driver.set_script_timeout(limite)
+        try:
+            resp = driver.execute_async_script(_JS_EXECUTAR_ACOES, roteiro, chave, ESPERA_SPINNER_XPATH)
+        except Exception as e:
+            # Página trocada no meio do script: o progresso fica no sessionStorage (mesma origem)
+            try:
+                resp = json.loads(driver.execute_script(f"return sessionStorage.getItem('{chave}')") or "null")
+            except Exception:
+                resp = None
+            resp = resp or {"feitas": 0, "esperas_ok": True}
+            resp["erro"] = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+            if not resp.get("esperas_ok", True) and resp["feitas"]:
+                aguardar_condicoes(driver, roteiro[resp["feitas"] - 1]["esperar"] or [], "", timeout=min(timeout, 30))
+        finally:
+            if anterior is not None:
+                driver.set_script_timeout(anterior)
+        try:
+            driver.execute_script(f"sessionStorage.removeItem('{chave}')")
+        except Exception:
+            pass
+
+        feitas = int(resp.get("feitas") or 0)
+        m["feitas"] = feitas
+        registrar_espera((resp.get("espera_ms") or 0) / 1000, "condicional")
+        for aviso in resp.get("avisos") or []:
+            log(f"Condição de espera não atingida (lote JS): {aviso}", "WARN")
+        if resp.get("erro"):
+            m["erro_lote"] = resp["erro"]
+            log(f"Lote JS parou em {feitas}/{len(roteiro)} ({resp['erro']}) — seguindo elemento a elemento.", "WARN")
+    return feitas
+
+
+# =========================================================
+# ========== SELENIUM: CACHE DE LOCALIZADORES ==============
+# =========================================================
+# Com `interagir_elementos(..., pagina="Recebidos")`, o localizador que de fato
+# funcionou para cada ação fica em estado/localizadores.json:
+#   - se o elemento tem um id estável e único na página, a próxima execução
+#     usa //*[@id='...'] direto, sem depender de índice;
+#   - senão, guarda o índice "n" resolvido para ações com "n": "auto" (primeiro
+#     elemento visível e habilitado entre os que casam com o xpath).
+# Um localizador em cache que não aparece em poucos segundos é descartado e a
+# busca original refeita.
+USAR_CACHE_LOCALIZADORES = True
+ESPERA_LOCALIZADOR_CACHE_S = 5
+
+# ids gerados (numeração, hashes, prefixos de frameworks) não são estáveis entre sessões
+_JS_ID_ESTAVEL = r"""
+const id = arguments[0].id;
+if (!id || /['"]/.test(id) || /\d{4,}|[0-9a-f]{8,}|^(ext-|ember|ui-id-|react|mui-|:r)/i.test(id)) return null;
+return document.querySelectorAll('[id="' + id + '"]').length === 1 ? id : null;
+"""
+
+_CACHE_LOCALIZADORES = None
+_LOCK_CACHE_LOCALIZADORES = Lock()
+
+
+class CacheLocalizadores:
+    """Localizadores resolvidos por página/ação, persistidos em JSON (estado/localizadores.json)."""
+
+    def __init__(self, caminho: Optional[str] = None) -> None:
+        self.caminho = caminho or os.path.join(get_estado_dir(), "localizadores.json")
+        self._lock = Lock()
+        self.paginas: Dict[str, Dict[str, dict]] = {}
+        if os.path.exists(self.caminho):
+            try:
+                with open(self.caminho, encoding="utf-8") as f:
+                    self.paginas = json.load(f)
+            except (OSError, ValueError) as e:
+                log(f"Cache de localizadores ilegível ({e}) — recomeçando do zero.", "WARN")
+
+    @staticmethod
+    def chave(xpath: str, n) -> str:
+        return xpath if n is None else f"{xpath}#{n}"
+
+    def obter(self, pagina: str, chave: str) -> Optional[dict]:
+        return self.paginas.get(pagina, {}).get(chave)
+
+    def registrar(self, pagina: str, chave: str, xpath: str, n: Optional[int]) -> None:
+        with self._lock:
+            self.paginas.setdefault(pagina, {})[chave] = {
+                "xpath": xpath, "n": n, "atualizado": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._salvar()
+
+    def esquecer(self, pagina: str, chave: str) -> None:
+        with self._lock:
+            if self.paginas.get(pagina, {}).pop(chave, None) is not None:
+                self._salvar()
+
+    def _salvar(self) -> None:
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self.paginas, f, ensure_ascii=False, indent=1)
+        os.replace(temporario, self.caminho)
+
+
+def cache_localizadores() -> CacheLocalizadores:
+    """Cache de localizadores do processo (carregado na primeira chamada)."""
+    global _CACHE_LOCALIZADORES
+    with _LOCK_CACHE_LOCALIZADORES:
+        if _CACHE_LOCALIZADORES is None:
+            _CACHE_LOCALIZADORES = CacheLocalizadores()
+        return _CACHE_LOCALIZADORES
+
+
+def _localizar_elemento(driver, xpath: str, n, timeout: float):
+    """Devolve (elemento, índice usado). `n` pode ser None, um índice ou "auto"."""
+    if n is None:
+        elemento = WebDriverWait(driver, min(timeout, 10)).until(
+            EC.visibility_of_element_located((By.XPATH, xpath))
+        )
+        return elemento, None
+
+    elementos = WebDriverWait(driver, min(timeout, 15)).until(
+        EC.presence_of_all_elements_located((By.XPATH, xpath))
+    )
+    if n == "auto":
+        def primeiro_interativo(d):
+            for i, el in enumerate(d.find_elements(By.XPATH, xpath)):
+                if el.is_displayed() and el.is_enabled():
+                    return el, i
+            return False
+        return WebDriverWait(driver, min(timeout, 10)).until(primeiro_interativo)
+
+    if not elementos or n >= len(elementos):
+        raise TimeoutException(f"Número insuficiente de elementos para {xpath}: len={len(elementos)} < n={n}")
+    elemento = elementos[n]
+    WebDriverWait(driver, min(timeout, 10)).until(lambda d: elemento.is_displayed() and elemento.is_enabled())
+    return elemento, n
+
+
+def _localizador_resolvido(driver, elemento, xpath: str, n, n_usado) -> Optional[Tuple[str, Optional[int]]]:
+    """(xpath, n) a guardar no cache, ou None se não acrescenta nada ao localizador original."""
+    try:
+        id_estavel = driver.execute_script(_JS_ID_ESTAVEL, elemento)
+    except Exception:
+        id_estavel = None
+    if id_estavel:
+        resolvido = (f"//*[@id='{id_estavel}']", None)
+        return None if resolvido == (xpath, None) else resolvido
+    return (xpath, n_usado) if n == "auto" else None
+
+
+# =========================================================
+# ========== SELENIUM: INTERAÇÕES ==========================
+# =========================================================
+def interagir_elementos(
+    driver,
+    acoes: List[Dict[str, Optional[str]]],
+    max_retries: int = 3,
+    timeout: int = 55,
+    delay_apos_acao: float = 1,
+    lote_js: Optional[bool] = None,
+    pagina: Optional[str] = None,
+) -> None:
+    """Executa múltiplas ações sequenciais em elementos Selenium, com robustez contra bloqueios.
+
+    Cada ação é um dict com "xpath", "acao" ("clicar"/"digitar"), "texto", "n"
+    (índice quando o xpath casa vários elementos; "auto" = primeiro visível e
+    habilitado) e "descricao". A chave opcional
+    "esperar" lista condições a aguardar após a ação, no lugar do `delay_apos_acao`:
+
+        {"tipo": "aparecer", "xpath": ...}   elemento ficou visível
+        {"tipo": "sumir", "xpath": ...}      elemento sumiu/ficou oculto
+        {"tipo": "spinner"}                  indicadores de carregamento sumiram
+        {"tipo": "rede_ociosa"}              sem AJAX/recursos novos por ~400 ms
+        {"tipo": "url", "contem": ...}       URL mudou (ou passou a conter o texto)
+
+    Cada condição aceita "timeout" próprio. `"esperar": []` segue sem espera alguma.
+
+    Com `lote_js=True` (padrão: ACOES_EM_LOTE_JS), trechos de ações consecutivas
+    rodam num único script na página (`executar_acoes_em_lote`); se o script
+    falhar, as ações restantes do trecho seguem pelo caminho elemento a elemento.
+
+    Com `pagina`, os localizadores resolvidos (id estável, índice de "n": "auto")
+    ficam no cache de localizadores e são usados primeiro nas próximas execuções.
+    """
+    if lote_js is None:
+        lote_js = ACOES_EM_LOTE_JS
+    if lote_js:
+        for em_lote, trecho in _trechos_de_acoes(acoes, True):
+            if em_lote:
+                trecho = trecho[executar_acoes_em_lote(driver, trecho, timeout, delay_apos_acao):]
+            if trecho:
+                interagir_elementos(driver, trecho, max_retries, timeout, delay_apos_acao, lote_js=False, pagina=pagina)
+        return
+    cache = cache_localizadores() if pagina and USAR_CACHE_LOCALIZADORES else None
+
+    for item in acoes:
+        xpath = item.get("xpath")
+        acao = item.get("acao", "clicar")
+        texto = item.get("texto")
+        n = item.get("n")
+        descricao = item.get("descricao", xpath)
+        condicoes = item.get("esperar")
+        chave_cache = CacheLocalizadores.chave(xpath, n)
+        salvo = cache.obter(pagina, chave_cache) if cache else None
+
+        def aguardar_apos_acao(url_antes: str) -> None:
+            if condicoes is not None:
+                aguardar_condicoes(driver, condicoes, url_antes, timeout=min(timeout, 30))
+            elif delay_apos_acao:
+                esperar(delay_apos_acao)
+
+        with medir("acao", descricao=descricao, tipo=acao) as m:
+            for tentativa in range(1, max_retries + 1):
+                m["tentativas"] = tentativa
+                try:
+                    elemento = resolvido = None
+                    if salvo:
+                        try:
+                            elemento, _ = _localizar_elemento(
+                                driver, salvo["xpath"], salvo["n"], min(timeout, ESPERA_LOCALIZADOR_CACHE_S)
+                            )
+                            m["cache"] = True
+                        except (TimeoutException, StaleElementReferenceException):
+                            log(f"Localizador em cache não serviu para {descricao} — refazendo a busca.", "WARN")
+                            cache.esquecer(pagina, chave_cache)
+                            salvo = None
+                    if elemento is None:
+                        elemento, n_usado = _localizar_elemento(driver, xpath, n, timeout)
+                        if cache:
+                            resolvido = _localizador_resolvido(driver, elemento, xpath, n, n_usado)
+
+                    # ====== AÇÃO PRINCIPAL ======
+                    url_antes = driver.current_url if condicoes else ""
+                    if acao == "clicar":
+                        try:
+                            elemento.click()
+                            #log(f"Clique realizado: {descricao}", "INFO")
+                        except (ElementClickInterceptedException, ElementNotInteractableException):
+                            log(f"Tentativa {tentativa} falhou: {descricao} (bloqueado)", "WARN")
+                            fechar_avisos(driver)
+                            time.sleep(0.5)
+                            driver.execute_script("window.scrollBy(0, -120);")
+                            time.sleep(0.5)
+                            elemento = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, xpath)))
+                            elemento.click()
+                            log(f"Clique refeito após scroll: {descricao}", "INFO")
+                        aguardar_apos_acao(url_antes)
+                    elif acao == "digitar":
+                        elemento.clear()
+                        elemento.send_keys(texto)
+                        aguardar_apos_acao(url_antes)
+                        #log(f"Texto digitado em: {descricao}", "INFO")
+                    else:
+                        continue
+
+                    if resolvido:
+                        cache.registrar(pagina, chave_cache, *resolvido)
+                    break
+
+                except (TimeoutException, StaleElementReferenceException):
+                    fechar_avisos(driver)
+                    if tentativa == max_retries:
+                        log(f"Falha definitiva em {descricao}", "ERRO")
+                        raise
+                    else:
+                        tempo_espera = 0.5 * tentativa
+                        log(f"Tentativa {tentativa} falhou: {descricao}, aguardando {tempo_espera:.1f}s", "WARN")
+                        time.sleep(tempo_espera)
+
+                except Exception as e:
+                    log(f"Erro inesperado em {descricao}: {e}", "ERRO")
+                    fechar_avisos(driver)
+                    if tentativa == max_retries:
+                        raise
+                    time.sleep(0.5)
+
+
+
+
+# =========================================================
+# ========== LOGIN PADRÃO CODONTO ==========================
+# =========================================================
+
+URL_CODONTO = "https://codonto.aplicativo.net/"
+XPATH_TELA_LOGIN = "//input[@id='login']"
+
+
+@medido("login")
+def realizar_login_codonto(driver, usuario: str, senha: str) -> None:
+    """Executa login no sistema Codonto com credenciais fornecidas."""
+    acoes_login = [
+        {"xpath": XPATH_TELA_LOGIN, "acao": "digitar", "texto": usuario, "descricao": "Campo Usuário", "esperar": []},
+        {"xpath": "//input[@id='pass']", "acao": "digitar", "texto": senha, "descricao": "Campo Senha", "esperar": []},
+        {"xpath": "//input[@id='checkTermsOfUse']", "descricao": "Termos de Uso", "esperar": []},
+        {"xpath": "//button[@id='btnSubmit']", "acao": "clicar", "descricao": "Botão Entrar",
+         "esperar": [{"tipo": "sumir", "xpath": XPATH_TELA_LOGIN}, {"tipo": "rede_ociosa"}]},
+    ]
+    interagir_elementos(driver, acoes_login)
+
+
+# =========================================================
+# ========== POOL DE SESSÕES LOGADAS =======================
+# =========================================================
+
+def definir_pasta_download(driver, pasta_download: str) -> None:
+    """Redireciona os downloads de um navegador já aberto para outra pasta (via CDP)."""
+    if eventos_download_ativos(driver):
+        ativar_eventos_download(driver, pasta_download)
+        return
+    os.makedirs(pasta_download, exist_ok=True)
+    driver.execute_cdp_cmd(
+        "Page.setDownloadBehavior",
+        {"behavior": "allow", "downloadPath": os.path.abspath(pasta_download)},
+    )
+
+
+def sessao_ativa(driver) -> bool:
+    """Verifica se o navegador responde e não caiu de volta na tela de login.
+
+    Retorna False se o chromedriver morreu (qualquer comando falha) ou se o
+    formulário de login está visível (sessão expirada/deslogada).
+    """
+    try:
+        _ = driver.current_url
+        campos_login = driver.find_elements(By.XPATH, XPATH_TELA_LOGIN)
+        return not any(c.is_displayed() for c in campos_login)
+    except Exception:
+        return False
+
+
+class _SessaoPool:
+    """Navegador logado mantido pelo pool, com contadores para reciclagem."""
+
+    def __init__(self, driver) -> None:
+        self.driver = driver
+        self.criado_em = time.time()
+        self.usos = 0
+
+
+class PoolSessoesCodonto:
+    """Pool de navegadores já autenticados no Codonto, reaproveitados entre automações.
+
+    O pool cria no máximo `tamanho` navegadores. Cada sessão é verificada antes
+    de ser entregue (`sessao_ativa`) e descartada após `max_usos` usos ou
+    `max_minutos` de vida.
+
+    Uso:
+        pool = PoolSessoesCodonto(usuario, senha, tamanho=2)
+        with pool.sessao(pasta_download) as driver:
+            executar_recebidos(usuario, senha, ini, fim, driver=driver)
+        pool.encerrar()
+    """
+
+    def __init__(
+        self,
+        usuario: str,
+        senha: str,
+        tamanho: int = 1,
+        max_usos: int = 5,
+        max_minutos: float = 20,
+        zoom: float = 0.8,
+        pasta_download: Optional[str] = None,
+    ) -> None:
+        self.usuario = usuario
+        self.senha = senha
+        self.tamanho = max(1, tamanho)
+        self.max_usos = max_usos
+        self.max_minutos = max_minutos
+        self.zoom = zoom
+        self.pasta_download = pasta_download or get_downloads_dir()
+        self._livres: List[_SessaoPool] = []
+        self._em_uso: Dict[int, _SessaoPool] = {}
+        self._lock = Lock()
+        self._vagas = BoundedSemaphore(self.tamanho)
+        self._encerrado = False
+
+    # ---------- ciclo de vida de uma sessão ----------
+    def _criar_sessao(self) -> _SessaoPool:
+        driver = iniciar_chrome(url_inicial=URL_CODONTO, zoom=self.zoom, pasta_download=self.pasta_download)
+        try:
+            realizar_login_codonto(driver, self.usuario, self.senha)
+        except Exception:
+            fechar_navegador_assincrono(driver)
+            raise
+        log("🔐 Nova sessão logada adicionada ao pool", "INFO")
+        return _SessaoPool(driver)
+
+    def _expirada(self, sessao: _SessaoPool) -> bool:
+        if sessao.usos >= self.max_usos:
+            return True
+        return (time.time() - sessao.criado_em) / 60 >= self.max_minutos
+
+    def _descartar(self, sessao: _SessaoPool, motivo: str) -> None:
+        log(f"♻️ Sessão do pool reciclada ({motivo})", "INFO")
+        fechar_navegador_assincrono(sessao.driver)
+
+    # ---------- API pública ----------
+    def obter(self, pasta_download: Optional[str] = None):
+        """Entrega um driver logado, pronto na página inicial do Codonto.
+
+        Bloqueia enquanto todas as `tamanho` sessões estiverem em uso.
+        """
+        if self._encerrado:
+            raise RuntimeError("Pool de sessões já encerrado.")
+        self._vagas.acquire()
+        try:
+            while True:
+                with self._lock:
+                    sessao = self._livres.pop() if self._livres else None
+                if sessao is None:
+                    sessao = self._criar_sessao()
+                elif self._expirada(sessao):
+                    self._descartar(sessao, f"{sessao.usos} usos")
+                    continue
+                else:
+                    try:
+                        sessao.driver.get(URL_CODONTO)
+                    except Exception:
+                        pass
+                    if not sessao_ativa(sessao.driver):
+                        self._descartar(sessao, "deslogada ou sem resposta")
+                        continue
+                    try:
+                        sessao.driver.execute_script(f"document.body.style.zoom = '{self.zoom}'")
+                    except Exception:
+                        pass
+
+                if pasta_download:
+                    definir_pasta_download(sessao.driver, pasta_download)
+                sessao.usos += 1
+                with self._lock:
+                    self._em_uso[id(sessao.driver)] = sessao
+                return sessao.driver
+        except Exception:
+            self._vagas.release()
+            raise
+
+    def devolver(self, driver, descartar: bool = False) -> None:
+        """Devolve o driver ao pool; com `descartar=True` o navegador é fechado."""
+        with self._lock:
+            sessao = self._em_uso.pop(id(driver), None)
+        if sessao is None:
+            return
+        try:
+            if descartar or self._encerrado:
+                self._descartar(sessao, "falha na automação" if descartar else "pool encerrado")
+            elif self._expirada(sessao):
+                self._descartar(sessao, f"{sessao.usos} usos")
+            else:
+                with self._lock:
+                    self._livres.append(sessao)
+        finally:
+            self._vagas.release()
+
+    @contextmanager
+    def sessao(self, pasta_download: Optional[str] = None):
+        """Context manager que obtém e devolve um driver (descartando em caso de erro)."""
+        driver = self.obter(pasta_download)
+        try:
+            yield driver
+        except Exception:
+            self.devolver(driver, descartar=True)
+            raise
+        else:
+            self.devolver(driver)
+
+    def aquecer(self) -> int:
+        """Deixa o pool com `tamanho` sessões livres e logadas (ex.: antes de uma execução agendada).
+
+        Descarta as ociosas expiradas ou deslogadas e abre as que faltam.
+        Devolve quantas sessões novas foram criadas.
+        """
+        if self._encerrado:
+            raise RuntimeError("Pool de sessões já encerrado.")
+        with self._lock:
+            livres, self._livres = self._livres, []
+        validas = []
+        for sessao in livres:
+            if self._expirada(sessao):
+                self._descartar(sessao, f"{sessao.usos} usos")
+                continue
+            try:
+                sessao.driver.get(URL_CODONTO)   # também serve de keep-alive da sessão no servidor
+            except Exception:
+                pass
+            if sessao_ativa(sessao.driver):
+                validas.append(sessao)
+            else:
+                self._descartar(sessao, "deslogada ou sem resposta")
+
+        novas = []
+        try:
+            for _ in range(self.tamanho - len(validas) - len(self._em_uso)):
+                novas.append(self._criar_sessao())
+        finally:
+            with self._lock:
+                self._livres.extend(validas + novas)
+        return len(novas)
+
+    def encerrar(self) -> None:
+        """Fecha todos os navegadores ociosos; os em uso fecham ao serem devolvidos."""
+        self._encerrado = True
+        with self._lock:
+            livres, self._livres = self._livres, []
+        for sessao in livres:
+            fechar_navegador_assincrono(sessao.driver)
+        if livres:
+            log(f"Pool de sessões encerrado ({len(livres)} navegadores fechados)", "OK")
+
+# =========================================================
+# ========== EXPORTAÇÃO DIRETA VIA HTTP ====================
+# =========================================================
+#
+# Cada automação pode declarar um EXPORT_HTTP com o endpoint chamado pelo botão
+# "Download em formato Excel" (copiado da aba Network do DevTools), por exemplo:
+#
+#     EXPORT_HTTP = {
+#         "url": "https://codonto.aplicativo.net/<endpoint de exportação>",
+#         "metodo": "GET",                       # ou "POST" (form-urlencoded)
+#         "params": {"DataInicio": "{data_inicio}", "DataTermino": "{data_fim}"},
+#     }
+#
+# Os valores de "params" aceitam os marcadores {data_inicio} e {data_fim}
+# (dd/mm/aaaa). Sem EXPORT_HTTP, ou se a chamada falhar, vale o fluxo Selenium.
+
+# Login HTTP direto (opcional). Sem "url", os cookies vêm de um login Selenium.
+LOGIN_HTTP_CODONTO = {
+    "url": None,
+    "campos": {"usuario": "login", "senha": "pass", "extras": {"checkTermsOfUse": "on"}},
+}
+
+_SESSAO_HTTP = None
+_LOCK_SESSAO_HTTP = Lock()
+
+
+class ErroSessaoHttp(RuntimeError):
+    """A resposta indica sessão expirada (ex.: voltou a página de login em HTML)."""
+
+
+def criar_sessao_http(cookies: Optional[List[dict]] = None, user_agent: Optional[str] = None):
+    """Cria um opener urllib com cookie jar, opcionalmente populado com cookies do Selenium."""
+    jar = http.cookiejar.CookieJar()
+    for c in cookies or []:
+        jar.set_cookie(http.cookiejar.Cookie(
+            version=0, name=c["name"], value=c["value"], port=None, port_specified=False,
+            domain=c.get("domain", ""), domain_specified=bool(c.get("domain")),
+            domain_initial_dot=c.get("domain", "").startswith("."),
+            path=c.get("path", "/"), path_specified=True, secure=c.get("secure", False),
+            expires=c.get("expiry"), discard=False, comment=None, comment_url=None, rest={},
+        ))
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    opener.addheaders = [("User-Agent", user_agent or "Mozilla/5.0")]
+    return opener
+
+
+def sessao_http_de_driver(driver):
+    """Copia cookies e User-Agent de um navegador logado para uma sessão HTTP."""
+    try:
+        user_agent = driver.execute_script("return navigator.userAgent")
+    except Exception:
+        user_agent = None
+    return criar_sessao_http(driver.get_cookies(), user_agent)
+
+
+def login_http_codonto(usuario: str, senha: str, config: Optional[dict] = None):
+    """Faz login no Codonto só com HTTP (form POST), sem abrir navegador."""
+    config = config or LOGIN_HTTP_CODONTO
+    campos = config["campos"]
+    dados = {campos["usuario"]: usuario, campos["senha"]: senha, **campos.get("extras", {})}
+    sessao = criar_sessao_http()
+    with sessao.open(config["url"], data=urllib.parse.urlencode(dados).encode(), timeout=30) as resp:
+        resp.read()
+    return sessao
+
+
+def obter_sessao_http(usuario: str, senha: str, driver=None, renovar: bool = False):
+    """Retorna a sessão HTTP compartilhada, criando-a na primeira chamada.
+
+    Ordem: cookies do `driver` informado → login HTTP (se configurado) →
+    um login Selenium descartável só para obter os cookies.
+    """
+    global _SESSAO_HTTP
+    with _LOCK_SESSAO_HTTP:
+        if _SESSAO_HTTP is not None and not renovar:
+            return _SESSAO_HTTP
+
+        if driver is not None and sessao_ativa(driver):
+            _SESSAO_HTTP = sessao_http_de_driver(driver)
+        elif LOGIN_HTTP_CODONTO.get("url"):
+            _SESSAO_HTTP = login_http_codonto(usuario, senha)
+        else:
+            driver_tmp = iniciar_chrome(url_inicial=URL_CODONTO)
+            try:
+                realizar_login_codonto(driver_tmp, usuario, senha)
+                _SESSAO_HTTP = sessao_http_de_driver(driver_tmp)
+            finally:
+                fechar_navegador_assincrono(driver_tmp)
+        log("🍪 Sessão HTTP do Codonto pronta", "INFO")
+        return _SESSAO_HTTP
+
+
+def _nome_arquivo_resposta(resp, nome_padrao: str) -> str:
+    """Extrai o nome do arquivo do Content-Disposition (ou usa o padrão do relatório)."""
+    nome = resp.headers.get_filename()
+    if not nome:
+        nome = f"{nome_padrao}.xlsx"
+    return os.path.basename(nome)
+
+
+def baixar_relatorio_http(
+    sessao,
+    export_conf: dict,
+    data_inicio: str,
+    data_fim: str,
+    pasta_download: str,
+    nome_padrao: str,
+    timeout: int = 120,
+) -> str:
+    """Chama o endpoint de exportação e grava o xlsx em disco em blocos (streaming).
+
+    Raises:
+        ErroSessaoHttp: Se o servidor responder HTML (sessão expirada/login).
+        urllib.error.URLError: Em falhas de rede, status HTTP de erro ou download
+            incompleto (o `.part` é apagado antes de propagar).
+    """
+    params = {k: str(v).format(data_inicio=data_inicio, data_fim=data_fim)
+              for k, v in export_conf.get("params", {}).items()}
+    corpo = urllib.parse.urlencode(params)
+    url = export_conf["url"]
+
+    if export_conf.get("metodo", "GET").upper() == "POST":
+        req = urllib.request.Request(url, data=corpo.encode(), method="POST")
+    else:
+        req = urllib.request.Request(f"{url}{'&' if '?' in url else '?'}{corpo}" if corpo else url)
+
+    os.makedirs(pasta_download, exist_ok=True)
+    with sessao.open(req, timeout=timeout) as resp:
+        if "text/html" in (resp.headers.get("Content-Type") or ""):
+            raise ErroSessaoHttp("Exportação retornou HTML — sessão provavelmente expirada.")
+
+        destino = os.path.join(pasta_download, _nome_arquivo_resposta(resp, nome_padrao))
+        temporario = destino + ".part"
+        try:
+            with open(temporario, "wb") as f:
+                shutil.copyfileobj(resp, f, length=1024 * 1024)
+                esperado = resp.headers.get("Content-Length")
+                if esperado and esperado.isdigit() and f.tell() < int(esperado):
+                    raise urllib.error.ContentTooShortError(
+                        f"Download incompleto: {f.tell()} de {esperado} bytes.", None)
+        except BaseException:
+            # download interrompido: não deixa o .part para trás antes do fallback Selenium
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            raise
+    os.replace(temporario, destino)
+    return destino
+
+
+@medido("export_http")
+def tentar_export_http(
+    usuario: str,
+    senha: str,
+    data_inicio: str,
+    data_fim: str,
+    pasta_download: str,
+    export_conf: Optional[dict],
+    nome_padrao: str,
+    driver=None,
+) -> Optional[str]:
+    """Tenta baixar o relatório direto por HTTP; retorna None para cair no fluxo Selenium."""
+    if not export_conf or not export_conf.get("url"):
+        return None
+
+    for tentativa in (1, 2):
+        try:
+            sessao = obter_sessao_http(usuario, senha, driver=driver, renovar=tentativa > 1)
+            caminho = baixar_relatorio_http(sessao, export_conf, data_inicio, data_fim, pasta_download, nome_padrao)
+            log(f"⬇️ {os.path.basename(caminho)} baixado via HTTP direto", "OK")
+            return caminho
+        except ErroSessaoHttp as e:
+            log(f"{e} Renovando sessão...", "WARN")
+        except Exception as e:
+            log(f"Exportação HTTP falhou ({e}) — usando Selenium.", "WARN")
+            return None
+    log("Sessão HTTP recusada após renovação — usando Selenium.", "WARN")
+    return None
+
+
+# =========================================================
+# ========== RELATÓRIOS DECLARATIVOS (MOTOR GENÉRICO) ======
+# =========================================================
+#
+# Cada relatório do Codonto é descrito por um dict e executado por
+# `executar_relatorio` (login, navegação, filtros, exportação, espera do
+# arquivo e ETL). Exemplo:
+#
+#     RELATORIO = {
+#         "nome": "Recebidos",                       # logs e chave do cache de localizadores
+#         "preparo": [...],                          # opcional: ações + driver.refresh() antes do menu
+#         "menu": [...],                             # ações até a tela do relatório
+#         "filtros": [                               # "texto" aceita {data_inicio} e {data_fim}
+#             {"xpath": "//span[@title='Mostrar Período']", "n": "auto", "descricao": "Mostrar Período"},
+#             {"xpath": "//input[@name='...Inicio']", "acao": "digitar", "texto": "{data_inicio}", ...},
+#         ],
+#         "exportar": [...],                         # botão de exportação e confirmação
+#         "arquivo": "ControleODONTO Fluxo de Caixa",  # substring do nome do arquivo baixado
+#         "regex_arquivo": None,                     # opcional
+#         "timeout_download": 45,                    # opcional
+#         "intervalo_polls": 0.2,                    # opcional
+#         "export_http": None,                       # opcional (EXPORTAÇÃO DIRETA VIA HTTP)
+#         "etl": ETL_CONFIG,
+#     }
+#
+# As ações seguem o formato de `interagir_elementos`; "n": "auto" deixa o motor
+# descobrir o índice uma vez e guardá-lo no cache de localizadores.
+#
+# Relatório novo: um módulo em automations/ com RELATORIO + ETL_CONFIG e um
+# `executar_*` que chama `executar_relatorio(RELATORIO, ...)`; depois é só
+# registrar em AUTOMACOES (manager.py).
+CHAVES_RELATORIO = ("nome", "menu", "filtros", "exportar", "arquivo", "etl")
+
+
+def validar_relatorio(relatorio: dict) -> None:
+    """Levanta ValueError se faltar alguma chave obrigatória na definição do relatório."""
+    faltando = [c for c in CHAVES_RELATORIO if c not in relatorio]
+    if faltando:
+        raise ValueError(f"Relatório {relatorio.get('nome', '?')!r} sem as chaves: {', '.join(faltando)}")
+
+
+def _preencher_periodo(acoes: List[Dict], data_inicio: str, data_fim: str) -> List[Dict]:
+    """Copia as ações trocando {data_inicio}/{data_fim} em "texto"."""
+    return [
+        {**a, "texto": a["texto"].format(data_inicio=data_inicio, data_fim=data_fim)}
+        if isinstance(a.get("texto"), str) else dict(a)
+        for a in acoes
+    ]
+
+
+def executar_relatorio(
+    relatorio: dict,
+    usuario: str,
+    senha: str,
+    data_inicio: str,
+    data_fim: str,
+    zoom: float = 0.8,
+    pasta_download: Optional[str] = None,
+    driver=None,
+    rodar_etl: bool = True,
+):
+    """
+    Executa a automação descrita por `relatorio` (ver RELATÓRIOS DECLARATIVOS).
+    Retorna o dicionário de resposta do ETL.
+    Com rodar_etl=False, retorna apenas o caminho do arquivo baixado.
+    """
+    validar_relatorio(relatorio)
+    nome = relatorio["nome"]
+    if not pasta_download:
+        pasta_download = get_downloads_dir()
+        log("⚠️ pasta_download não informado — usando padrão.", "WARN")
+
+    # Exportação direta por HTTP (sem navegador), quando "export_http" estiver configurado
+    caminho_arquivo = tentar_export_http(
+        usuario, senha, data_inicio, data_fim, pasta_download, relatorio.get("export_http"), relatorio["arquivo"],
+        driver=driver,
+    )
+
+    if not caminho_arquivo:
+        # Driver externo (ex.: PoolSessoesCodonto) já vem logado e não é fechado aqui
+        driver_proprio = driver is None
+        if driver_proprio:
+            driver = iniciar_chrome(url_inicial=URL_CODONTO, zoom=zoom, pasta_download=pasta_download)
+
+        try:
+            if driver_proprio:
+                realizar_login_codonto(driver, usuario, senha)
+
+            if relatorio.get("preparo"):
+                interagir_elementos(driver, relatorio["preparo"], pagina=nome)
+                driver.refresh()
+
+            # Navegação e filtros
+            acoes_fluxo = relatorio["menu"] + _preencher_periodo(relatorio["filtros"], data_inicio, data_fim)
+            interagir_elementos(driver, acoes_fluxo, pagina=nome)
+
+            # Download
+            snap_antes = preparar_espera_download(driver, pasta_download)
+            interagir_elementos(driver, relatorio["exportar"], pagina=nome)
+            caminho_arquivo = aguardar_download(
+                driver,
+                pasta_download=pasta_download,
+                snapshot_anterior=snap_antes,
+                nome_substring=relatorio["arquivo"],
+                regex_nome=relatorio.get("regex_arquivo"),
+                timeout=relatorio.get("timeout_download", 45),
+                intervalo_polls=relatorio.get("intervalo_polls", 0.2),
+            )
+        except Exception as e:
+            log(f"❌ Falha geral em {nome}: {e}", "ERRO")
+            if driver_proprio:
+                driver.quit()
+            raise
+
+        if driver_proprio:
+            fechar_navegador_assincrono(driver, timeout=3.0)
+
+    # ETL e retorno
+    if not rodar_etl:
+        return caminho_arquivo
+    from etl.etl_manager import rodar_etl_generico
+    return rodar_etl_generico(caminho_arquivo, relatorio["etl"])
+
+
+# =========================================================
+# ========== FUNÇÕES DE INPUT VALIDADO ====================
+# =========================================================
+def obter_opcao_usuario(
+    prompt: str,
+    opcoes_validas: list[str],
+    mensagem_erro: str = "Opção inválida, tente novamente."
+) -> str:
+    """Solicita uma entrada ao usuário e garante que seja uma das opções válidas.
+
+    Args:
+        prompt: Texto mostrado ao usuário.
+        opcoes_validas: Lista de strings com as opções permitidas.
+        mensagem_erro: Mensagem a exibir se o valor for inválido.
+
+    Returns:
+        A opção digitada, garantidamente válida.
+    """
+    while True:
+        resposta = input(prompt).strip()
+        if resposta in opcoes_validas:
+            return resposta
+        log(mensagem_erro, "WARN")
+
+
+def obter_lista_de_opcoes(
+    prompt: str,
+    opcoes_validas: list[str],
+    mensagem_erro: str = "Entrada inválida, tente novamente."
+) -> list[str]:
+    """Solicita ao usuário uma lista de números separados por vírgula e valida.
+
+    Args:
+        prompt: Texto mostrado ao usuário.
+        opcoes_validas: Lista de opções numéricas válidas (ex: ['1','2','3']).
+        mensagem_erro: Mensagem de erro em caso de opções fora do permitido.
+
+    Returns:
+        Lista de strings contendo as opções válidas digitadas.
+    """
+    while True:
+        entrada = input(prompt).strip()
+        if not entrada:
+            log("Nenhuma opção digitada.", "WARN")
+            continue
+
+        escolhas = [x.strip() for x in entrada.split(",") if x.strip()]
+        escolhas_validas = [e for e in escolhas if e in opcoes_validas]
+
+        if not escolhas_validas:
+            log(mensagem_erro, "WARN")
+            continue
+
+        return escolhas_validas
+
+# =========================================================
+# ========== GERENCIADORES DE EXECUÇÃO (MODOS) ============
+# =========================================================
+
+# =========================================================
+# ========== UTILITÁRIO DE TEXTO PARA LOGS ================
+# =========================================================
+def periodo_str(data_inicio: datetime, data_fim: datetime) -> str:
+    """Formata período em string curta."""
+    return f"{data_inicio.strftime('%d/%m/%Y')} → {data_fim.strftime('%d/%m/%Y')}"
+
+
+# =========================================================
+# ========== ESTADO LOCAL: WATERMARKS (SQLite) =============
+# =========================================================
+# Watermark e manifesto de downloads só avançam quando a resposta do ETL conta
+# como upload verificado (`_upload_verificado`). Vale, nesta ordem:
+#   - flag explícita: "sucesso" / "ok" / "upload_ok" (bool) ou "status" ("ok");
+#   - "erro" preenchido ou "linhas_carregadas" diferente de "linhas": falha;
+#   - "linhas" inteiro > 0, ou o arquivo tratado ("arquivo_final", "csv_path" ou
+#     "parquet_path") existente em disco — é o que `rodar_etl_generico` devolve
+#     hoje, e ele levanta exceção se o upload falha.
+# Só "original_path" (o xlsx de entrada) não basta.
+_LOCK_ESTADO_DB = Lock()
+
+
+def conectar_estado_db() -> sqlite3.Connection:
+    """Abre o banco SQLite de estado (estado/sincronizacao.db), criando as tabelas se preciso."""
+    conn = sqlite3.connect(os.path.join(get_estado_dir(), "sincronizacao.db"), timeout=30)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watermarks (
+            tabela          TEXT NOT NULL,
+            periodo_coluna  TEXT NOT NULL,
+            ultima_data     TEXT NOT NULL,
+            atualizado_em   TEXT NOT NULL,
+            PRIMARY KEY (tabela, periodo_coluna)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS manifesto_downloads (
+            automacao   TEXT NOT NULL,
+            periodo     TEXT NOT NULL,
+            sha256      TEXT NOT NULL,
+            tamanho     INTEGER NOT NULL,
+            usado_em    REAL NOT NULL,
+            PRIMARY KEY (automacao, periodo)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cargas_pendentes (
+            tabela          TEXT NOT NULL,
+            periodo_coluna  TEXT NOT NULL,
+            inicio          TEXT NOT NULL,
+            fim             TEXT NOT NULL,
+            PRIMARY KEY (tabela, periodo_coluna, inicio, fim)
+        )
+        """
+    )
+    return conn
+
+
+def obter_watermark(tabela: str, periodo_coluna: str) -> Optional[datetime]:
+    """Retorna a última data carregada com sucesso para (tabela, periodo_coluna), ou None."""
+    with _LOCK_ESTADO_DB:
+        conn = conectar_estado_db()
+        try:
+            linha = conn.execute(
+                "SELECT ultima_data FROM watermarks WHERE tabela = ? AND periodo_coluna = ?",
+                (tabela, periodo_coluna),
+            ).fetchone()
+        finally:
+            conn.close()
+    return datetime.strptime(linha[0], "%Y-%m-%d") if linha else None
+
+
+def atualizar_watermark(tabela: str, periodo_coluna: str, data) -> None:
+    """Avança o watermark para `data` (nunca retrocede)."""
+    nova = data.strftime("%Y-%m-%d")
+    with _LOCK_ESTADO_DB:
+        conn = conectar_estado_db()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO watermarks (tabela, periodo_coluna, ultima_data, atualizado_em)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (tabela, periodo_coluna) DO UPDATE SET
+                        ultima_data = MAX(ultima_data, excluded.ultima_data),
+                        atualizado_em = excluded.atualizado_em
+                    """,
+                    (tabela, periodo_coluna, nova, datetime.now().isoformat(timespec="seconds")),
+                )
+        finally:
+            conn.close()
+
+
+def periodo_incremental(etl_conf: dict, data_inicio, data_fim) -> Tuple[datetime, datetime]:
+    """Reduz o período ao intervalo desde o último carregamento, menos a janela de look-back.
+
+    Só vale para ETL_CONFIG com "incremental": True; o início nunca fica antes
+    do `data_inicio` pedido nem depois de `data_fim`.
+    """
+    data_inicio = pd.Timestamp(data_inicio).to_pydatetime()
+    data_fim = pd.Timestamp(data_fim).to_pydatetime()
+    if not etl_conf.get("incremental"):
+        return data_inicio, data_fim
+
+    watermark = obter_watermark(etl_conf["tabela"], etl_conf["periodo_coluna"])
+    if watermark is None:
+        return data_inicio, data_fim
+
+    inicio = watermark - pd.Timedelta(days=etl_conf.get("lookback_dias", 3))
+    inicio = min(max(data_inicio, inicio), data_fim)
+    return inicio, data_fim
+
+
+def _upload_verificado(resp_etl) -> bool:
+    """Confere a resposta de `rodar_etl_generico` antes de avançar o watermark.
+
+    Regras no cabeçalho da seção (ESTADO LOCAL: WATERMARKS). Qualquer outra
+    resposta conta como não verificada.
+    """
+    if not isinstance(resp_etl, dict) or not resp_etl:
+        return False
+    for chave in ("sucesso", "ok", "upload_ok"):
+        if chave in resp_etl:
+            return bool(resp_etl[chave])
+    if "status" in resp_etl:
+        return str(resp_etl["status"]).lower() in {"ok", "sucesso", "success"}
+    if resp_etl.get("erro"):
+        return False
+    linhas = resp_etl.get("linhas")
+    if linhas is not None:
+        if not pd.api.types.is_integer(linhas) or linhas <= 0:
+            return False
+        return resp_etl.get("linhas_carregadas", linhas) == linhas
+    return artefato_etl(resp_etl) is not None
+
+
+_LOCK_WATERMARK = Lock()
+
+
+def _guardar_carga_pendente(tabela: str, periodo_coluna: str, data_inicio: datetime, data_fim: datetime) -> None:
+    """Registra um período carregado que ainda não emenda com o watermark."""
+    with _LOCK_ESTADO_DB:
+        conn = conectar_estado_db()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO cargas_pendentes (tabela, periodo_coluna, inicio, fim) VALUES (?, ?, ?, ?)",
+                    (tabela, periodo_coluna, f"{data_inicio:%Y-%m-%d}", f"{data_fim:%Y-%m-%d}"),
+                )
+        finally:
+            conn.close()
+
+
+def _emendar_cargas_pendentes(tabela: str, periodo_coluna: str, watermark: datetime) -> datetime:
+    """Consome os períodos pendentes que passaram a emendar com `watermark`; devolve o novo watermark."""
+    with _LOCK_ESTADO_DB:
+        conn = conectar_estado_db()
+        try:
+            with conn:
+                while True:
+                    limite = f"{watermark + pd.Timedelta(days=1):%Y-%m-%d}"
+                    filtro = "tabela = ? AND periodo_coluna = ? AND inicio <= ?"
+                    fins = [f for (f,) in conn.execute(
+                        f"SELECT fim FROM cargas_pendentes WHERE {filtro}", (tabela, periodo_coluna, limite)
+                    )]
+                    if not fins:
+                        break
+                    conn.execute(f"DELETE FROM cargas_pendentes WHERE {filtro}", (tabela, periodo_coluna, limite))
+                    watermark = max(watermark, datetime.strptime(max(fins), "%Y-%m-%d"))
+        finally:
+            conn.close()
+    return watermark
+
+
+def registrar_carga_incremental(etl_conf: dict, data_inicio, data_fim, resp_etl) -> None:
+    """Avança o watermark após um upload verificado que emenda com o último carregamento.
+
+    Se o período carregado começa depois do watermark + 1 dia, há um buraco no
+    meio: o watermark não avança (senão os dias faltantes nunca seriam buscados)
+    e o período fica guardado como pendente. Quando o buraco é preenchido (ex.:
+    blocos de backfill que terminam fora de ordem), os pendentes que passam a
+    emendar entram no watermark.
+    """
+    if not etl_conf.get("incremental"):
+        return
+    if not _upload_verificado(resp_etl):
+        log(f"Watermark de {etl_conf['tabela']} mantido: upload não verificado.", "WARN")
+        return
+
+    tabela, coluna = etl_conf["tabela"], etl_conf["periodo_coluna"]
+    data_inicio = pd.Timestamp(data_inicio).to_pydatetime()
+    data_fim = pd.Timestamp(data_fim).to_pydatetime()
+    with _LOCK_WATERMARK:
+        watermark = obter_watermark(tabela, coluna)
+        if watermark is not None and data_fim <= watermark:
+            return
+        if watermark is not None and data_inicio > watermark + pd.Timedelta(days=1):
+            _guardar_carga_pendente(tabela, coluna, data_inicio, data_fim)
+            log(f"Watermark de {tabela} mantido: período não emenda com {watermark:%d/%m/%Y} "
+                f"(guardado até os dias anteriores chegarem).", "WARN")
+            return
+
+        novo = _emendar_cargas_pendentes(tabela, coluna, data_fim)
+        atualizar_watermark(tabela, coluna, novo)
+    log(f"Watermark de {tabela}.{coluna} → {novo:%d/%m/%Y}", "OK")
+
+
+# =========================================================
+# ========== ESTADO LOCAL: MANIFESTO DE HASHES ============
+# =========================================================
+MANIFESTO_MAX_DIAS = 60         # entradas sem uso há mais tempo são descartadas
+MANIFESTO_MAX_ENTRADAS = 2000   # acima disso, descarta as menos usadas recentemente
+
+
+def calcular_hash_arquivo(caminho: str, bloco: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 do arquivo lendo em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def _chave_periodo(data_inicio, data_fim) -> str:
+    return f"{data_inicio:%Y-%m-%d}_{data_fim:%Y-%m-%d}"
+
+
+def _expirar_manifesto(conn: sqlite3.Connection) -> None:
+    """Aplica a política de expiração por idade e por quantidade de entradas."""
+    limite = time.time() - MANIFESTO_MAX_DIAS * 86400
+    conn.execute("DELETE FROM manifesto_downloads WHERE usado_em < ?", (limite,))
+    conn.execute(
+        """
+        DELETE FROM manifesto_downloads WHERE rowid IN (
+            SELECT rowid FROM manifesto_downloads ORDER BY usado_em DESC LIMIT -1 OFFSET ?
+        )
+        """,
+        (MANIFESTO_MAX_ENTRADAS,),
+    )
+
+
+def arquivo_inalterado(automacao: str, data_inicio, data_fim, sha256: str) -> bool:
+    """True se o último arquivo carregado para (automação, período) tinha o mesmo hash."""
+    with _LOCK_ESTADO_DB:
+        conn = conectar_estado_db()
+        try:
+            with conn:
+                _expirar_manifesto(conn)
+                linha = conn.execute(
+                    "SELECT sha256 FROM manifesto_downloads WHERE automacao = ? AND periodo = ?",
+                    (automacao, _chave_periodo(data_inicio, data_fim)),
+                ).fetchone()
+                if linha and linha[0] == sha256:
+                    conn.execute(
+                        "UPDATE manifesto_downloads SET usado_em = ? WHERE automacao = ? AND periodo = ?",
+                        (time.time(), automacao, _chave_periodo(data_inicio, data_fim)),
+                    )
+                    return True
+        finally:
+            conn.close()
+    return False
+
+
+def registrar_hash_download(automacao: str, data_inicio, data_fim, sha256: str, tamanho: int) -> None:
+    """Grava o hash do arquivo carregado com sucesso para o período."""
+    with _LOCK_ESTADO_DB:
+        conn = conectar_estado_db()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO manifesto_downloads VALUES (?, ?, ?, ?, ?)",
+                    (automacao, _chave_periodo(data_inicio, data_fim), sha256, tamanho, time.time()),
+                )
+        finally:
+            conn.close()
+
+
+# =========================================================
+# ========== UPLOAD BIGQUERY (STAGING + MERGE) =============
+# =========================================================
+# ETL_CONFIG com "upload": "merge" troca o "apaga o período e sobe de novo"
+# (limpar_periodo) por: arquivo do ETL -> tabela de staging -> um MERGE que,
+# numa única instrução, apaga o período antigo e insere o novo. A tabela final
+# nunca fica vazia no meio do caminho. Várias automações podem juntar os
+# MERGEs num só job (LoteUploadBigQuery), dentro de uma transação.
+#
+# É opcional (desligado nas automações): só vale com um ETL que, chamado com
+# "upload": False e "limpar_periodo": False, não sobe nada e devolve o arquivo
+# tratado em "parquet_path", "arquivo_final" ou "csv_path". Exige também o
+# google-cloud-bigquery instalado.
+#
+# O cliente é injetável: qualquer objeto com get_table / load_table_from_dataframe /
+# query serve (ver teste/teste_upload_bigquery.py).
+
+FORMATO_DATA_TEXTO_BQ = "%d/%m/%Y"   # datas em texto do Codonto, ex.: 31/10/2025
+MAX_COLUNAS_CLUSTER_BQ = 4           # limite do BigQuery para CLUSTER BY
+
+_clientes_bigquery: Dict[tuple, object] = {}
+_lock_clientes_bigquery = Lock()
+
+
+def criar_cliente_bigquery(etl_conf: dict):
+    """Cliente google-cloud-bigquery das credenciais do ETL_CONFIG (reaproveitado entre chamadas)."""
+    chave = (etl_conf.get("credenciais_path"), etl_conf.get("projeto"))
+    with _lock_clientes_bigquery:
+        if chave not in _clientes_bigquery:
+            from google.cloud import bigquery
+
+            if chave[0]:
+                _clientes_bigquery[chave] = bigquery.Client.from_service_account_json(chave[0], project=chave[1])
+            else:
+                _clientes_bigquery[chave] = bigquery.Client(project=chave[1])
+        return _clientes_bigquery[chave]
+
+
+def _ref_tabela_bq(etl_conf: dict, tabela: Optional[str] = None) -> str:
+    return f"{etl_conf['projeto']}.{etl_conf['dataset']}.{tabela or etl_conf['tabela']}"
+
+
+def _obter_tabela_bq(cliente, ref: str):
+    """Tabela do BigQuery ou None se ainda não existe."""
+    try:
+        return cliente.get_table(ref)
+    except Exception as e:
+        if type(e).__name__ == "NotFound":
+            return None
+        raise
+
+
+def _expr_data_bq(coluna: str, tipo: str) -> str:
+    """Expressão SQL que devolve a coluna de período como DATE, conforme o tipo na tabela final."""
+    if tipo == "DATE":
+        return f"T.`{coluna}`"
+    if tipo in ("DATETIME", "TIMESTAMP"):
+        return f"DATE(T.`{coluna}`)"
+    return f"SAFE.PARSE_DATE('{FORMATO_DATA_TEXTO_BQ}', T.`{coluna}`)"
+
+
+def _coluna_periodo_para_data(serie: pd.Series, tipo: str) -> pd.Series:
+    """Ajusta a coluna de período do DataFrame ao tipo da tabela final (texto fica como está)."""
+    if tipo not in ("DATE", "DATETIME", "TIMESTAMP"):
+        return serie
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie
+    else:
+        datas = pd.to_datetime(serie.astype(str), format=FORMATO_DATA_TEXTO_BQ, errors="coerce")
+    return datas.dt.date if tipo == "DATE" else datas
+
+
+def ler_artefato_etl(caminho: str) -> pd.DataFrame:
+    """Lê o arquivo gerado pelo ETL (Parquet, CSV ou Excel)."""
+    ext = os.path.splitext(caminho)[1].lower()
+    if ext == ".parquet":
+        return pd.read_parquet(caminho)
+    if ext == ".csv":
+        return pd.read_csv(caminho)
+    return pd.read_excel(caminho)
+
+
+def artefato_etl(resp_etl) -> Optional[str]:
+    """Caminho do arquivo tratado na resposta do ETL (prefere Parquet)."""
+    if not isinstance(resp_etl, dict):
+        return None
+    for chave in ("parquet_path", "arquivo_final", "csv_path"):
+        caminho = resp_etl.get(chave)
+        if isinstance(caminho, str) and os.path.exists(caminho):
+            return caminho
+    return None
+
+
+def carregar_staging_bigquery(cliente, etl_conf: dict, df: pd.DataFrame, data_inicio, data_fim) -> dict:
+    """Sobe o DataFrame do ETL para uma tabela de staging e devolve a "carga" para o MERGE.
+
+    A coluna de período é convertida para o tipo que ela tem na tabela final
+    (DATE se a tabela ainda não existe, pois ela será criada particionada por ela).
+    """
+    coluna = etl_conf["periodo_coluna"]
+    ref = _ref_tabela_bq(etl_conf)
+    tabela = _obter_tabela_bq(cliente, ref)
+    if tabela is None:
+        tipo_periodo = "DATE"
+    else:
+        tipo_periodo = next((c.field_type for c in tabela.schema if c.name == coluna), "STRING")
+
+    df = df.copy()
+    df[coluna] = _coluna_periodo_para_data(df[coluna], tipo_periodo)
+
+    ref_staging = _ref_tabela_bq(etl_conf, f"_stg_{etl_conf['tabela']}_{uuid.uuid4().hex[:8]}")
+    with medir("staging_bigquery", tabela=etl_conf["tabela"], linhas=len(df)):
+        cliente.load_table_from_dataframe(df, ref_staging).result()
+
+    validacao = etl_conf.get("coluna_validacao")
+    soma = float(pd.to_numeric(df[validacao], errors="coerce").sum()) if validacao in df.columns else None
+    log(f"⬆️ {etl_conf['tabela']}: {len(df)} linhas em staging ({ref_staging})"
+        + (f", soma {validacao} = {soma:,.2f}" if soma is not None else ""))
+    return {
+        "etl_conf": etl_conf,
+        "ref": ref,
+        "ref_staging": ref_staging,
+        "criar_tabela": tabela is None,
+        "tipo_periodo": tipo_periodo,
+        "colunas": list(df.columns),
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "linhas": len(df),
+        "soma_validacao": soma,
+    }
+
+
+def _sql_criar_tabela(carga: dict) -> str:
+    """CREATE particionado pela coluna de período e clusterizado por chaves_particao."""
+    conf = carga["etl_conf"]
+    sql = f"CREATE TABLE IF NOT EXISTS `{carga['ref']}`\nPARTITION BY `{conf['periodo_coluna']}`"
+    cluster = [c for c in conf.get("chaves_particao") or [] if c in carga["colunas"]][:MAX_COLUNAS_CLUSTER_BQ]
+    if cluster:
+        sql += "\nCLUSTER BY " + ", ".join(f"`{c}`" for c in cluster)
+    return sql + f"\nAS SELECT * FROM `{carga['ref_staging']}` WHERE FALSE;"
+
+
+def _sql_merge_periodo(carga: dict) -> str:
+    """MERGE que troca o período inteiro da tabela final pelo conteúdo do staging.
+
+    ON FALSE: nenhuma linha "casa"; as do staging são inseridas e as da tabela
+    final dentro do período (e só elas, filtradas pela partição) são apagadas.
+    """
+    periodo = _expr_data_bq(carga["etl_conf"]["periodo_coluna"], carga["tipo_periodo"])
+    colunas = ", ".join(f"`{c}`" for c in carga["colunas"])
+    valores = ", ".join(f"S.`{c}`" for c in carga["colunas"])
+    return (
+        f"MERGE `{carga['ref']}` T\n"
+        f"USING `{carga['ref_staging']}` S\n"
+        f"ON FALSE\n"
+        f"WHEN NOT MATCHED BY SOURCE AND {periodo} BETWEEN "
+        f"DATE '{carga['data_inicio']:%Y-%m-%d}' AND DATE '{carga['data_fim']:%Y-%m-%d}' THEN DELETE\n"
+        f"WHEN NOT MATCHED THEN INSERT ({colunas}) VALUES ({valores});"
+    )
+
+
+def _dropar_staging_bigquery(cliente, cargas: List[dict]) -> None:
+    """Remove as tabelas de staging (melhor esforço, usado quando o script falha)."""
+    for carga in cargas:
+        try:
+            cliente.query(f"DROP TABLE IF EXISTS `{carga['ref_staging']}`;").result()
+        except Exception as e:
+            log(f"Staging {carga['ref_staging']} não removido: {e}", "WARN")
+
+
+def executar_merges_bigquery(cliente, cargas: List[dict]) -> dict:
+    """Aplica todas as cargas num único job (script): CREATEs pendentes, uma
+    transação com um MERGE por carga e, no fim, remove os stagings.
+
+    Returns:
+        dict no formato esperado por `_upload_verificado` ("sucesso", "linhas"...).
+    """
+    if not cargas:
+        return {"sucesso": True, "linhas": 0, "tabelas": []}
+
+    # DDL não é permitido dentro de transação: criações vêm antes do BEGIN
+    partes = [_sql_criar_tabela(c) for c in cargas if c["criar_tabela"]]
+    partes.append("BEGIN TRANSACTION;")
+    partes += [_sql_merge_periodo(c) for c in cargas]
+    partes.append("COMMIT TRANSACTION;")
+    partes += [f"DROP TABLE IF EXISTS `{c['ref_staging']}`;" for c in cargas]
+    script = "\n\n".join(partes)
+
+    tabelas = [c["etl_conf"]["tabela"] for c in cargas]
+    linhas = sum(c["linhas"] for c in cargas)
+    t_ini = time.time()
+    try:
+        with medir("merge_bigquery", tabelas=tabelas, linhas=linhas):
+            job = cliente.query(script)
+            job.result()
+    except Exception as e:
+        log(f"❌ MERGE no BigQuery falhou ({', '.join(tabelas)}): {e}", "ERRO")
+        _dropar_staging_bigquery(cliente, cargas)
+        return {"sucesso": False, "erro": str(e), "tabelas": tabelas}
+
+    log(f"✅ MERGE concluído em {time.time() - t_ini:.1f}s: {', '.join(tabelas)} ({linhas} linhas, 1 job)", "OK")
+    return {
+        "sucesso": True,
+        "linhas": linhas,
+        "tabelas": tabelas,
+        "job_id": getattr(job, "job_id", None),
+        "soma_validacao": {c["etl_conf"]["tabela"]: c["soma_validacao"] for c in cargas},
+    }
+
+
+def carregar_merge_bigquery(etl_conf: dict, caminho_artefato: str, data_inicio, data_fim, cliente=None) -> dict:
+    """Upload de um único relatório: staging + MERGE do período num job só."""
+    cliente = cliente or criar_cliente_bigquery(etl_conf)
+    try:
+        carga = carregar_staging_bigquery(cliente, etl_conf, ler_artefato_etl(caminho_artefato), data_inicio, data_fim)
+    except Exception as e:
+        log(f"❌ Falha ao subir staging de {etl_conf['tabela']}: {e}", "ERRO")
+        return {"sucesso": False, "erro": str(e)}
+    return executar_merges_bigquery(cliente, [carga])
+
+
+class LoteUploadBigQuery:
+    """Junta os uploads de várias automações para um único job de MERGE.
+
+    `adicionar` já sobe o staging (o arquivo local pode ser apagado logo depois);
+    `executar` roda todos os MERGEs numa transação e só então chama os
+    callbacks `ao_confirmar` (manifesto de hashes, watermark...).
+    Seguro para uso pelos workers de `executar_automacoes_em_paralelo`.
+    """
+
+    def __init__(self, cliente=None) -> None:
+        self.cliente = cliente
+        self._cargas: List[Tuple[dict, Optional[Callable]]] = []
+        self._lock = Lock()
+
+    def adicionar(self, etl_conf: dict, caminho_artefato: str, data_inicio, data_fim,
+                  ao_confirmar: Optional[Callable[[dict], None]] = None) -> bool:
+        cliente = self.cliente or criar_cliente_bigquery(etl_conf)
+        try:
+            carga = carregar_staging_bigquery(cliente, etl_conf, ler_artefato_etl(caminho_artefato), data_inicio, data_fim)
+        except Exception as e:
+            log(f"❌ Falha ao subir staging de {etl_conf['tabela']}: {e}", "ERRO")
+            return False
+        with self._lock:
+            self.cliente = self.cliente or cliente
+            self._cargas.append((carga, ao_confirmar))
+        return True
+
+    def __len__(self) -> int:
+        return len(self._cargas)
+
+    def executar(self) -> dict:
+        with self._lock:
+            pendentes, self._cargas = self._cargas, []
+        if not pendentes:
+            return {"sucesso": True, "linhas": 0, "tabelas": []}
+
+        resp = executar_merges_bigquery(self.cliente, [c for c, _ in pendentes])
+        if resp.get("sucesso"):
+            for carga, ao_confirmar in pendentes:
+                if ao_confirmar is not None:
+                    ao_confirmar(resp)
+        return resp
+
+
+# =========================================================
+# ========== EXECUÇÃO DE UMA AUTOMAÇÃO =====================
+# =========================================================
+import os
+import time
+from typing import Callable
+from datetime import datetime
+def _nova_tarefa(nome: str, func_exec: Callable, etl_conf: dict, data_inicio: datetime, data_fim: datetime,
+                 pasta_download: str, incremental: bool = True) -> dict:
+    """Estado de uma automação passando pelas etapas (download → ETL → upload → limpeza).
+
+    `periodo_pedido` guarda o período solicitado, antes do estreitamento incremental:
+    é a chave do manifesto de downloads, que precisa ser estável entre execuções
+    (o período estreitado muda a cada carga e nunca repetiria a chave).
+    """
+    periodo_pedido = (data_inicio, data_fim)
+    if incremental and etl_conf.get("incremental"):
+        data_inicio, data_fim = periodo_incremental(etl_conf, data_inicio, data_fim)
+    return {
+        "nome": nome,
+        "func_exec": func_exec,
+        "etl_conf": etl_conf,
+        "periodo_pedido": periodo_pedido,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "pasta_download": pasta_download,
+        "caminho_arquivo": None,
+        "sha256": None,
+        "tamanho": None,
+        "pular": False,
+        "resp_etl": {},
+    }
+
+
+def _etapa_download(tarefa: dict, usuario: str, senha: str, pool: Optional[PoolSessoesCodonto] = None,
+                    forcar: bool = False) -> None:
+    """1️⃣ Baixa o relatório e marca `pular` se o arquivo é idêntico ao último carregado.
+
+    Raises:
+        FileNotFoundError: Se a automação não devolveu um arquivo existente.
+    """
+    nome, pasta_download = tarefa["nome"], tarefa["pasta_download"]
+    data_inicio, data_fim = tarefa["data_inicio"], tarefa["data_fim"]
+    func_exec = tarefa["func_exec"]
+
+    args = (usuario, senha, data_inicio.strftime("%d/%m/%Y"), data_fim.strftime("%d/%m/%Y"))
+    with contexto_medicao(automacao=nome), medir("download") as m:
+        if pool is not None:
+            with pool.sessao(pasta_download) as driver:
+                resultado = func_exec(*args, zoom=0.8, pasta_download=pasta_download, driver=driver, rodar_etl=False)
+        else:
+            resultado = func_exec(*args, zoom=0.8, pasta_download=pasta_download, rodar_etl=False)
+
+        # Suporte a retorno como string OU dict
+        if isinstance(resultado, str):
+            tarefa["caminho_arquivo"] = resultado
+        elif isinstance(resultado, dict):
+            tarefa["resp_etl"] = resultado
+            tarefa["caminho_arquivo"] = resultado.get("path") or resultado.get("arquivo") or resultado.get("file")
+
+        caminho_arquivo = tarefa["caminho_arquivo"]
+        if not (caminho_arquivo and os.path.exists(caminho_arquivo)):
+            raise FileNotFoundError(f"{nome}: download não gerou arquivo ({caminho_arquivo or 'sem caminho'})")
+        tarefa["sha256"] = calcular_hash_arquivo(caminho_arquivo)
+        tarefa["tamanho"] = m["bytes"] = os.path.getsize(caminho_arquivo)
+        if not forcar and arquivo_inalterado(nome, *tarefa["periodo_pedido"], tarefa["sha256"]):
+            log(f"⏭️ {nome}: arquivo idêntico ao último carregado — ETL e upload pulados.", "OK")
+            tarefa["pular"] = True
+
+
+def _etapa_etl(tarefa: dict) -> None:
+    """2️⃣ ETL local. No modo "merge" roda sem upload; senão o ETL já sobe os dados."""
+    from etl.etl_manager import rodar_etl_generico
+
+    if tarefa["pular"]:
+        return
+    etl_conf = tarefa["etl_conf"]
+    with contexto_medicao(automacao=tarefa["nome"]), medir("etl", bytes=tarefa["tamanho"]) as m:
+        if etl_conf.get("upload") == "merge":
+            conf = {**etl_conf, "upload": False, "limpar_periodo": False}
+            tarefa["resp_etl"] = rodar_etl_generico(tarefa["caminho_arquivo"], conf)
+            if artefato_etl(tarefa["resp_etl"]) is None:
+                raise RuntimeError("ETL não devolveu o arquivo tratado para o upload via MERGE")
+        else:
+            tarefa["resp_etl"] = rodar_etl_generico(tarefa["caminho_arquivo"], etl_conf)
+        if isinstance(tarefa["resp_etl"], dict):
+            m["linhas"] = tarefa["resp_etl"].get("linhas")
+
+
+def _confirmar_upload(tarefa: dict, resp: dict) -> None:
+    """3️⃣ Manifesto e watermark só avançam depois do upload verificado."""
+    if _upload_verificado(resp):
+        registrar_hash_download(tarefa["nome"], *tarefa["periodo_pedido"], tarefa["sha256"], tarefa["tamanho"])
+    registrar_carga_incremental(tarefa["etl_conf"], tarefa["data_inicio"], tarefa["data_fim"], resp)
+
+
+def _etapa_upload(tarefa: dict, lote_upload: Optional[LoteUploadBigQuery] = None) -> None:
+    """3️⃣ Upload via staging + MERGE (ou agendado no lote) e confirmação."""
+    if tarefa["pular"]:
+        return
+    etl_conf, resp_etl = tarefa["etl_conf"], tarefa["resp_etl"]
+    if etl_conf.get("upload") != "merge":
+        _confirmar_upload(tarefa, resp_etl)
+        return
+
+    artefato = artefato_etl(resp_etl)
+    data_inicio, data_fim = tarefa["data_inicio"], tarefa["data_fim"]
+    with contexto_medicao(automacao=tarefa["nome"]), medir("upload", bytes=os.path.getsize(artefato)):
+        if lote_upload is not None:
+            if not lote_upload.adicionar(etl_conf, artefato, data_inicio, data_fim,
+                                         lambda resp, t=tarefa: _confirmar_upload(t, resp)):
+                raise RuntimeError("staging no BigQuery falhou")
+            log(f"{tarefa['nome']}: MERGE agendado para o job em lote.")
+        else:
+            tarefa["resp_etl"] = {**resp_etl, **carregar_merge_bigquery(etl_conf, artefato, data_inicio, data_fim)}
+            _confirmar_upload(tarefa, tarefa["resp_etl"])
+
+
+def _limpar_tarefa(tarefa: dict) -> None:
+    """4️⃣ Limpeza — apaga arquivos do ETL e pasta de downloads."""
+    pasta_download, resp_etl = tarefa["pasta_download"], tarefa["resp_etl"]
+    caminho_arquivo = tarefa["caminho_arquivo"]
+    caminhos_para_apagar = set()
+
+    if isinstance(resp_etl, dict):
+        for k in ["original_path", "arquivo_final", "csv_path", "parquet_path"]:
+            v = resp_etl.get(k)
+            if isinstance(v, str) and os.path.exists(v):
+                caminhos_para_apagar.add(v)
+
+    if caminho_arquivo and os.path.exists(caminho_arquivo):
+        caminhos_para_apagar.add(caminho_arquivo)
+
+    # também remove todos arquivos Excel/CSV/Parquet residuais da pasta de downloads
+    for f in os.listdir(pasta_download):
+        if f.lower().endswith((".xlsx", ".xls", ".csv", ".parquet")):
+            caminhos_para_apagar.add(os.path.join(pasta_download, f))
+
+    if caminhos_para_apagar:
+        apagar_arquivos_seguro(sorted(list(caminhos_para_apagar)), pasta_padrao=pasta_download)
+    else:
+        log("⚠️ Nenhum arquivo encontrado para exclusão.", "WARN")
+
+
+def executar_automacao(
+    nome: str,
     func_exec: Callable,
     etl_conf: dict,
     usuario: str,
     senha: str,
     data_inicio: datetime,
     data_fim: datetime,
-    pasta_download: str
-) -> None:
+    pasta_download: str,
+    pool: Optional[PoolSessoesCodonto] = None,
+    incremental: bool = True,
+    forcar: bool = False,
+    lote_upload: Optional[LoteUploadBigQuery] = None,
+) -> bool:
     """
     Executa uma automação completa (download → ETL → upload → limpeza final).
     Nenhuma automação deve imprimir diretamente.
-    """
-    from etl.etl_manager import rodar_etl_generico
-    from functions import log, periodo_str, apagar_arquivos_seguro
 
-    log(f"▶️ {nome} — {periodo_str(data_inicio, data_fim)}")
-    t_ini = time.time()
-    resp_etl, caminho_arquivo = {}, None
+    Se `pool` for informado, a automação recebe um navegador já logado do pool
+    em vez de abrir o Chrome e fazer login do zero.
 
-    try:
-        # 1️⃣ Download do arquivo
-        resultado = func_exec(
-            usuario,
-            senha,
-            data_inicio.strftime("%d/%m/%Y"),
-            data_fim.strftime("%d/%m/%Y"),
-            zoom=0.8,
-            pasta_download=pasta_download,
-        )
+    Para ETL_CONFIG com "incremental": True, o período é reduzido aos dias desde
+    o último carregamento (ver `periodo_incremental`), a menos que
+    `incremental=False` (ex.: backfill, que recarrega blocos antigos de propósito).
 
-        # Suporte a retorno como string OU dict
-        if isinstance(resultado, str):
-            caminho_arquivo = resultado
-        elif isinstance(resultado, dict):
-            caminho_arquivo = resultado.get("path") or resultado.get("arquivo") or resultado.get("file")
+    O arquivo baixado tem o SHA-256 comparado com o último carregado para o mesmo
+    período; se for idêntico, ETL e upload são pulados (exceto com `forcar=True`).
+
+    Com "upload": "merge" no ETL_CONFIG, o ETL roda sem upload e o arquivo tratado
+    vai para staging + MERGE no BigQuery. Se `lote_upload` for informado, o MERGE
+    fica para `lote_upload.executar()` (um job para todas as automações) e o
+    manifesto/watermark só são atualizados quando ele confirmar.
+
+    As etapas são as mesmas de `executar_pipeline`, aqui em sequência.
+
+    Returns:
+        bool: True se a automação terminou sem falha geral.
+    """
+    tarefa = _nova_tarefa(nome, func_exec, etl_conf, data_inicio, data_fim, pasta_download, incremental)
+    log(f"▶️ {nome} — {periodo_str(tarefa['data_inicio'], tarefa['data_fim'])}")
+    sucesso = False
 
-        # 2️⃣ Executa ETL local + upload BigQuery
-        if caminho_arquivo and os.path.exists(caminho_arquivo):
-            resp_etl = rodar_etl_generico(caminho_arquivo, etl_conf)
+    try:
+        _etapa_download(tarefa, usuario, senha, pool, forcar)
+        _etapa_etl(tarefa)
+        _etapa_upload(tarefa, lote_upload)
+        sucesso = True
 
     except Exception as e:
         log(f"❌ Falha geral em {nome}: {e}", "ERRO")
 
     finally:
-        # 3️⃣ Limpeza — apaga arquivos do ETL e pasta de downloads
-        caminhos_para_apagar = set()
+        _limpar_tarefa(tarefa)
+
+    return sucesso
+
+
+# =========================================================
+# ========== EXECUÇÃO PARALELA =============================
+# =========================================================
+MAX_AUTOMACOES_SIMULTANEAS = 3
+
+
+def normalizar_nome_pasta(nome: str) -> str:
+    """Converte um nome livre em algo seguro para usar como nome de pasta."""
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", nome).strip("_") or "automacao"
+
+
+def _pasta_download_worker(pasta_download: str, nome: str) -> str:
+    """Cria (se preciso) uma subpasta de downloads exclusiva para a automação.
+
+    Cada worker paralelo baixa na sua própria pasta, assim o snapshot de
+    `aguardar_novo_download` e a limpeza final de uma automação não enxergam
+    os arquivos das outras.
+    """
+    pasta = os.path.join(pasta_download, f"worker_{normalizar_nome_pasta(nome)}")
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def executar_automacoes_em_paralelo(
+    jobs: List[Tuple[str, Callable, dict]],
+    usuario: str,
+    senha: str,
+    data_inicio: datetime,
+    data_fim: datetime,
+    pasta_download: str,
+    max_workers: int = MAX_AUTOMACOES_SIMULTANEAS,
+    pool: Optional[PoolSessoesCodonto] = None,
+    forcar: bool = False,
+    lote_upload: Optional[LoteUploadBigQuery] = None,
+) -> Dict[str, bool]:
+    """Executa várias automações ao mesmo tempo num pool limitado de threads.
+
+    Args:
+        jobs: Lista de tuplas (nome, func_exec, etl_conf), como em AUTOMACOES.
+        usuario: Usuário do Codonto.
+        senha: Senha do Codonto.
+        data_inicio: Data inicial do período.
+        data_fim: Data final do período.
+        pasta_download: Pasta base; cada job usa uma subpasta própria.
+        max_workers: Número máximo de automações (navegadores) simultâneas.
+        pool: Pool de sessões logadas (opcional) compartilhado pelos workers.
+        forcar: Refaz ETL/upload mesmo se o arquivo for idêntico ao último.
+        lote_upload: Lote de MERGEs do BigQuery compartilhado (opcional).
+
+    Returns:
+        Dicionário {nome: sucesso} com o resultado de cada automação.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    max_workers = max(1, min(max_workers, len(jobs) or 1))
+    log(f"⚡ Execução paralela: {len(jobs)} automações, até {max_workers} simultâneas")
+    t_ini = time.time()
+    resultados: Dict[str, bool] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="automacao") as executor:
+        futuros = {}
+        for nome, func_exec, etl_conf in jobs:
+            pasta_worker = _pasta_download_worker(pasta_download, nome)
+            futuro = executor.submit(
+                executar_automacao,
+                nome, func_exec, etl_conf, usuario, senha, data_inicio, data_fim, pasta_worker, pool,
+                forcar=forcar, lote_upload=lote_upload,
+            )
+            futuros[futuro] = (nome, pasta_worker)
+
+        for futuro in as_completed(futuros):
+            nome, pasta_worker = futuros[futuro]
+            try:
+                resultados[nome] = futuro.result()
+            except Exception as e:
+                log(f"❌ Worker de {nome} falhou: {e}", "ERRO")
+                resultados[nome] = False
+            try:
+                os.rmdir(pasta_worker)
+            except OSError:
+                pass
+
+    ok = sum(1 for v in resultados.values() if v)
+    log(f"Execução paralela concluída: {ok}/{len(jobs)} com sucesso em {time.time() - t_ini:.1f}s",
+        "OK" if ok == len(jobs) else "WARN")
+    return resultados
+
+# =========================================================
+# ========== EXECUÇÃO EM PIPELINE (DOWNLOAD → ETL → UPLOAD)
+# =========================================================
+# Cada etapa tem seus próprios workers e filas limitadas entre elas: enquanto o
+# relatório N passa pelo ETL e o N-1 sobe para o BigQuery, o Chrome já baixa o
+# N+1. Fila cheia segura a etapa anterior (backpressure), então arquivos não se
+# acumulam no disco se o ETL ou o upload ficarem para trás.
+PIPELINE_WORKERS = {"download": 2, "etl": 1, "upload": 1}
+PIPELINE_FILA_MAX = 2
+_FIM_DA_FILA = object()
+
+
+def executar_pipeline(
+    tarefas: List[Tuple[str, Callable, dict, datetime, datetime]],
+    usuario: str,
+    senha: str,
+    pasta_download: str,
+    workers: Optional[Dict[str, int]] = None,
+    fila_max: int = PIPELINE_FILA_MAX,
+    pool: Optional[PoolSessoesCodonto] = None,
+    incremental: bool = True,
+    forcar: bool = False,
+    lote_upload: Optional[LoteUploadBigQuery] = None,
+) -> Dict[str, bool]:
+    """Executa as automações em três etapas sobrepostas ligadas por filas.
+
+    Args:
+        tarefas: Lista de (nome, func_exec, etl_conf, data_inicio, data_fim).
+        usuario: Usuário do Codonto.
+        senha: Senha do Codonto.
+        pasta_download: Pasta base; cada tarefa baixa numa subpasta própria.
+        workers: Workers por etapa, ex. {"download": 2, "etl": 1, "upload": 1}
+            (o que faltar vem de PIPELINE_WORKERS). Com `pool`, downloads
+            simultâneos ficam limitados também ao tamanho do pool.
+        fila_max: Itens que cada fila aceita antes de bloquear a etapa anterior.
+        pool: Pool de sessões logadas (opcional) usado pela etapa de download.
+        incremental: Reduz o período das configs incrementais (ver `executar_automacao`).
+        forcar: Refaz ETL/upload mesmo se o arquivo for idêntico ao último.
+        lote_upload: Lote de MERGEs (opcional); o upload só sobe o staging e o
+            MERGE fica para `lote_upload.executar()`.
+
+    Returns:
+        Dicionário {"nome | período": sucesso} com o resultado de cada tarefa.
+    """
+    workers = {**PIPELINE_WORKERS, **(workers or {})}
+    fila_download: "queue.Queue" = queue.Queue()
+    fila_etl: "queue.Queue" = queue.Queue(maxsize=max(1, fila_max))
+    fila_upload: "queue.Queue" = queue.Queue(maxsize=max(1, fila_max))
+    resultados: Dict[str, bool] = {}
+    lock = Lock()
+
+    def finalizar(chave: str, tarefa: dict, sucesso: bool) -> None:
+        try:
+            _limpar_tarefa(tarefa)
+        except Exception as e:
+            log(f"❌ Falha na limpeza de {tarefa['nome']}: {e}", "ERRO")
+            sucesso = False
+        finally:
+            try:
+                os.rmdir(tarefa["pasta_download"])
+            except OSError:
+                pass
+            with lock:
+                resultados[chave] = sucesso
+
+    def etapa(fila_entrada, fila_saida, executar, nome_etapa: str) -> None:
+        # Nenhuma exceção pode matar o worker: as etapas com um só worker
+        # deixariam a anterior presa para sempre no put da fila cheia.
+        while True:
+            item = fila_entrada.get()
+            if item is _FIM_DA_FILA:
+                return
+            chave, tarefa = item
+            sucesso = True
+            try:
+                executar(tarefa)
+                if fila_saida is not None and not tarefa["pular"]:
+                    fila_saida.put(item)   # bloqueia se a próxima etapa estiver cheia
+                    continue
+            except Exception as e:
+                log(f"❌ Falha geral em {tarefa['nome']} ({nome_etapa}): {e}", "ERRO")
+                sucesso = False
+            try:
+                finalizar(chave, tarefa, sucesso)
+            except Exception as e:
+                log(f"❌ Falha ao finalizar {tarefa['nome']}: {e}", "ERRO")
+                with lock:
+                    resultados[chave] = False
+
+    def baixar(tarefa: dict) -> None:
+        log(f"▶️ {tarefa['nome']} — {periodo_str(tarefa['data_inicio'], tarefa['data_fim'])}")
+        _etapa_download(tarefa, usuario, senha, pool, forcar)
+
+    for nome, func_exec, etl_conf, data_inicio, data_fim in tarefas:
+        chave = f"{nome} | {periodo_str(data_inicio, data_fim)}"
+        pasta = _pasta_download_worker(pasta_download, f"{nome}_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}")
+        fila_download.put((chave, _nova_tarefa(nome, func_exec, etl_conf, data_inicio, data_fim, pasta, incremental)))
+
+    n_download = min(workers["download"], max(1, len(tarefas)))
+    if pool is not None:
+        n_download = min(n_download, pool.tamanho)
+    n_download, n_etl, n_upload = max(1, n_download), max(1, workers["etl"]), max(1, workers["upload"])
+    estagios = [
+        (fila_download, fila_etl, baixar, "download", n_download),
+        (fila_etl, fila_upload, _etapa_etl, "etl", n_etl),
+        (fila_upload, None, lambda t: _etapa_upload(t, lote_upload), "upload", n_upload),
+    ]
+    log(f"🔀 Pipeline: {len(tarefas)} tarefas — workers download={n_download}, etl={n_etl}, "
+        f"upload={n_upload}, filas de até {fila_max}")
+    t_ini = time.time()
+
+    threads_por_etapa = []
+    for fila_entrada, fila_saida, executar, nome_etapa, n in estagios:
+        threads = [Thread(target=etapa, args=(fila_entrada, fila_saida, executar, nome_etapa),
+                          name=f"pipeline_{nome_etapa}_{i}", daemon=True) for i in range(n)]
+        for t in threads:
+            t.start()
+        threads_por_etapa.append((fila_entrada, threads))
+
+    # Encerra etapa por etapa: só sinaliza o fim de uma fila depois que
+    # todos os produtores dela terminaram
+    for fila_entrada, threads in threads_por_etapa:
+        for _ in threads:
+            fila_entrada.put(_FIM_DA_FILA)
+        for t in threads:
+            t.join()
+
+    ok = sum(1 for v in resultados.values() if v)
+    log(f"Pipeline concluído: {ok}/{len(tarefas)} com sucesso em {time.time() - t_ini:.1f}s",
+        "OK" if ok == len(tarefas) else "WARN")
+    return resultados
+
+
+# =========================================================
+# ========== BACKFILL EM BLOCOS (gerar_periodos) ===========
+# =========================================================
+class ProgressoBackfill:
+    """Registro persistente dos blocos já concluídos de um backfill (JSON em estado/).
+
+    Reexecutar o mesmo backfill pula os blocos concluídos e refaz apenas os
+    que falharam ou não chegaram a rodar.
+    """
+
+    def __init__(self, data_inicial: str, data_final: str, meses_por_bloco: int) -> None:
+        ini = pd.to_datetime(data_inicial, dayfirst=True).strftime("%Y%m%d")
+        fim = pd.to_datetime(data_final, dayfirst=True).strftime("%Y%m%d")
+        self.caminho = os.path.join(get_estado_dir(), f"backfill_{ini}_{fim}_{meses_por_bloco}m.json")
+        self._lock = Lock()
+        self.concluidos: Set[str] = set()
+        if os.path.exists(self.caminho):
+            with open(self.caminho, encoding="utf-8") as f:
+                self.concluidos = set(json.load(f).get("concluidos", []))
+
+    @staticmethod
+    def chave(nome: str, inicio, fim) -> str:
+        return f"{nome}|{inicio:%Y-%m-%d}|{fim:%Y-%m-%d}"
+
+    def concluido(self, chave: str) -> bool:
+        return chave in self.concluidos
+
+    def marcar(self, chave: str) -> None:
+        with self._lock:
+            self.concluidos.add(chave)
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"concluidos": sorted(self.concluidos)}, f, ensure_ascii=False, indent=1)
+            os.replace(temporario, self.caminho)
+
+
+def executar_backfill(
+    jobs: List[Tuple[str, Callable, dict]],
+    usuario: str,
+    senha: str,
+    data_inicial: str,
+    data_final: str,
+    pasta_download: str,
+    meses_por_bloco: int = 6,
+    max_workers: int = 2,
+    pool: Optional[PoolSessoesCodonto] = None,
+    forcar: bool = False,
+) -> Dict[str, bool]:
+    """Divide o intervalo com `gerar_periodos` e processa os blocos em paralelo.
+
+    Cada bloco é uma execução completa (download → ETL → upload) que começa assim
+    que houver um navegador livre no pool; o progresso é salvo a cada bloco
+    concluído para permitir retomar após falhas.
+
+    Args:
+        jobs: Lista de tuplas (nome, func_exec, etl_conf).
+        data_inicial: Início do intervalo (dd/mm/aaaa).
+        data_final: Fim do intervalo (dd/mm/aaaa).
+        meses_por_bloco: Tamanho de cada bloco em meses.
+        max_workers: Blocos (navegadores) simultâneos.
+        pool: Pool de sessões; se None, um pool temporário de `max_workers` é criado.
+        forcar: Refaz ETL/upload mesmo se o arquivo do bloco for idêntico ao último.
+
+    Returns:
+        Dicionário {chave do bloco: sucesso} apenas dos blocos executados nesta rodada.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    periodos = gerar_periodos(data_inicial, data_final, meses_por_bloco)
+    progresso = ProgressoBackfill(data_inicial, data_final, meses_por_bloco)
+
+    tarefas = []
+    for nome, func_exec, etl_conf in jobs:
+        for ini, fim in periodos:
+            chave = progresso.chave(nome, ini, fim)
+            if not progresso.concluido(chave):
+                tarefas.append((chave, nome, func_exec, etl_conf, ini, fim))
+
+    total_blocos = len(jobs) * len(periodos)
+    log(f"📚 Backfill {data_inicial} → {data_final}: {total_blocos} blocos de {meses_por_bloco} meses, "
+        f"{total_blocos - len(tarefas)} já concluídos, {len(tarefas)} pendentes")
+    if not tarefas:
+        return {}
+
+    pool_proprio = pool is None
+    if pool_proprio:
+        pool = PoolSessoesCodonto(usuario, senha, tamanho=max_workers, pasta_download=pasta_download)
+
+    resultados: Dict[str, bool] = {}
+    t_ini = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backfill") as executor:
+            futuros = {}
+            for chave, nome, func_exec, etl_conf, ini, fim in tarefas:
+                pasta_bloco = _pasta_download_worker(pasta_download, f"{nome}_{ini:%Y%m%d}")
+                futuro = executor.submit(
+                    executar_automacao, nome, func_exec, etl_conf, usuario, senha, ini, fim, pasta_bloco, pool,
+                    incremental=False, forcar=forcar,
+                )
+                futuros[futuro] = (chave, pasta_bloco)
+
+            for feitos, futuro in enumerate(as_completed(futuros), start=1):
+                chave, pasta_bloco = futuros[futuro]
+                try:
+                    ok = futuro.result()
+                except Exception as e:
+                    log(f"❌ Bloco {chave} falhou: {e}", "ERRO")
+                    ok = False
+                resultados[chave] = ok
+                if ok:
+                    progresso.marcar(chave)
+                try:
+                    os.rmdir(pasta_bloco)
+                except OSError:
+                    pass
+                log(f"[{feitos}/{len(tarefas)}] {chave.replace('|', ' ')} {'✅' if ok else '❌'}",
+                    "OK" if ok else "WARN")
+    finally:
+        if pool_proprio:
+            pool.encerrar()
+
+    falhas = [c for c, ok in resultados.items() if not ok]
+    if falhas:
+        log(f"Backfill terminou com {len(falhas)} blocos com falha — execute novamente para retomar: "
+            f"{', '.join(falhas)}", "WARN")
+    else:
+        log(f"Backfill concluído em {time.time() - t_ini:.1f}s", "OK")
+    return resultados
 
-        if isinstance(resp_etl, dict):
-            for k in ["original_path", "arquivo_final", "csv_path"]:
-                v = resp_etl.get(k)
-                if isinstance(v, str) and os.path.exists(v):
-                    caminhos_para_apagar.add(v)
 
-        if caminho_arquivo and os.path.exists(caminho_arquivo):
-            caminhos_para_apagar.add(caminho_arquivo)
+# =========================================================
+# ========== EXECUÇÃO DE UMA SELEÇÃO (MODOS E CLI) =========
+# =========================================================
+EXECUCOES = ("sequencial", "paralelo", "pipeline")
+
+
+def executar_automacoes(
+    jobs: List[Tuple[str, Callable, dict]],
+    usuario: str,
+    senha: str,
+    data_inicio: datetime,
+    data_fim: datetime,
+    pasta_download: str,
+    execucao: str = "sequencial",
+    max_workers: int = MAX_AUTOMACOES_SIMULTANEAS,
+    pool: Optional[PoolSessoesCodonto] = None,
+    forcar: bool = False,
+    workers_pipeline: Optional[Dict[str, int]] = None,
+    modo: str = "execucao",
+) -> Dict[str, bool]:
+    """Roda as automações de `jobs` no período, sem perguntar nada ao usuário.
+
+    `execucao` escolhe entre "sequencial", "paralelo" (até `max_workers`) e
+    "pipeline" (etapas sobrepostas, `workers_pipeline` por etapa). Os uploads
+    "merge" vão ao BigQuery num único job no fim; se ele falhar, essas
+    automações contam como falha. Ao terminar, imprime o tempo por etapa e
+    grava o relatório JSON (`relatorio_execucao(modo)`).
 
-        # também remove todos arquivos Excel residuais da pasta de downloads
-        for f in os.listdir(pasta_download):
-            if f.lower().endswith((".xlsx", ".xls", ".csv")):
-                caminhos_para_apagar.add(os.path.join(pasta_download, f))
+    Returns:
+        Dicionário {nome: sucesso}.
+    """
+    if execucao not in EXECUCOES:
+        raise ValueError(f"execucao deve ser um de {EXECUCOES}: {execucao!r}")
 
-        if caminhos_para_apagar:
-            apagar_arquivos_seguro(sorted(list(caminhos_para_apagar)), pasta_padrao=pasta_download)
+    lote = LoteUploadBigQuery()
+    iniciar_medicoes()
+    resultados: Dict[str, bool] = {}
+    try:
+        if execucao == "pipeline":
+            por_chave = executar_pipeline(
+                [(nome, func_exec, etl_conf, data_inicio, data_fim) for nome, func_exec, etl_conf in jobs],
+                usuario, senha, pasta_download, workers_pipeline, pool=pool, forcar=forcar, lote_upload=lote,
+            )
+            resultados = {chave.split(" | ")[0]: ok for chave, ok in por_chave.items()}
+        elif execucao == "paralelo":
+            resultados = executar_automacoes_em_paralelo(
+                jobs, usuario, senha, data_inicio, data_fim, pasta_download, max_workers, pool,
+                forcar=forcar, lote_upload=lote,
+            )
         else:
-            log("⚠️ Nenhum arquivo encontrado para exclusão.", "WARN")
+            for nome, func_exec, etl_conf in jobs:
+                resultados[nome] = executar_automacao(nome, func_exec, etl_conf, usuario, senha, data_inicio,
+                                                      data_fim, pasta_download, pool, forcar=forcar,
+                                                      lote_upload=lote)
+        if len(lote) and not lote.executar().get("sucesso"):
+            for nome, _, etl_conf in jobs:
+                if etl_conf.get("upload") == "merge":
+                    resultados[nome] = False
+    finally:
+        resumo_tempo_espera()
+        relatorio_execucao(modo)
+    return resultados
+
 
 # =========================================================
 # ========== MODO EXPRESSO (TODAS AS AUTOMAÇÕES) ===========
@@ -705,14 +3588,28 @@ def modo_expresso(
     automacoes: Dict[str, tuple],
     usuario: str,
     senha: str,
-    pasta_download: str
-) -> None:
-    """Executa todas as automações do mês atual."""
+    pasta_download: str,
+    paralelo: bool = False,
+    max_workers: int = MAX_AUTOMACOES_SIMULTANEAS,
+    pool: Optional[PoolSessoesCodonto] = None,
+    forcar: bool = False,
+    pipeline: bool = False,
+    workers_pipeline: Optional[Dict[str, int]] = None,
+) -> Dict[str, bool]:
+    """Executa todas as automações do mês atual.
+
+    Com `paralelo=True`, as automações rodam ao mesmo tempo (até `max_workers`).
+    Com `pipeline=True`, download, ETL e upload de automações diferentes se
+    sobrepõem (ver `executar_pipeline`; `workers_pipeline` por etapa).
+    Com `pool`, os navegadores logados são reaproveitados entre as automações.
+    Com `forcar`, arquivos idênticos ao último carregado passam pelo ETL mesmo assim.
+    O restante (upload em lote, relatório) fica em `executar_automacoes`.
+    """
     log("🚀 Modo Expresso: executando todas as automações do mês atual")
     data_inicio, data_fim = obter_periodo_usuario(pergunta_tipo=False)
-
-    for cod, (nome, func_exec, etl_conf) in automacoes.items():
-        executar_automacao(nome, func_exec, etl_conf, usuario, senha, data_inicio, data_fim, pasta_download)
+    execucao = "pipeline" if pipeline else "paralelo" if paralelo else "sequencial"
+    return executar_automacoes(list(automacoes.values()), usuario, senha, data_inicio, data_fim, pasta_download,
+                               execucao, max_workers, pool, forcar, workers_pipeline, modo="expresso")
 
 
 # =========================================================
@@ -722,9 +3619,23 @@ def modo_personalizado(
     automacoes: Dict[str, tuple],
     usuario: str,
     senha: str,
-    pasta_download: str
-) -> None:
-    """Executa automações selecionadas e período escolhido."""
+    pasta_download: str,
+    paralelo: bool = False,
+    max_workers: int = MAX_AUTOMACOES_SIMULTANEAS,
+    pool: Optional[PoolSessoesCodonto] = None,
+    forcar: bool = False,
+    pipeline: bool = False,
+    workers_pipeline: Optional[Dict[str, int]] = None,
+) -> Dict[str, bool]:
+    """Executa automações selecionadas e período escolhido.
+
+    Com `paralelo=True`, as automações rodam ao mesmo tempo (até `max_workers`).
+    Com `pipeline=True`, download, ETL e upload de automações diferentes se
+    sobrepõem (ver `executar_pipeline`; `workers_pipeline` por etapa).
+    Com `pool`, os navegadores logados são reaproveitados entre as automações.
+    Com `forcar`, arquivos idênticos ao último carregado passam pelo ETL mesmo assim.
+    O restante (upload em lote, relatório) fica em `executar_automacoes`.
+    """
     log("🧩 Modo Personalizado selecionado")
 
     print("\nAutomações disponíveis:")
@@ -739,6 +3650,128 @@ def modo_personalizado(
     data_inicio, data_fim = obter_periodo_usuario(pergunta_tipo=True)
     log(f"Período selecionado: {periodo_str(data_inicio, data_fim)}")
 
-    for cod in escolhidas:
-        nome, func_exec, etl_conf = automacoes[cod]
-        executar_automacao(nome, func_exec, etl_conf, usuario, senha, data_inicio, data_fim, pasta_download)
+    execucao = "pipeline" if pipeline else "paralelo" if paralelo else "sequencial"
+    return executar_automacoes([automacoes[cod] for cod in escolhidas], usuario, senha, data_inicio, data_fim,
+                               pasta_download, execucao, max_workers, pool, forcar, workers_pipeline,
+                               modo="personalizado")
+
+
+# =========================================================
+# ========== MODO BACKFILL (PERÍODO LONGO EM BLOCOS) ======
+# =========================================================
+def modo_backfill(
+    automacoes: Dict[str, tuple],
+    usuario: str,
+    senha: str,
+    pasta_download: str,
+    meses_por_bloco: int = 6,
+    max_workers: int = 2,
+    pool: Optional[PoolSessoesCodonto] = None,
+    forcar: bool = False,
+    escolhidas: Optional[List[str]] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+) -> Dict[str, bool]:
+    """Recarrega um período longo das automações escolhidas, em blocos paralelos.
+
+    `escolhidas` (códigos de `automacoes`) e `data_inicio`/`data_fim` só são
+    perguntados ao usuário quando não forem informados (uso pela linha de comando).
+    """
+    log("📚 Modo Backfill selecionado")
+
+    if escolhidas is None:
+        print("\nAutomações disponíveis:")
+        for cod, (nome, _, _) in automacoes.items():
+            print(f"{cod} - {nome}")
+
+        escolhidas = obter_lista_de_opcoes(
+            "\nDigite os números das automações desejadas (ex: 1,3,5): ",
+            list(automacoes.keys())
+        )
+    if data_inicio is None or data_fim is None:
+        data_inicio, data_fim = obter_periodo_usuario(pergunta_tipo=True)
+
+    iniciar_medicoes()
+    try:
+        return executar_backfill(
+            [automacoes[cod] for cod in escolhidas],
+            usuario,
+            senha,
+            data_inicio.strftime("%d/%m/%Y"),
+            data_fim.strftime("%d/%m/%Y"),
+            pasta_download,
+            meses_por_bloco=meses_por_bloco,
+            max_workers=max_workers,
+            pool=pool,
+            forcar=forcar,
+        )
+    finally:
+        resumo_tempo_espera()
+        relatorio_execucao("backfill")
+
+
+# =========================================================
+# ========== AGENDADOR (PROCESSO RESIDENTE) ================
+# =========================================================
+def proxima_execucao(horarios: List[str], agora: Optional[datetime] = None) -> datetime:
+    """Próximo horário ("HH:MM") a partir de `agora`; passa para amanhã se já passaram todos."""
+    agora = agora or datetime.now()
+    candidatos = []
+    for h in horarios:
+        hora, minuto = (int(p) for p in h.split(":"))
+        alvo = agora.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+        candidatos.append(alvo if alvo > agora else alvo + relativedelta(days=1))
+    return min(candidatos)
+
+
+def executar_agendado(
+    rodar: Callable[[], object],
+    horarios: Optional[List[str]] = None,
+    intervalo_minutos: Optional[float] = None,
+    preparar: Optional[Callable[[], object]] = None,
+    antecedencia_s: float = 90,
+    max_execucoes: Optional[int] = None,
+) -> int:
+    """Mantém o processo vivo e chama `rodar()` nos `horarios` do dia ou a cada `intervalo_minutos`.
+
+    O Python, o pandas, o Selenium e o pool de navegadores (quem chama guarda o
+    pool dentro de `rodar`) continuam carregados entre as execuções. `preparar`
+    roda `antecedencia_s` antes de cada execução (ex.: `pool.aquecer`, para o
+    login não entrar no tempo da execução). Falhas de uma execução são logadas
+    e o agendador segue para a próxima. Ctrl+C encerra.
+
+    Returns:
+        Número de execuções feitas.
+    """
+    if not horarios and not intervalo_minutos:
+        raise ValueError("Informe `horarios` ou `intervalo_minutos`.")
+
+    execucoes = 0
+    proxima = datetime.now() if intervalo_minutos else proxima_execucao(horarios)
+    try:
+        while max_execucoes is None or execucoes < max_execucoes:
+            log(f"⏰ Próxima execução agendada para {proxima:%d/%m/%Y %H:%M:%S}")
+            espera = (proxima - datetime.now()).total_seconds()
+            if preparar is not None and espera > antecedencia_s:
+                time.sleep(espera - antecedencia_s)
+            if preparar is not None:
+                try:
+                    preparar()
+                except Exception as e:
+                    log(f"Preparação antes da execução falhou: {e}", "WARN")
+            time.sleep(max((proxima - datetime.now()).total_seconds(), 0))
+
+            reset_tempo_base()
+            execucoes += 1
+            try:
+                rodar()
+            except Exception as e:
+                log(f"❌ Execução agendada falhou: {e}", "ERRO")
+
+            if intervalo_minutos:
+                proxima = max(proxima + relativedelta(seconds=int(intervalo_minutos * 60)), datetime.now())
+            else:
+                proxima = proxima_execucao(horarios)
+    except KeyboardInterrupt:
+        log("Agendador interrompido pelo usuário.", "WARN")
+    return execucoes
@@ -10,15 +10,41 @@ Gerenciador de Automações OdontoClean
 ------------------------------------
 Orquestra as rotinas de automação (Expresso ou Personalizado)
 usando as funções utilitárias definidas em `functions.py`.
+
+Sem argumentos (ou só com --force) abre o menu interativo. Com argumentos roda sem perguntas
+(cron, systemd, agendador interno):
+
+    python manager.py --automacoes todas --periodo mes_anterior --execucao paralelo
+    python manager.py --automacoes 1,A_Receber --inicio 01/01/2025 --fim 31/03/2025 --saida json
+    python manager.py --automacoes 2 --backfill --inicio 01/01/2023 --fim 31/12/2024
+    python manager.py --automacoes todas --agendar 06:00,13:00 --execucao pipeline
+
+O código de saída é 0 se todas as automações tiveram sucesso e 1 caso contrário.
 """
 
+import argparse
+import json
+import time
+
 from functions import (
     log,
     reset_tempo_base,
     obter_opcao_usuario,
     modo_expresso,
     modo_personalizado,
+    modo_backfill,
+    executar_automacoes,
+    executar_agendado,
+    resolver_periodo,
+    periodo_str,
     get_downloads_dir,
+    PoolSessoesCodonto,
+    ativar_prelancamento,
+    desativar_prelancamento,
+    definir_perfil_chrome,
+    PERFIS_CHROME,
+    EXECUCOES,
+    PERIODOS_NOMEADOS,
 )
 
 # === CONFIGURAÇÃO GERAL ===
@@ -29,41 +55,248 @@ log(f"Pasta de downloads global: {PASTA_DOWNLOADS}", "OK")
 USUARIO_PADRAO = "isael.souza"
 SENHA_PADRAO = "Odonto1234"
 
+# === EXECUÇÃO PARALELA / SESSÕES ===
+MAX_AUTOMACOES_SIMULTANEAS = 3   # limite de navegadores abertos ao mesmo tempo
+REUTILIZAR_SESSOES = True        # reaproveita navegadores logados entre automações
+SESSAO_MAX_USOS = 5              # recicla o navegador após N automações
+SESSAO_MAX_MINUTOS = 20          # ... ou após M minutos de vida
+PRELANCAR_CHROME = 1             # Chromes abertos em segundo plano na tela de login (0 desliga; ignorado com REUTILIZAR_SESSOES)
+PERFIL_CHROME = "completo"       # "enxuto": headless, sem imagens/fontes/animações (ver PERFIS_CHROME)
+
+# === PIPELINE (download → ETL → upload sobrepostos) ===
+PIPELINE_WORKERS = {"download": 2, "etl": 1, "upload": 1}   # workers por etapa
+
+# === BACKFILL ===
+BACKFILL_MESES_POR_BLOCO = 3     # tamanho de cada bloco do período longo
+BACKFILL_MAX_SIMULTANEOS = 2     # blocos (navegadores) em paralelo
+
+# === AGENDADOR ===
+AGENDADOR_ANTECEDENCIA_S = 90    # abre/loga os navegadores do pool este tempo antes de cada execução
+
 # === IMPORTA AS AUTOMAÇÕES ===
 from automations.valores_recebidos import executar_recebidos, ETL_CONFIG as ETL_RECEBIDOS
 from automations.valores_a_receber import executar_a_receber, ETL_CONFIG as ETL_A_RECEBER
-from automations.contratos_emitidos import executar_contratos, ETL_CONFIG as none
+from automations.contratos_emitidos import executar_contratos, ETL_CONFIG as ETL_CONTRATOS
 
 # === REGISTRO CENTRAL ===
+# Relatório novo: copiar um módulo de automations/ (RELATORIO + ETL_CONFIG) e registrar aqui.
 AUTOMACOES = {
     "1": ("Recebidos", executar_recebidos, ETL_RECEBIDOS),
     "2": ("A_Receber", executar_a_receber, ETL_A_RECEBER),
-    "3": ("Contratos", executar_contratos, none)
+    "3": ("Contratos", executar_contratos, ETL_CONTRATOS),
     # futuras:
-    # "3": ("Pagamentos", executar_pagamentos, ETL_PAGAMENTOS),
-    # "4": ("Contratos", executar_contratos, ETL_CONTRATOS),
+    # "4": ("Pagamentos", executar_pagamentos, ETL_PAGAMENTOS),
 }
 
-def menu_principal() -> None:
-    """Exibe o menu principal e direciona para o modo escolhido."""
+def criar_pool_sessoes(tamanho: int = 1):
+    """Cria o pool de sessões logadas, se REUTILIZAR_SESSOES estiver ativo."""
+    if not REUTILIZAR_SESSOES:
+        return None
+    return PoolSessoesCodonto(
+        USUARIO_PADRAO,
+        SENHA_PADRAO,
+        tamanho=tamanho,
+        max_usos=SESSAO_MAX_USOS,
+        max_minutos=SESSAO_MAX_MINUTOS,
+        pasta_download=PASTA_DOWNLOADS,
+    )
+
+
+def ativar_prelancamento_sem_pool(pool) -> None:
+    """Liga o pré-lançamento do Chrome só quando não há pool de sessões.
+
+    Com pool, as sessões logadas são reaproveitadas (e aquecidas pelo agendador):
+    o Chrome reposto pelo pré-lançamento ficaria ocioso na tela de login até o fim.
+    """
+    if pool is None:
+        ativar_prelancamento(PRELANCAR_CHROME)
+
+
+def menu_principal(forcar: bool = False) -> None:
+    """Exibe o menu principal e direciona para o modo escolhido.
+
+    `forcar` (flag `--force`) refaz ETL/upload mesmo de arquivos idênticos ao último carregado.
+    """
     log("=== GERENCIADOR DE AUTOMAÇÕES ODONTOCLEAN ===")
     print("\n[1] - Download Expresso")
     print("[2] - Download Personalizado")
+    print("[3] - Download Expresso (paralelo)")
+    print("[4] - Download Personalizado (paralelo)")
+    print("[5] - Backfill (período longo em blocos)")
+    print("[6] - Download Expresso (pipeline)")
+    print("[7] - Download Personalizado (pipeline)")
     print("[0] - Sair")
 
-    opcao = obter_opcao_usuario("\nSelecione o modo: ", ["0", "1", "2"])
+    opcao = obter_opcao_usuario("\nSelecione o modo: ", ["0", "1", "2", "3", "4", "5", "6", "7"])
 
-    if opcao == "1":
-        modo_expresso(AUTOMACOES, USUARIO_PADRAO, SENHA_PADRAO, PASTA_DOWNLOADS)
-    elif opcao == "2":
-        modo_personalizado(AUTOMACOES, USUARIO_PADRAO, SENHA_PADRAO, PASTA_DOWNLOADS)
-    else:
+    if opcao == "0":
         log("Encerrando execução...")
+        return
+
+    paralelo = opcao in {"3", "4"}
+    pipeline = opcao in {"6", "7"}
+    if opcao == "5":
+        tamanho_pool = BACKFILL_MAX_SIMULTANEOS
+    elif pipeline:
+        tamanho_pool = PIPELINE_WORKERS["download"]
+    else:
+        tamanho_pool = MAX_AUTOMACOES_SIMULTANEAS if paralelo else 1
+    definir_perfil_chrome(PERFIL_CHROME)
+    pool = criar_pool_sessoes(tamanho_pool)
+    ativar_prelancamento_sem_pool(pool)
+    try:
+        if opcao == "5":
+            modo_backfill(AUTOMACOES, USUARIO_PADRAO, SENHA_PADRAO, PASTA_DOWNLOADS,
+                          meses_por_bloco=BACKFILL_MESES_POR_BLOCO,
+                          max_workers=BACKFILL_MAX_SIMULTANEOS, pool=pool, forcar=forcar)
+        elif opcao in {"1", "3", "6"}:
+            modo_expresso(AUTOMACOES, USUARIO_PADRAO, SENHA_PADRAO, PASTA_DOWNLOADS,
+                          paralelo=paralelo, max_workers=MAX_AUTOMACOES_SIMULTANEAS, pool=pool,
+                          forcar=forcar, pipeline=pipeline, workers_pipeline=PIPELINE_WORKERS)
+        else:
+            modo_personalizado(AUTOMACOES, USUARIO_PADRAO, SENHA_PADRAO, PASTA_DOWNLOADS,
+                               paralelo=paralelo, max_workers=MAX_AUTOMACOES_SIMULTANEAS, pool=pool,
+                               forcar=forcar, pipeline=pipeline, workers_pipeline=PIPELINE_WORKERS)
+    finally:
+        if pool is not None:
+            pool.encerrar()
+        desativar_prelancamento()
+
+
+# =========================================================
+# ========== LINHA DE COMANDO (SEM PERGUNTAS) ==============
+# =========================================================
+def _selecionar_automacoes(texto: str) -> list:
+    """Converte "todas" ou "1,A_Receber,..." (códigos ou nomes) nos códigos de AUTOMACOES."""
+    if texto.strip().lower() == "todas":
+        return list(AUTOMACOES)
+    por_nome = {nome.lower(): cod for cod, (nome, _, _) in AUTOMACOES.items()}
+    codigos = []
+    for item in (t.strip() for t in texto.split(",") if t.strip()):
+        cod = item if item in AUTOMACOES else por_nome.get(item.lower())
+        if cod is None:
+            raise argparse.ArgumentTypeError(
+                f"automação desconhecida: {item!r} (use {', '.join(AUTOMACOES)}, os nomes ou 'todas')")
+        codigos.append(cod)
+    return codigos
+
+
+def _horarios(texto: str) -> list:
+    """"06:00,13:30" -> ["06:00", "13:30"], validando cada horário."""
+    horarios = [h.strip() for h in texto.split(",") if h.strip()]
+    for h in horarios:
+        try:
+            time.strptime(h, "%H:%M")
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"horário inválido: {h!r} (use HH:MM)")
+    return horarios
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Automações OdontoClean (sem argumentos: menu interativo).")
+    parser.add_argument("--automacoes", type=_selecionar_automacoes, default=None,
+                        help="códigos ou nomes separados por vírgula, ou 'todas'")
+    parser.add_argument("--periodo", choices=list(PERIODOS_NOMEADOS), default="mes_atual")
+    parser.add_argument("--inicio", help="data inicial dd/mm/aaaa (substitui --periodo)")
+    parser.add_argument("--fim", help="data final dd/mm/aaaa")
+    parser.add_argument("--backfill", action="store_true", help="recarrega --inicio..--fim em blocos")
+    parser.add_argument("--meses-por-bloco", type=int, default=BACKFILL_MESES_POR_BLOCO)
+    parser.add_argument("--execucao", choices=EXECUCOES, default="sequencial")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="automações/blocos simultâneos (no pipeline: workers de download)")
+    parser.add_argument("--saida", choices=["texto", "json"], default="texto",
+                        help="json: imprime o resultado como JSON na última linha")
+    parser.add_argument("--force", action="store_true",
+                        help="refaz ETL/upload de arquivos idênticos ao último carregado (vale também no menu)")
+    parser.add_argument("--perfil-chrome", choices=list(PERFIS_CHROME), default=PERFIL_CHROME)
+    agenda = parser.add_mutually_exclusive_group()
+    agenda.add_argument("--agendar", type=_horarios, help="horários HH:MM separados por vírgula; mantém o processo vivo")
+    agenda.add_argument("--intervalo", type=float, help="minutos entre execuções; mantém o processo vivo")
+    return parser
+
+
+def _tamanho_pool(args) -> int:
+    if args.backfill:
+        return args.workers or BACKFILL_MAX_SIMULTANEOS
+    if args.execucao == "pipeline":
+        return args.workers or PIPELINE_WORKERS["download"]
+    if args.execucao == "paralelo":
+        return args.workers or MAX_AUTOMACOES_SIMULTANEAS
+    return 1
+
+
+def executar_linha_de_comando(args, pool) -> dict:
+    """Uma execução completa conforme os argumentos; devolve o resumo (também impresso em JSON se pedido)."""
+    forcar = args.force
+    if args.backfill:
+        if not (args.inicio and args.fim):
+            raise ValueError("--backfill precisa de --inicio e --fim")
+        data_inicio, data_fim = resolver_periodo(inicio=args.inicio, fim=args.fim)
+        resultados = modo_backfill(AUTOMACOES, USUARIO_PADRAO, SENHA_PADRAO, PASTA_DOWNLOADS,
+                                   meses_por_bloco=args.meses_por_bloco, max_workers=_tamanho_pool(args),
+                                   pool=pool, forcar=forcar, escolhidas=args.automacoes,
+                                   data_inicio=data_inicio, data_fim=data_fim)
+        modo = "backfill"
+    else:
+        # período recalculado a cada execução (no agendador, "mes_atual" acompanha o calendário)
+        data_inicio, data_fim = resolver_periodo(args.periodo, args.inicio, args.fim)
+        log(f"Período: {periodo_str(data_inicio, data_fim)} | execução {args.execucao}")
+        workers_pipeline = {**PIPELINE_WORKERS, **({"download": args.workers} if args.workers else {})}
+        resultados = executar_automacoes(
+            [AUTOMACOES[cod] for cod in args.automacoes], USUARIO_PADRAO, SENHA_PADRAO, data_inicio, data_fim,
+            PASTA_DOWNLOADS, args.execucao, args.workers or MAX_AUTOMACOES_SIMULTANEAS, pool, forcar,
+            workers_pipeline, modo="cli",
+        )
+        modo = args.execucao
+
+    resumo = {
+        "modo": modo,
+        "periodo": [data_inicio.strftime("%d/%m/%Y"), data_fim.strftime("%d/%m/%Y")],
+        "resultados": resultados,
+        "sucesso": bool(resultados) and all(resultados.values()),
+    }
+    if args.saida == "json":
+        print(json.dumps(resumo, ensure_ascii=False))
+    return resumo
+
+
+def main_linha_de_comando(argv) -> int:
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.automacoes is None:
+        # sem argumentos (ou só --force): menu interativo
+        if vars(args) != {**vars(parser.parse_args([])), "force": args.force}:
+            parser.error("--automacoes é obrigatório fora do menu interativo")
+        menu_principal(forcar=args.force)
+        return 0
+    try:
+        resolver_periodo(args.periodo, args.inicio, args.fim)
+    except ValueError as e:
+        parser.error(str(e))
+
+    definir_perfil_chrome(args.perfil_chrome)
+    pool = criar_pool_sessoes(_tamanho_pool(args))
+    ativar_prelancamento_sem_pool(pool)
+    try:
+        if args.agendar or args.intervalo:
+            executar_agendado(
+                lambda: executar_linha_de_comando(args, pool),
+                horarios=args.agendar,
+                intervalo_minutos=args.intervalo,
+                preparar=pool.aquecer if pool is not None else None,
+                antecedencia_s=AGENDADOR_ANTECEDENCIA_S,
+            )
+            return 0
+        return 0 if executar_linha_de_comando(args, pool)["sucesso"] else 1
+    finally:
+        if pool is not None:
+            pool.encerrar()
+        desativar_prelancamento()
 
 
 def main() -> None:
     reset_tempo_base()
-    menu_principal()
+    sys.exit(main_linha_de_comando(sys.argv[1:]))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+# benchmark_chrome.py
+"""
+Tempo de lançamento e memória por navegador de cada perfil de Chrome
+(PERFIS_CHROME em functions.py).
+
+Sobe um servidor local com uma página parecida com a tela de login do Codonto
+(imagens, fonte web, CSS com animação) e, para cada perfil, abre o Chrome
+algumas vezes medindo: lançamento (chromedriver + Chrome), carregamento da
+página, RSS/PSS somados da árvore de processos (chromedriver + Chrome + filhos)
+e quantos recursos pesados o servidor chegou a entregar. Medição de memória
+só no Linux (/proc).
+
+Uso:
+    python teste/benchmark_chrome.py                 # 3 lançamentos por perfil
+    python teste/benchmark_chrome.py 5 --saida chrome.json --comparar anterior.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from benchmark_suite import comparar_resultados, salvar_resultados
+from functions import PERFIS_CHROME, _lancar_chrome, fechar_navegador
+
+_PAGINA = b"""<html><head><style>
+@font-face { font-family: Marca; src: url('/fonte.woff2'); }
+body { font-family: Marca, sans-serif; }
+.spinner { animation: girar 1s linear infinite; width: 40px; height: 40px; background: url('/spinner.png'); }
+@keyframes girar { to { transform: rotate(360deg); } }
+</style></head><body>
+<img src='/logo.png'><img src='/banner.jpg'><div class='spinner'></div>
+<input id='login'><input id='pass' type='password'><input id='checkTermsOfUse' type='checkbox'>
+<button id='btnSubmit'>Entrar</button>
+</body></html>"""
+_PESADOS = {"/logo.png": "image/png", "/banner.jpg": "image/jpeg", "/spinner.png": "image/png",
+            "/fonte.woff2": "font/woff2"}
+
+
+class _ServidorPagina(BaseHTTPRequestHandler):
+    entregues = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path in _PESADOS:
+            with _ServidorPagina._lock:
+                _ServidorPagina.entregues += 1
+            corpo, tipo = os.urandom(512 * 1024), _PESADOS[self.path]
+        else:
+            corpo, tipo = _PAGINA, "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def _arvore_processos(pid: int) -> list:
+    """pid e todos os descendentes (via /proc/*/stat)."""
+    filhos = {}
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        filhos.setdefault(ppid, []).append(int(nome))
+    arvore, pendentes = [], [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        arvore.append(atual)
+        pendentes += filhos.get(atual, [])
+    return arvore
+
+
+def _memoria_mb(pid: int) -> (float, float):
+    """(RSS somado, PSS somado) em MB da árvore do chromedriver. PSS não conta 2x a memória compartilhada."""
+    rss = pss = 0
+    for p in _arvore_processos(pid):
+        for arquivo, campo in (("status", "VmRSS:"), ("smaps_rollup", "Pss:")):
+            try:
+                with open(f"/proc/{p}/{arquivo}") as f:
+                    kb = next((int(l.split()[1]) for l in f if l.startswith(campo)), 0)
+            except OSError:
+                kb = 0
+            if campo == "VmRSS:":
+                rss += kb
+            else:
+                pss += kb
+    return rss / 1024, pss / 1024
+
+
+def benchmark_perfil(perfil: str, url: str, repeticoes: int) -> list:
+    lancamentos, carregamentos, rss, pss, pesados = [], [], [], [], []
+    for _ in range(repeticoes):
+        _ServidorPagina.entregues = 0
+        pasta = tempfile.mkdtemp(prefix="chrome_")
+        t0 = time.perf_counter()
+        driver = _lancar_chrome(pasta_download=pasta, perfil=perfil)
+        t1 = time.perf_counter()
+        try:
+            driver.get(url)
+            t2 = time.perf_counter()
+            time.sleep(1.0)   # deixa os recursos que não bloqueiam o load terminarem
+            memoria = _memoria_mb(driver.service.process.pid)
+        finally:
+            fechar_navegador(driver)
+        lancamentos.append(t1 - t0)
+        carregamentos.append(t2 - t1)
+        rss.append(memoria[0])
+        pss.append(memoria[1])
+        pesados.append(_ServidorPagina.entregues)
+
+    resumo = {
+        "lancamento_s": min(lancamentos),
+        "carregamento_s": min(carregamentos),
+        "rss_mb": max(rss),
+        "pss_mb": max(pss),
+        "recursos_pesados": max(pesados),
+    }
+    print(f"        {perfil:<10}: lança {resumo['lancamento_s']:6.2f}s  carrega {resumo['carregamento_s']:6.3f}s  "
+          f"RSS {resumo['rss_mb']:7.1f} MB  PSS {resumo['pss_mb']:7.1f} MB  "
+          f"pesados {resumo['recursos_pesados']}/{len(_PESADOS)}")
+    return [
+        {"layout": perfil, "linhas": 0, "etapa": "chrome_lancamento", "segundos": round(resumo["lancamento_s"], 4),
+         "rss_mb": round(resumo["rss_mb"], 1), "pss_mb": round(resumo["pss_mb"], 1)},
+        {"layout": perfil, "linhas": 0, "etapa": "chrome_carregamento", "segundos": round(resumo["carregamento_s"], 4),
+         "recursos_pesados": resumo["recursos_pesados"]},
+    ]
+
+
+# ============= Execução direta =============
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lançamento e memória por perfil de Chrome.")
+    parser.add_argument("repeticoes", nargs="?", type=int, default=3)
+    parser.add_argument("--perfis", default=",".join(PERFIS_CHROME))
+    parser.add_argument("--saida", help="arquivo JSON (padrão: teste/resultados_benchmark/)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ServidorPagina)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/"
+    try:
+        print(f"[BENCH] Chrome por perfil (melhor tempo / maior memória de {args.repeticoes} lançamentos)")
+        resultados = []
+        for perfil in args.perfis.split(","):
+            resultados += benchmark_perfil(perfil.strip(), url, args.repeticoes)
+    finally:
+        servidor.shutdown()
+
+    print(f"[OK] Resultados salvos em {salvar_resultados(resultados, args.saida)}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar_resultados(json.load(f), resultados)
@@ -0,0 +1,300 @@
+# benchmark_etl.py
+"""
+Benchmarks das etapas do ETL (teste_etl.py) sobre planilhas sintéticas
+no formato dos relatórios do Codonto.
+
+Uso:
+    python teste/benchmark_etl.py            # 500 mil linhas
+    python teste/benchmark_etl.py 100000     # outro tamanho
+
+A leitura de xlsx usa no máximo LINHAS_XLSX linhas (gravar o arquivo com
+openpyxl já é lento).
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from teste_etl import (
+    EXCLUIR_NUMERICAS,
+    LEITORES_EXCEL,
+    _etl_lote,
+    _parece_numerico_series,
+    converter_colunas_numericas,
+    _pyarrow_disponivel,
+    ler_relatorio,
+    limpar_nomes_colunas,
+    normalizar_numeros_coluna,
+    remover_acentos,
+    remover_acentos_series,
+    salvar_parquet,
+    validar_parquet,
+)
+
+# ============= Geração de dados sintéticos =============
+_NOMES = ["José", "João", "Maria", "Conceição", "Antônio", "Luíza", "Sebastião", "Cláudia", "Márcio", "Ana"]
+_SOBRENOMES = ["da Silva", "Araújo", "Gonçalves", "Simões", "Brandão", "Lima", "Sá", "Guimarães", "Peçanha", "Souza"]
+_FORMAS = ["Cartão de Crédito", "Cartão de Débito", "Pix", "Dinheiro", "Boleto Bancário", "Transferência"]
+_PROCEDIMENTOS = ["Manutenção Ortodôntica", "Clareamento", "Restauração", "Extração", "Avaliação", "Prótese"]
+
+
+def gerar_planilha_codonto(n_linhas: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Gera um DataFrame com cabeçalhos e valores no formato do relatório
+    'Fluxo de Caixa' (textos acentuados, datas e valores no padrão BR).
+    """
+    rng = np.random.default_rng(seed)
+    pacientes = np.array([f"{n} {s} {i}" for i in range(500) for n, s in zip(_NOMES, _SOBRENOMES)], dtype=object)
+    valores = rng.integers(1_000, 500_000_00, n_linhas) / 100
+    datas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n_linhas), unit="D")
+
+    return pd.DataFrame({
+        "Data": datas.strftime("%d/%m/%Y"),
+        "Paciente": rng.choice(pacientes, n_linhas),
+        "Forma de Pagamento": rng.choice(np.array(_FORMAS, dtype=object), n_linhas),
+        "Descrição": rng.choice(np.array(_PROCEDIMENTOS, dtype=object), n_linhas),
+        "Valor Recebido": [f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for v in valores],
+        "Contrato": rng.integers(10_000, 99_999, n_linhas).astype(str),
+    })
+
+
+def _valores_br(rng, n_linhas: int, minimo: int = 1_000, maximo: int = 500_000_00) -> list:
+    """Valores em reais como texto no padrão BR ("12.345,67")."""
+    valores = rng.integers(minimo, maximo, n_linhas) / 100
+    return [f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for v in valores]
+
+
+def _datas_br(rng, n_linhas: int) -> pd.Index:
+    return (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n_linhas), unit="D")).strftime("%d/%m/%Y")
+
+
+def gerar_planilha_a_receber(n_linhas: int, seed: int = 0) -> pd.DataFrame:
+    """Layout do relatório 'Títulos a Receber' (parcelas, CPF com zeros à esquerda, situação)."""
+    rng = np.random.default_rng(seed)
+    pacientes = np.array([f"{n} {s} {i}" for i in range(500) for n, s in zip(_NOMES, _SOBRENOMES)], dtype=object)
+    total_parcelas = rng.integers(1, 24, n_linhas)
+    return pd.DataFrame({
+        "Vencimento": _datas_br(rng, n_linhas),
+        "Paciente": rng.choice(pacientes, n_linhas),
+        "CPF": [f"{v:011d}" for v in rng.integers(0, 10**11, n_linhas)],
+        "Contrato": rng.integers(10_000, 99_999, n_linhas).astype(str),
+        "Parcela": [f"{rng.integers(1, t + 1)}/{t}" for t in total_parcelas],
+        "Valor Devido": _valores_br(rng, n_linhas),
+        "Valor Pago": _valores_br(rng, n_linhas, 0),
+        "Situação": rng.choice(np.array(["Em Aberto", "Vencido", "Pago Parcial", "Negociação"], dtype=object), n_linhas),
+    })
+
+
+def gerar_planilha_contratos(n_linhas: int, seed: int = 0) -> pd.DataFrame:
+    """Layout do relatório 'Contratos Emitidos' (dentista, plano, totais e desconto)."""
+    rng = np.random.default_rng(seed)
+    pacientes = np.array([f"{n} {s} {i}" for i in range(500) for n, s in zip(_NOMES, _SOBRENOMES)], dtype=object)
+    dentistas = np.array([f"Dr(a). {n} {s}" for n, s in zip(_NOMES, reversed(_SOBRENOMES))], dtype=object)
+    return pd.DataFrame({
+        "Emissão": _datas_br(rng, n_linhas),
+        "Contrato": rng.integers(10_000, 99_999, n_linhas).astype(str),
+        "Paciente": rng.choice(pacientes, n_linhas),
+        "Dentista": rng.choice(dentistas, n_linhas),
+        "Procedimento": rng.choice(np.array(_PROCEDIMENTOS, dtype=object), n_linhas),
+        "Total Tratamento": _valores_br(rng, n_linhas),
+        "Desconto": _valores_br(rng, n_linhas, 0, 50_000),
+        "Situação": rng.choice(np.array(["Aprovado", "Em Tratamento", "Finalizado", "Cancelado"], dtype=object), n_linhas),
+    })
+
+
+# layout -> (gerador, skip_top, skip_bottom), como nos ETL_CONFIG de automations/
+LAYOUTS_CODONTO = {
+    "Recebidos": (gerar_planilha_codonto, 0, 2),
+    "A_Receber": (gerar_planilha_a_receber, 2, 2),
+    "Contratos": (gerar_planilha_contratos, 2, 0),
+}
+
+
+def gravar_relatorio_xlsx(df: pd.DataFrame, caminho: str, skip_top: int = 2, skip_bottom: int = 2) -> str:
+    """Grava o DataFrame como o Codonto exporta: título/período no topo e totais no rodapé."""
+    with pd.ExcelWriter(caminho, engine="openpyxl") as writer:
+        topo = [["ControleODONTO - Relatório"], ["Período: 01/01/2024 a 31/12/2024"], [""]][:skip_top]
+        pd.DataFrame(topo).to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=skip_top)
+        rodape = [["Total"], ["Gerado em 01/01/2025"]][:skip_bottom]
+        pd.DataFrame(rodape).to_excel(writer, index=False, header=False, startrow=skip_top + len(df) + 1)
+    return caminho
+
+
+def _cronometrar(func, *args, repeticoes: int = 3) -> float:
+    """Retorna o melhor tempo (s) entre algumas repetições."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func(*args)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+# ============= Benchmarks =============
+def benchmark_remover_acentos(df: pd.DataFrame) -> None:
+    """Compara map(remover_acentos) com remover_acentos_series em todas as colunas texto."""
+    colunas = [c for c in df.columns if df[c].dtype == "object"]
+
+    def por_celula():
+        return {c: df[c].map(remover_acentos) for c in colunas}
+
+    def vetorizado():
+        return {c: remover_acentos_series(df[c]) for c in colunas}
+
+    antes, depois = por_celula(), vetorizado()
+    for c in colunas:
+        pd.testing.assert_series_equal(antes[c], depois[c])
+
+    t_antes = _cronometrar(por_celula)
+    t_depois = _cronometrar(vetorizado)
+    print(f"[BENCH] remover_acentos ({len(df):,} linhas x {len(colunas)} colunas)")
+    print(f"        map por célula : {t_antes:8.3f}s")
+    print(f"        vetorizado     : {t_depois:8.3f}s  ({t_antes / t_depois:.1f}x)")
+
+
+def _converter_numericas_multipassada(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementação anterior de converter_colunas_numericas (regex em todas as linhas + 5 replaces)."""
+    for col in df.columns:
+        if col in EXCLUIR_NUMERICAS:
+            continue
+        s = df[col]
+        if s.dtype == "object" and _parece_numerico_series(s):
+            df[col] = normalizar_numeros_coluna(s)
+    return df
+
+
+def benchmark_converter_numericas(df: pd.DataFrame) -> None:
+    """Compara a detecção/conversão em várias passadas com a de passada única."""
+    base = limpar_nomes_colunas(df.copy())
+
+    antes = _converter_numericas_multipassada(base.copy())
+    depois, _ = converter_colunas_numericas(base.copy())
+    pd.testing.assert_frame_equal(antes, depois)
+
+    t_antes = _cronometrar(lambda: _converter_numericas_multipassada(base.copy()))
+    t_depois = _cronometrar(lambda: converter_colunas_numericas(base.copy()))
+    print(f"[BENCH] converter_colunas_numericas ({len(df):,} linhas x {len(df.columns)} colunas)")
+    print(f"        várias passadas: {t_antes:8.3f}s")
+    print(f"        passada única  : {t_depois:8.3f}s  ({t_antes / t_depois:.1f}x)")
+
+
+LINHAS_XLSX = 100_000
+
+def benchmark_leitores(df: pd.DataFrame) -> None:
+    """Tempo de ler_relatorio (com skip_top/skip_bottom) para cada leitor instalado."""
+    df = df.head(LINHAS_XLSX)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = gravar_relatorio_xlsx(df, os.path.join(pasta, "relatorio.xlsx"))
+        lidos, tempos = {}, {}
+        for leitor, disponivel in LEITORES_EXCEL.items():
+            if not disponivel():
+                print(f"[BENCH] leitor {leitor}: não instalado, pulando")
+                continue
+            lidos[leitor] = ler_relatorio(caminho, 2, 2, leitor=leitor)
+            tempos[leitor] = _cronometrar(lambda: ler_relatorio(caminho, 2, 2, leitor=leitor), repeticoes=1)
+
+    referencia = lidos["openpyxl"]
+    assert len(referencia) == len(df) and list(referencia.columns) == list(df.columns)
+    for lido in lidos.values():
+        pd.testing.assert_frame_equal(lido, referencia)
+
+    print(f"[BENCH] ler_relatorio ({len(df):,} linhas x {len(df.columns)} colunas)")
+    base = tempos.get("openpyxl")
+    for leitor, t in tempos.items():
+        ganho = f"  ({base / t:.1f}x)" if base and leitor != "openpyxl" else ""
+        print(f"        {leitor:<15}: {t:8.3f}s{ganho}")
+
+
+def benchmark_esquema_cache(df: pd.DataFrame) -> None:
+    """Etapas do ETL com inferência completa x com o schema em cache (nomes e numéricas conhecidos)."""
+    inferido, _ = _etl_lote(df.copy())
+    numericas = {c for c in inferido.columns if pd.api.types.is_numeric_dtype(inferido[c])}
+    nomes = list(inferido.columns)
+    em_cache, _ = _etl_lote(df.copy(), numericas, nomes)
+    pd.testing.assert_frame_equal(inferido, em_cache)
+
+    t_inferencia = _cronometrar(lambda: _etl_lote(df.copy()))
+    t_cache = _cronometrar(lambda: _etl_lote(df.copy(), numericas, nomes))
+    print(f"[BENCH] ETL em memória ({len(df):,} linhas x {len(df.columns)} colunas)")
+    print(f"        com inferência : {t_inferencia:8.3f}s")
+    print(f"        schema em cache: {t_cache:8.3f}s  ({t_inferencia / t_cache:.1f}x)")
+
+
+def benchmark_saida_etl(df: pd.DataFrame) -> None:
+    """Grava o resultado do ETL em xlsx x Parquet e relê para validação."""
+    if not _pyarrow_disponivel():
+        print("[BENCH] saída Parquet: pyarrow não instalado, pulando")
+        return
+    df, _ = converter_colunas_numericas(limpar_nomes_colunas(df.head(LINHAS_XLSX).copy()))
+    with tempfile.TemporaryDirectory() as pasta:
+        xlsx, parquet = os.path.join(pasta, "saida.xlsx"), os.path.join(pasta, "saida.parquet")
+        t_xlsx = _cronometrar(lambda: df.to_excel(xlsx, index=False, engine="openpyxl"), repeticoes=1)
+        t_parquet = _cronometrar(lambda: salvar_parquet(df, parquet))
+        t_releitura_xlsx = _cronometrar(lambda: ler_relatorio(xlsx), repeticoes=1)
+        t_releitura_parquet = _cronometrar(lambda: validar_parquet(parquet, len(df)))
+        pd.testing.assert_frame_equal(pd.read_parquet(parquet), df.reset_index(drop=True))
+        mb_xlsx, mb_parquet = os.path.getsize(xlsx) / 2**20, os.path.getsize(parquet) / 2**20
+
+    print(f"[BENCH] saída do ETL ({len(df):,} linhas)")
+    print(f"        xlsx   : grava {t_xlsx:7.3f}s  relê {t_releitura_xlsx:7.3f}s  {mb_xlsx:6.1f} MB")
+    print(f"        parquet: grava {t_parquet:7.3f}s  valida {t_releitura_parquet:6.4f}s  {mb_parquet:6.1f} MB")
+
+
+# VmHWM e não ru_maxrss: no Linux o ru_maxrss do filho herda o pico do processo pai
+_SCRIPT_PICO_MEMORIA = """
+import sys, time
+sys.path.insert(0, {pasta!r})
+from teste_etl import etl_teste, etl_teste_streaming
+t0 = time.perf_counter()
+{chamada}
+segundos = time.perf_counter() - t0
+with open("/proc/self/status") as f:
+    pico_kb = next(l.split()[1] for l in f if l.startswith("VmHWM:"))
+print(segundos, pico_kb)
+"""
+
+def _medir_em_subprocesso(chamada: str) -> (float, float):
+    """Roda a chamada num Python novo e devolve (segundos, pico de RSS em MB). Só Linux."""
+    codigo = _SCRIPT_PICO_MEMORIA.format(pasta=os.path.dirname(os.path.abspath(__file__)), chamada=chamada)
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    segundos, pico_kb = saida.stdout.strip().splitlines()[-1].split()
+    return float(segundos), int(pico_kb) / 1024
+
+def benchmark_etl_streaming(df: pd.DataFrame, tamanho_lote: int = 20_000) -> None:
+    """Tempo e pico de memória do etl_teste inteiro x etl_teste_streaming, com a mesma saída."""
+    df = df.head(LINHAS_XLSX)
+    with tempfile.TemporaryDirectory() as pasta:
+        inteiro = gravar_relatorio_xlsx(df, os.path.join(pasta, "inteiro.xlsx"))
+        lotes = shutil.copy(inteiro, os.path.join(pasta, "lotes.xlsx"))
+
+        t_inteiro, mb_inteiro = _medir_em_subprocesso(f"etl_teste({inteiro!r}, 2, 2, leitor='openpyxl')")
+        t_lotes, mb_lotes = _medir_em_subprocesso(f"etl_teste_streaming({lotes!r}, 2, 2, {tamanho_lote})")
+
+        esperado = pd.read_excel(inteiro.replace(".xlsx", "_ETL.xlsx"))
+        obtido = pd.read_excel(lotes.replace(".xlsx", "_ETL.xlsx"))
+        pd.testing.assert_frame_equal(esperado, obtido)
+
+    print(f"[BENCH] ETL completo ({len(df):,} linhas, openpyxl; lotes de {tamanho_lote:,})")
+    print(f"        DataFrame inteiro: {t_inteiro:8.3f}s  pico {mb_inteiro:7.1f} MB")
+    print(f"        streaming        : {t_lotes:8.3f}s  pico {mb_lotes:7.1f} MB")
+
+
+# ============= Execução direta =============
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    print(f"[INFO] Gerando planilha sintética com {n:,} linhas...")
+    df = gerar_planilha_codonto(n)
+    benchmark_leitores(df)
+    benchmark_etl_streaming(df)
+    benchmark_saida_etl(df)
+    benchmark_remover_acentos(df)
+    benchmark_converter_numericas(df)
+    benchmark_esquema_cache(df)
@@ -0,0 +1,240 @@
+# benchmark_suite.py
+"""
+Suíte de benchmarks dos caminhos quentes, com resultado em JSON para comparar
+versões do código.
+
+Para cada layout do Codonto (Recebidos, A_Receber, Contratos) e cada tamanho,
+gera uma planilha sintética e mede: leitura (ler_relatorio), limpar_nomes_colunas,
+remover_acentos, converter_colunas_numericas e escrita (Parquet e xlsx).
+Também mede aguardar_novo_download (inotify e varredura) numa pasta com
+milhares de arquivos.
+
+Uso:
+    python teste/benchmark_suite.py                                  # 10k e 100k linhas
+    python teste/benchmark_suite.py --linhas 10000,100000,1000000 --layouts A_Receber
+    python teste/benchmark_suite.py --comparar teste/resultados_benchmark/anterior.json
+
+Gravar/ler xlsx com mais de --max-linhas-xlsx linhas é pulado (só o openpyxl
+levaria minutos para gravar a planilha de entrada); as demais etapas rodam
+em todos os tamanhos. Com --comparar, sai com código 1 se alguma etapa ficou
+mais lenta que a tolerância.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_etl import LAYOUTS_CODONTO, LINHAS_XLSX, _cronometrar, gravar_relatorio_xlsx
+from teste_etl import (
+    _pyarrow_disponivel,
+    converter_colunas_numericas,
+    escolher_leitor,
+    ler_relatorio,
+    limpar_nomes_colunas,
+    remover_acentos_series,
+    salvar_parquet,
+)
+from functions import aguardar_novo_download, inotify_disponivel, snapshot_downloads
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASTA_RESULTADOS = os.path.join(BASE_DIR, "resultados_benchmark")
+TOLERANCIA_REGRESSAO = 1.2   # atual/base acima disso conta como regressão
+
+
+# ============= Etapas do ETL =============
+def benchmark_etapas_etl(layout: str, n_linhas: int, max_linhas_xlsx: int, repeticoes: int) -> list:
+    """Mede cada etapa do ETL para um layout/tamanho; devolve os resultados como dicts."""
+    gerar, skip_top, skip_bottom = LAYOUTS_CODONTO[layout]
+    df_gerado = gerar(n_linhas)
+    resultados = []
+
+    def registrar(etapa: str, segundos: float, **extra) -> None:
+        resultados.append({"layout": layout, "linhas": n_linhas, "etapa": etapa, "segundos": round(segundos, 5), **extra})
+        print(f"        {etapa:<28}: {segundos:9.4f}s")
+
+    print(f"[BENCH] {layout} ({n_linhas:,} linhas x {len(df_gerado.columns)} colunas)")
+    with tempfile.TemporaryDirectory() as pasta:
+        xlsx = n_linhas <= max_linhas_xlsx
+        if xlsx:
+            caminho = gravar_relatorio_xlsx(df_gerado, os.path.join(pasta, "relatorio.xlsx"), skip_top, skip_bottom)
+            leitor = escolher_leitor()
+            df = ler_relatorio(caminho, skip_top, skip_bottom)
+            assert len(df) == n_linhas, (len(df), n_linhas)
+            registrar("leitura_xlsx", _cronometrar(lambda: ler_relatorio(caminho, skip_top, skip_bottom), repeticoes=1),
+                      leitor=leitor, bytes=os.path.getsize(caminho))
+        else:
+            print(f"        (xlsx pulado: {n_linhas:,} > --max-linhas-xlsx {max_linhas_xlsx:,})")
+            df = df_gerado
+
+        registrar("limpar_nomes_colunas", _cronometrar(lambda: limpar_nomes_colunas(df.copy()), repeticoes=repeticoes))
+        df = limpar_nomes_colunas(df.copy())
+
+        colunas_texto = [c for c in df.columns if df[c].dtype == "object"]
+        registrar("remover_acentos", _cronometrar(lambda: [remover_acentos_series(df[c]) for c in colunas_texto],
+                                                   repeticoes=repeticoes))
+        for c in colunas_texto:
+            df[c] = remover_acentos_series(df[c])
+
+        registrar("converter_colunas_numericas",
+                  _cronometrar(lambda: converter_colunas_numericas(df.copy()), repeticoes=repeticoes))
+        df, _ = converter_colunas_numericas(df)
+
+        if _pyarrow_disponivel():
+            parquet = os.path.join(pasta, "saida.parquet")
+            registrar("escrita_parquet", _cronometrar(lambda: salvar_parquet(df, parquet), repeticoes=repeticoes),
+                      bytes=os.path.getsize(parquet))
+        if xlsx:
+            saida = os.path.join(pasta, "saida.xlsx")
+            registrar("escrita_xlsx", _cronometrar(lambda: df.to_excel(saida, index=False, engine="openpyxl"),
+                                                   repeticoes=1), bytes=os.path.getsize(saida))
+    return resultados
+
+
+# ============= Espera de download =============
+def _simular_download(pasta: str, nome: str, atraso: float, marcas: dict) -> None:
+    """Imita o Chrome: grava o .crdownload e renomeia para o nome final após `atraso`."""
+    time.sleep(atraso)
+    temporario = os.path.join(pasta, nome + ".crdownload")
+    with open(temporario, "wb") as f:
+        f.write(b"x" * 64 * 1024)
+    marcas["pronto"] = time.perf_counter()
+    os.replace(temporario, os.path.join(pasta, nome))
+
+
+def benchmark_espera_download(n_arquivos: int = 5_000, repeticoes: int = 5, atraso: float = 0.2) -> list:
+    """Latência entre o arquivo ficar pronto e aguardar_novo_download devolvê-lo, com a pasta cheia."""
+    resultados = []
+    modos = {"varredura": False}
+    if inotify_disponivel():
+        modos = {"inotify": True, **modos}
+
+    print(f"[BENCH] aguardar_novo_download ({n_arquivos:,} arquivos na pasta, mediana de {repeticoes})")
+    with tempfile.TemporaryDirectory() as pasta:
+        for i in range(n_arquivos):
+            open(os.path.join(pasta, f"ControleODONTO Relatório ({i}).xlsx"), "wb").close()
+
+        t_snapshot = _cronometrar(lambda: snapshot_downloads(pasta), repeticoes=repeticoes)
+        resultados.append({"layout": "-", "linhas": n_arquivos, "etapa": "snapshot_downloads",
+                           "segundos": round(t_snapshot, 5)})
+        print(f"        {'snapshot_downloads':<28}: {t_snapshot:9.4f}s")
+
+        for modo, usar_inotify in modos.items():
+            latencias = []
+            for r in range(repeticoes):
+                nome = f"ControleODONTO Fluxo de Caixa {modo} {r}.xlsx"
+                snapshot = snapshot_downloads(pasta)
+                marcas = {}
+                t = threading.Thread(target=_simular_download, args=(pasta, nome, atraso, marcas))
+                t.start()
+                caminho = aguardar_novo_download(pasta, snapshot, nome_substring="Fluxo de Caixa", timeout=30,
+                                                 usar_inotify=usar_inotify)
+                detectado = time.perf_counter()
+                t.join()
+                assert os.path.basename(caminho) == nome, caminho
+                latencias.append(detectado - marcas["pronto"])
+            latencia = statistics.median(latencias)
+            resultados.append({"layout": "-", "linhas": n_arquivos, "etapa": f"espera_download_{modo}",
+                               "segundos": round(latencia, 5), "maximo": round(max(latencias), 5)})
+            print(f"        {'espera_download_' + modo:<28}: {latencia:9.4f}s  (máx {max(latencias):.4f}s)")
+    return resultados
+
+
+# ============= Resultado em JSON e comparação =============
+def _versao_codigo() -> str:
+    """Commit atual (com '+' se há alterações locais); '?' fora de um repositório git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("+" if sujo else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "?"
+
+
+def salvar_resultados(resultados: list, caminho: str = None) -> str:
+    """Grava os resultados com metadados do ambiente (versão, Python, pandas, máquina)."""
+    versao = _versao_codigo()
+    if caminho is None:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+        caminho = os.path.join(PASTA_RESULTADOS, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}_{versao.rstrip('+')}.json")
+    dados = {
+        "versao": versao,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "resultados": resultados,
+    }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=1)
+    return caminho
+
+
+def comparar_resultados(base: dict, resultados: list, tolerancia: float = TOLERANCIA_REGRESSAO) -> list:
+    """Imprime atual x base por etapa; devolve as etapas que pioraram além da tolerância."""
+    chave = lambda r: (r["layout"], r["linhas"], r["etapa"])
+    anteriores = {chave(r): r["segundos"] for r in base["resultados"]}
+    regressoes = []
+
+    print(f"\n[BENCH] comparação com a versão {base.get('versao', '?')} ({base.get('data', '?')})")
+    for r in resultados:
+        antes = anteriores.get(chave(r))
+        if not antes:
+            continue
+        razao = r["segundos"] / antes
+        marca = ""
+        if razao > tolerancia:
+            marca = "  <-- REGRESSÃO"
+            regressoes.append({**r, "segundos_base": antes})
+        print(f"        {r['layout']:<10}{r['linhas']:>9,}  {r['etapa']:<28}{antes:9.4f}s -> {r['segundos']:9.4f}s"
+              f"  ({razao:.2f}x){marca}")
+    return regressoes
+
+
+# ============= Execução direta =============
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do ETL e da espera de download.")
+    parser.add_argument("--linhas", default="10000,100000", help="tamanhos separados por vírgula")
+    parser.add_argument("--layouts", default=",".join(LAYOUTS_CODONTO), help="layouts separados por vírgula")
+    parser.add_argument("--max-linhas-xlsx", type=int, default=LINHAS_XLSX)
+    parser.add_argument("--repeticoes", type=int, default=3, help="melhor de N nas etapas em memória")
+    parser.add_argument("--arquivos-pasta", type=int, default=5_000, help="arquivos na pasta de download (0 pula)")
+    parser.add_argument("--saida", help="arquivo JSON (padrão: teste/resultados_benchmark/)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_REGRESSAO)
+    args = parser.parse_args()
+
+    resultados = []
+    for layout in args.layouts.split(","):
+        for n in (int(v) for v in args.linhas.split(",")):
+            resultados += benchmark_etapas_etl(layout.strip(), n, args.max_linhas_xlsx, args.repeticoes)
+    if args.arquivos_pasta:
+        resultados += benchmark_espera_download(args.arquivos_pasta)
+
+    caminho = salvar_resultados(resultados, args.saida)
+    print(f"[OK] Resultados salvos em {caminho}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar_resultados(json.load(f), resultados, args.tolerancia)
+        if regressoes:
+            print(f"[WARN] {len(regressoes)} etapa(s) mais lenta(s) que {args.tolerancia:.2f}x a base")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
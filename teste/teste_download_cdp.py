@@ -0,0 +1,148 @@
+"""
+TESTE — Download via eventos do DevTools (CDP)
+----------------------------------------------
+Sobe um servidor HTTP local que entrega um .xlsx como anexo,
+abre o Chrome com eventos de download ligados, clica no link
+e confere se `aguardar_download_cdp` devolve o caminho exato.
+
+Os testes `testar_eventos_page_*` não abrem o Chrome: um driver falso
+devolve o log de performance (só eventos Page.*, como o chromedriver).
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === Corrige o path para importar de automacoes_codonto ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.append(ROOT_DIR)
+
+import pandas as pd
+
+import functions
+from functions import (
+    iniciar_chrome,
+    interagir_elementos,
+    preparar_espera_download,
+    aguardar_download_cdp,
+    fechar_navegador_assincrono,
+    log,
+)
+
+NOME_ARQUIVO = "ControleODONTO Fluxo de Caixa.xlsx"
+
+
+def _gerar_xlsx() -> bytes:
+    """Gera um xlsx pequeno em memória, no formato do relatório de recebidos."""
+    buffer = io.BytesIO()
+    pd.DataFrame({"Data": ["01/10/2025"], "Valor Recebido": ["1.234,56"]}).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+class _ServidorRelatorio(BaseHTTPRequestHandler):
+    conteudo = _gerar_xlsx()
+
+    def do_GET(self):
+        if self.path == "/exportar":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            self.send_header("Content-Disposition", f'attachment; filename="{NOME_ARQUIVO}"')
+            self.send_header("Content-Length", str(len(self.conteudo)))
+            self.end_headers()
+            self.wfile.write(self.conteudo)
+        else:
+            pagina = b"<html><body><a title='Download em formato Excel' href='/exportar'>Excel</a></body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(pagina)
+
+    def log_message(self, *args):
+        pass
+
+
+def testar_download_cdp() -> None:
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ServidorRelatorio)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/"
+
+    pasta = tempfile.mkdtemp(prefix="cdp_")
+    driver = iniciar_chrome(url_inicial=url, pasta_download=pasta, eventos_download=True)
+    try:
+        preparar_espera_download(driver, pasta)
+        interagir_elementos(driver, [{"xpath": "//a[@title='Download em formato Excel']", "descricao": "Download Excel"}])
+        caminho = aguardar_download_cdp(driver, nome_substring="Fluxo de Caixa", timeout=20)
+
+        assert os.path.basename(caminho) == NOME_ARQUIVO, caminho
+        with open(caminho, "rb") as f:
+            assert f.read() == _ServidorRelatorio.conteudo
+        log(f"✅ Download reportado pelo Chrome: {caminho}", "OK")
+    finally:
+        fechar_navegador_assincrono(driver, timeout=3.0)
+        servidor.shutdown()
+
+
+class _DriverFalso:
+    """Driver com `get_log("performance")` roteirizado (uma lista de eventos por chamada)."""
+
+    def __init__(self, pasta: str, lotes):
+        self.pasta_download_cdp = pasta
+        self._lotes = list(lotes)
+
+    def get_log(self, tipo: str):
+        lote = self._lotes.pop(0) if self._lotes else []
+        return [{"message": json.dumps({"message": {"method": metodo, "params": params}})} for metodo, params in lote]
+
+
+def testar_eventos_page_download() -> None:
+    pasta = tempfile.mkdtemp(prefix="cdp_page_")
+    guid = str(uuid.uuid4())
+    with open(os.path.join(pasta, guid), "wb") as f:
+        f.write(_ServidorRelatorio.conteudo)
+    driver = _DriverFalso(pasta, [
+        [("Page.downloadWillBegin", {"guid": "outro", "suggestedFilename": "Outro.xlsx"}),
+         ("Page.downloadWillBegin", {"guid": guid, "suggestedFilename": NOME_ARQUIVO})],
+        [("Page.downloadProgress", {"guid": guid, "state": "inProgress"})],
+        [("Page.downloadProgress", {"guid": guid, "state": "completed"})],
+    ])
+    caminho = aguardar_download_cdp(driver, nome_substring="Fluxo de Caixa", timeout=5, intervalo_polls=0.01)
+    assert caminho == os.path.join(pasta, NOME_ARQUIVO), caminho
+    log("✅ Page.downloadWillBegin/downloadProgress → arquivo renomeado", "OK")
+
+
+def testar_eventos_page_ausentes() -> None:
+    """Sem eventos, o arquivo <GUID> da pasta é aceito logo após ESPERA_EVENTO_DOWNLOAD_S (não no timeout)."""
+    pasta = tempfile.mkdtemp(prefix="cdp_sem_eventos_")
+    with open(os.path.join(pasta, "antigo.xlsx"), "wb") as f:
+        f.write(b"x")
+    snapshot = set(os.listdir(pasta))
+    guid = str(uuid.uuid4())
+    with open(os.path.join(pasta, guid), "wb") as f:
+        f.write(_ServidorRelatorio.conteudo)
+
+    espera_original, functions.ESPERA_EVENTO_DOWNLOAD_S = functions.ESPERA_EVENTO_DOWNLOAD_S, 0.2
+    try:
+        inicio = time.time()
+        caminho = aguardar_download_cdp(_DriverFalso(pasta, []), nome_substring="Fluxo de Caixa", timeout=10,
+                                        intervalo_polls=0.05, snapshot_anterior=snapshot)
+    finally:
+        functions.ESPERA_EVENTO_DOWNLOAD_S = espera_original
+    assert time.time() - inicio < 2, time.time() - inicio
+    assert caminho == os.path.join(pasta, guid + ".xlsx"), caminho
+    log("✅ Sem eventos do Chrome: arquivo <GUID> da pasta aceito sem esperar o timeout", "OK")
+
+
+# ==========================================================
+# Execução direta
+# ==========================================================
+if __name__ == "__main__":
+    testar_eventos_page_download()
+    testar_eventos_page_ausentes()
+    testar_download_cdp()
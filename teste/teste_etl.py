@@ -1,15 +1,56 @@
 # teste_etl.py
+import hashlib
+import json
 import os
 import re
+import sys
+from collections import deque
+from datetime import datetime
+import numpy as np
 import pandas as pd
 import unicodedata
 
+# === Corrige o path para importar de automacoes_codonto ===
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+
+from functions import medir
+
 # ============= Helpers de texto =============
 def remover_acentos(texto: str):
     if isinstance(texto, str):
         return unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
     return texto
 
+def remover_acentos_series(s: pd.Series) -> pd.Series:
+    """
+    Equivalente vetorizado de s.map(remover_acentos), com saída idêntica.
+    Em vez de normalizar célula a célula, fatoriza a coluna e normaliza só os
+    valores únicos de texto (uma vez cada, pulando os que já são ASCII);
+    o resultado é espalhado de volta pelos códigos do factorize.
+    Valores que não são texto ficam intactos.
+    """
+    codigos, unicos = pd.factorize(s, use_na_sentinel=True)
+    if pd.api.types.infer_dtype(unicos, skipna=False) == "string":
+        eh_texto = np.ones(len(unicos), dtype=bool)
+    else:
+        eh_texto = np.fromiter((isinstance(v, str) for v in unicos), dtype=bool, count=len(unicos))
+    if not eh_texto.any():
+        # sem texto não há o que limpar; map mantém a mesma inferência de dtype
+        return s.map(remover_acentos)
+
+    limpos = np.asarray(unicos, dtype=object).copy()
+    if not "".join(limpos[eh_texto]).isascii():
+        for i in np.flatnonzero(eh_texto):
+            v = limpos[i]
+            if not v.isascii():
+                limpos[i] = remover_acentos(v)
+
+    valores = s.to_numpy(dtype=object, copy=True)
+    alvo = codigos >= 0
+    alvo[alvo] = eh_texto[codigos[alvo]]
+    valores[alvo] = limpos[codigos[alvo]]
+    return pd.Series(valores, index=s.index, name=s.name, dtype=object)
+
 def normalizar_nome_coluna(col: str) -> str:
     """
     1) remove acentos
@@ -87,6 +128,112 @@ def normalizar_numeros_coluna(s: pd.Series) -> pd.Series:
     # converte
     return pd.to_numeric(st, errors="coerce")
 
+# Aceita também o prefixo de moeda ("R$ 10,00"), que normalizar_numeros_coluna já remove
+_NUM_BR_RE = re.compile(r"^\s*(?:R\$\s*)?[-+]?[\d\.\,]+(?:\s*[%])?\s*$")
+_TRADUCAO_NUM_BR = str.maketrans({"%": None, ".": None, ",": "."})
+# Em texto que casa com _NUM_BR_RE, "R" e "$" só aparecem juntos no prefixo,
+# então um único translate equivale à cadeia completa de normalizar_numeros_coluna
+_TRADUCAO_NUM_BR_CASADO = str.maketrans(
+    {**{chr(c): None for c in range(0x3001) if chr(c).isspace()},
+     "R": None, "$": None, "%": None, ".": None, ",": "."}
+)
+
+def _analisar_numeros_br(valores) -> (np.ndarray, list):
+    """
+    Uma única volta em Python sobre os valores (texto): marca quais casam com
+    _NUM_BR_RE e já devolve o texto limpo, com as mesmas regras de
+    normalizar_numeros_coluna (sem espaços, sem R$ e %, milhar removido,
+    vírgula decimal -> ponto; vazio/'nan'/'None' -> None).
+    """
+    casam = np.zeros(len(valores), dtype=bool)
+    limpos = [None] * len(valores)
+    fullmatch = _NUM_BR_RE.fullmatch
+    for i, v in enumerate(valores):
+        if fullmatch(v) is not None:
+            casam[i] = True
+            t = v.translate(_TRADUCAO_NUM_BR_CASADO)
+        else:
+            t = "".join(v.split()).replace("R$", "").translate(_TRADUCAO_NUM_BR)
+        if t not in ("", "nan", "None"):
+            limpos[i] = t
+    return casam, limpos
+
+def detectar_e_converter_numerico(s: pd.Series, min_ratio: float = 0.6, amostra: int = 256):
+    """
+    Detecta e converte uma coluna de números BR ("1.234,56", "R$ 10,00", "15%")
+    numa única passada. Retorna a Series convertida ou None se não for numérica.
+
+    1) amostra ~`amostra` linhas espaçadas: se menos da metade de min_ratio casa,
+       a coluna é rejeitada sem varrer o resto;
+    2) colunas repetitivas são fatorizadas e só os valores únicos são analisados
+       (a proporção de linhas numéricas vem das contagens); colunas quase todas
+       distintas são analisadas direto, sem o custo do factorize;
+    3) uma volta detecta e limpa cada valor; to_numeric converte tudo de uma vez.
+    A conversão dos valores é a mesma de normalizar_numeros_coluna.
+    """
+    if s.dtype != "object":
+        return None
+    total = len(s)
+    if total == 0:
+        return None
+
+    passo = max(1, total // amostra)
+    amostra_s = s.iloc[::passo].astype(str)
+    if amostra_s.str.fullmatch(_NUM_BR_RE).mean() < min_ratio / 2:
+        return None
+
+    codigos = None
+    if amostra_s.nunique() > len(amostra_s) // 2:
+        valores = s.astype(str).to_numpy(dtype=object)
+    else:
+        codigos, valores = pd.factorize(s, use_na_sentinel=True)
+        if pd.api.types.infer_dtype(valores, skipna=False) != "string":
+            # valores não-texto (1, 1.0, True...) colidem no factorize; fatoriza o texto
+            codigos, valores = pd.factorize(s.astype(str), use_na_sentinel=True)
+
+    casam, limpos = _analisar_numeros_br(valores)
+    if codigos is None:
+        numericas = casam.sum()
+    else:
+        numericas = np.bincount(codigos[codigos >= 0], minlength=len(valores))[casam].sum()
+    if numericas / total < min_ratio:
+        return None
+
+    convertidos = pd.to_numeric(pd.Series(limpos, dtype=object), errors="coerce").to_numpy()
+    if codigos is not None:
+        if (codigos < 0).any():
+            convertidos = np.append(convertidos.astype("float64"), np.nan)  # código -1 -> NaN
+        convertidos = convertidos[codigos]
+    return pd.Series(convertidos, index=s.index, name=s.name)
+
+_CHARS_ESPACO = [chr(c) for c in range(0x3001) if chr(c).isspace()]   # mesmos de str.split()
+_ESPACOS = str.maketrans(dict.fromkeys(_CHARS_ESPACO))
+# \s do RE2 (pyarrow) só pega espaço ASCII; a classe explícita cobre \xa0 etc.
+_ESPACOS_RE2 = "[" + "".join(f"\\x{{{ord(c):x}}}" for c in _CHARS_ESPACO) + "]"
+
+def converter_numero_br(s: pd.Series) -> pd.Series:
+    """
+    Conversão tipada para coluna já sabidamente numérica (schema em cache ou
+    lotes seguintes do streaming): mesma limpeza de normalizar_numeros_coluna,
+    sem detecção. Com pyarrow a limpeza roda nos kernels de string do Arrow;
+    sem ele, numa volta em Python.
+    """
+    textos = s.astype(str).to_numpy(dtype=object)
+    if _pyarrow_disponivel():
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        arr = pc.replace_substring_regex(pa.array(textos, type=pa.string()), _ESPACOS_RE2, "")
+        for antigo, novo in (("R$", ""), ("%", ""), (".", ""), (",", ".")):
+            arr = pc.replace_substring(arr, antigo, novo)
+        limpos = arr.to_numpy(zero_copy_only=False)   # "", "nan", "None" viram NaN no to_numeric
+    else:
+        limpos = []
+        for v in textos:
+            t = v.translate(_ESPACOS).replace("R$", "").translate(_TRADUCAO_NUM_BR)
+            limpos.append(t if t not in ("", "nan", "None") else None)
+    return pd.to_numeric(pd.Series(limpos, index=s.index, name=s.name, dtype=object), errors="coerce")
+
 def converter_colunas_numericas(df: pd.DataFrame) -> (pd.DataFrame, list):
     """
     Converte automaticamente colunas 'parece numerica' para float,
@@ -97,61 +244,461 @@ def converter_colunas_numericas(df: pd.DataFrame) -> (pd.DataFrame, list):
     for col in df.columns:
         if col in EXCLUIR_NUMERICAS:
             continue
-        s = df[col]
-        if s.dtype == "object" and _parece_numerico_series(s):
-            df[col] = normalizar_numeros_coluna(s)
+        convertida = detectar_e_converter_numerico(df[col])
+        if convertida is not None:
+            df[col] = convertida
             convertidas.append(col)
     return df, convertidas
 
-# ============= ETL base de teste =============
-def etl_teste(caminho_arquivo: str) -> str:
+# ============= Leitura dos relatórios =============
+def _calamine_disponivel() -> bool:
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# Leitores em ordem de preferência: nome do engine do pandas -> checagem de disponibilidade
+LEITORES_EXCEL = {
+    "calamine": _calamine_disponivel,   # Rust, bem mais rápido; pip install python-calamine
+    "openpyxl": lambda: True,           # sempre presente (fallback)
+}
+
+def escolher_leitor(preferido: str = None) -> str:
     """
-    Lê um Excel, aplica ETL base e salva no mesmo diretório com sufixo _ETL.
-    Regras:
-      - normaliza nomes de colunas SEM perder letras (nada de 'transao')
-      - remove acentos do conteúdo apenas em colunas de texto
-      - converte números no padrão BR -> float (., ,)
+    Retorna o engine usado por ler_relatorio: o `preferido` se estiver
+    disponível, senão o primeiro de LEITORES_EXCEL que estiver instalado.
     """
-    print(f"[INFO] Lendo arquivo: {caminho_arquivo}")
-    df = pd.read_excel(caminho_arquivo, engine="openpyxl")
-    print(f"[INFO] {len(df)} linhas carregadas.")
+    if preferido:
+        if preferido in LEITORES_EXCEL and LEITORES_EXCEL[preferido]():
+            return preferido
+        print(f"[WARN] Leitor '{preferido}' indisponível, escolhendo automaticamente.")
+    for nome, disponivel in LEITORES_EXCEL.items():
+        if disponivel():
+            return nome
+    return "openpyxl"
+
+def ler_relatorio(caminho_arquivo: str, skip_top: int = 0, skip_bottom: int = 0, leitor: str = None) -> pd.DataFrame:
+    """
+    Lê o relatório exportado do Codonto com o leitor mais rápido disponível.
+    `skip_top`/`skip_bottom` (do ETL_CONFIG) são aplicados na própria leitura
+    (skiprows/skipfooter), então cabeçalho extra e rodapé nunca viram linhas
+    do DataFrame. Se o calamine falhar no arquivo, tenta de novo com openpyxl.
+    """
+    engine = escolher_leitor(leitor)
+    kwargs = {"skiprows": skip_top, "skipfooter": skip_bottom}
+    try:
+        return pd.read_excel(caminho_arquivo, engine=engine, **kwargs)
+    except Exception as e:
+        if engine == "openpyxl":
+            raise
+        print(f"[WARN] Falha ao ler com {engine} ({e}); usando openpyxl.")
+        return pd.read_excel(caminho_arquivo, engine="openpyxl", **kwargs)
+
+# ============= Saída em Parquet =============
+def _pyarrow_disponivel() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+EXTENSOES_SAIDA = {"xlsx": ".xlsx", "parquet": ".parquet"}
+COMPRESSAO_PARQUET = "zstd"
 
+def caminho_saida_etl(caminho_arquivo: str, formato: str = "xlsx") -> str:
+    """`<nome>_ETL.xlsx` ou `<nome>_ETL.parquet` no mesmo diretório do arquivo."""
+    base, _ = os.path.splitext(caminho_arquivo)
+    return f"{base}_ETL{EXTENSOES_SAIDA[formato]}"
+
+def esquema_parquet(df: pd.DataFrame, inteiros: bool = True):
+    """
+    Schema pyarrow a partir da detecção do ETL: colunas numéricas viram
+    float64 (ou int64 se já forem inteiras e `inteiros`), bool fica bool,
+    datas viram timestamp e todo o resto é texto (string).
+    """
+    import pyarrow as pa
+
+    campos = []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            tipo = pa.bool_()
+        elif pd.api.types.is_integer_dtype(s) and inteiros:
+            tipo = pa.int64()
+        elif pd.api.types.is_numeric_dtype(s):
+            tipo = pa.float64()
+        elif pd.api.types.is_datetime64_any_dtype(s):
+            tipo = pa.timestamp("us")
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(col, tipo))
+    return pa.schema(campos)
+
+def _tabela_arrow(df: pd.DataFrame, esquema):
+    """
+    Converte o DataFrame no schema (que pode ter vindo de outro lote):
+    texto misto (ex.: 12 e "") ou coluna de texto que chegou numérica/toda
+    NaN vira str (nulos ficam nulos); coluna numérica que chegou como texto
+    passa por to_numeric.
+    """
+    import pyarrow as pa
+
+    df = df.copy(deep=False)
+    for campo in esquema:
+        s = df[campo.name]
+        if pa.types.is_string(campo.type):
+            if s.dtype == "object":
+                df[campo.name] = s.where(s.map(type).eq(str) | s.isna(), s.astype(str))
+            elif not pd.api.types.is_string_dtype(s):
+                df[campo.name] = s.astype(str).where(s.notna(), None)
+        elif (pa.types.is_floating(campo.type) or pa.types.is_integer(campo.type)) and s.dtype == "object":
+            df[campo.name] = pd.to_numeric(s, errors="coerce")
+    return pa.Table.from_pandas(df, schema=esquema, preserve_index=False, safe=False)
+
+def salvar_parquet(df: pd.DataFrame, caminho: str) -> str:
+    """Grava o DataFrame do ETL em Parquet tipado e comprimido."""
+    import pyarrow.parquet as pq
+
+    pq.write_table(_tabela_arrow(df, esquema_parquet(df)), caminho, compression=COMPRESSAO_PARQUET)
+    return caminho
+
+class SaidaParquetStreaming:
+    """
+    Grava lotes num Parquet com pq.ParquetWriter (um row group por lote).
+    O schema vem do primeiro lote, com numéricas sempre float64: um lote
+    seguinte pode trazer centavos numa coluna que começou inteira. Cada lote
+    é convertido nesse schema antes de gravar (`_tabela_arrow`).
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._writer = None
+        self._esquema = None
+
+    def escrever(self, df: pd.DataFrame) -> None:
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._esquema = esquema_parquet(df, inteiros=False)
+            self._writer = pq.ParquetWriter(self.caminho, self._esquema, compression=COMPRESSAO_PARQUET)
+        self._writer.write_table(_tabela_arrow(df, self._esquema))
+
+    def fechar(self) -> str:
+        if self._writer is not None:
+            self._writer.close()
+        return self.caminho
+
+def validar_parquet(caminho: str, linhas_esperadas: int = None) -> dict:
+    """
+    Confere o Parquet só pelo rodapé (sem ler os dados): nº de linhas,
+    colunas e tipos. Levanta ValueError se o nº de linhas não bater.
+    """
+    import pyarrow.parquet as pq
+
+    meta = pq.ParquetFile(caminho)
+    linhas = meta.metadata.num_rows
+    if linhas_esperadas is not None and linhas != linhas_esperadas:
+        raise ValueError(f"Parquet com {linhas} linhas, esperado {linhas_esperadas}: {caminho}")
+    return {"linhas": linhas, "colunas": {c.name: str(c.type) for c in meta.schema_arrow}}
+
+# ============= Cache de schema por relatório =============
+PASTA_ESQUEMAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "estado", "esquemas")
+
+def impressao_cabecalho(colunas) -> str:
+    """Impressão digital do cabeçalho bruto (nomes e ordem), antes de normalizar."""
+    return hashlib.sha1("\x1f".join(str(c) for c in colunas).encode("utf-8")).hexdigest()[:16]
+
+def _caminho_esquema(tabela: str) -> str:
+    return os.path.join(PASTA_ESQUEMAS, f"{normalizar_nome_coluna(tabela)}.json")
+
+def carregar_esquema(tabela: str):
+    """Schema salvo para a tabela (dict) ou None se ainda não existe."""
+    caminho = _caminho_esquema(tabela)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+def salvar_esquema(tabela: str, colunas_originais, df: pd.DataFrame) -> dict:
+    """Grava impressão do cabeçalho, nomes normalizados e dtypes finais do ETL (JSON em estado/esquemas)."""
+    esquema = {
+        "tabela": tabela,
+        "impressao": impressao_cabecalho(colunas_originais),
+        "colunas_originais": [str(c) for c in colunas_originais],
+        "nomes": list(df.columns),
+        "numericas": [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])],
+        "dtypes": {c: str(df[c].dtype) for c in df.columns},
+        "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    os.makedirs(PASTA_ESQUEMAS, exist_ok=True)
+    caminho = _caminho_esquema(tabela)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(esquema, f, ensure_ascii=False, indent=1)
+    os.replace(caminho + ".tmp", caminho)
+    return esquema
+
+def esquema_valido(tabela: str, colunas_originais):
+    """
+    Retorna o schema em cache se a impressão do cabeçalho bater; senão None.
+    Se havia schema e o layout mudou, avisa alto (colunas novas/removidas),
+    porque a tabela no BigQuery provavelmente precisa de atenção.
+    """
+    if not tabela:
+        return None
+    esquema = carregar_esquema(tabela)
+    if esquema is None:
+        return None
+    if esquema["impressao"] == impressao_cabecalho(colunas_originais):
+        return esquema
+
+    atuais = [str(c) for c in colunas_originais]
+    novas = [c for c in atuais if c not in esquema["colunas_originais"]]
+    removidas = [c for c in esquema["colunas_originais"] if c not in atuais]
+    print("[WARN] " + "!" * 70)
+    print(f"[WARN] LAYOUT DO RELATÓRIO '{tabela}' MUDOU — schema em cache descartado, refazendo inferência.")
+    print(f"[WARN]   colunas novas    : {', '.join(novas) or '-'}")
+    print(f"[WARN]   colunas removidas: {', '.join(removidas) or '-'}")
+    if not novas and not removidas:
+        print("[WARN]   (mesmas colunas em outra ordem)")
+    print("[WARN] " + "!" * 70)
+    return None
+
+# ============= ETL base de teste =============
+def _etl_lote(df: pd.DataFrame, numericas: set = None, nomes: list = None) -> (pd.DataFrame, list):
+    """
+    Etapas do ETL sobre um DataFrame (arquivo inteiro ou um lote do streaming).
+    Com `numericas` = None detecta as colunas numéricas; com o conjunto já
+    decidido (schema em cache ou lotes seguintes) pula a inferência: essas
+    colunas são convertidas direto e as demais ficam como texto.
+    `nomes` (do cache) substitui limpar_nomes_colunas.
+    """
     # 1) normaliza nomes de colunas
-    df = limpar_nomes_colunas(df)
+    if nomes is not None:
+        df.columns = nomes
+    else:
+        df = limpar_nomes_colunas(df)
 
     # 2) remove acentos APENAS de colunas texto (sem applymap deprecado)
     for col in df.columns:
         if df[col].dtype == "object":
-            df[col] = df[col].map(remover_acentos)
+            df[col] = remover_acentos_series(df[col])
 
     # 3) remove linhas completamente vazias
     df = df.dropna(how="all")
 
-    # 4) converter numéricas automaticamente (com exclusões)
-    df, cols_conv = converter_colunas_numericas(df)
-    if cols_conv:
-        print(f"[INFO] Colunas convertidas para float: {', '.join(cols_conv)}")
+    # 4) converter numéricas (inferência com exclusões, ou tipos já conhecidos)
+    if numericas is None:
+        df, convertidas = converter_colunas_numericas(df)
+        numericas = {c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])}
     else:
-        print("[INFO] Nenhuma coluna elegível para conversão numérica automática.")
+        convertidas = []
+        for col in numericas:
+            if df[col].dtype == "object":
+                df[col] = converter_numero_br(df[col])
+                convertidas.append(col)
 
-    # 5) NaN -> vazio em texto; mantém NaN em numéricas
+    # 5) NaN -> vazio em texto; mantém NaN em numéricas (útil pro BQ)
     for col in df.columns:
-        if pd.api.types.is_numeric_dtype(df[col]):
-            # mantém NaN (útil pro BQ)
-            continue
-        else:
+        if col not in numericas:
             df[col] = df[col].fillna("")
+    return df, convertidas
+
+def etl_teste(caminho_arquivo: str, skip_top: int = 0, skip_bottom: int = 0, leitor: str = None,
+              formato: str = "xlsx", tabela: str = None) -> str:
+    """
+    Lê um Excel, aplica ETL base e salva no mesmo diretório com sufixo _ETL
+    (`formato` "xlsx" ou "parquet"; o Parquet guarda os tipos detectados).
+    Regras:
+      - lê com ler_relatorio (calamine se instalado), já sem skip_top/skip_bottom
+      - normaliza nomes de colunas SEM perder letras (nada de 'transao')
+      - remove acentos do conteúdo apenas em colunas de texto
+      - converte números no padrão BR -> float (., ,)
+    Com `tabela` (ETL_CONFIG["tabela"]) usa o schema em cache quando o
+    cabeçalho é o mesmo da última execução e pula a inferência.
+    """
+    print(f"[INFO] Lendo arquivo: {caminho_arquivo}")
+    with medir("etl_leitura", tabela=tabela, bytes=os.path.getsize(caminho_arquivo)) as m:
+        df = ler_relatorio(caminho_arquivo, skip_top, skip_bottom, leitor)
+        m["linhas"] = len(df)
+    print(f"[INFO] {len(df)} linhas carregadas.")
+
+    colunas_originais = list(df.columns)
+    with medir("etl_transformacao", tabela=tabela, linhas=len(df)) as m:
+        esquema = esquema_valido(tabela, colunas_originais)
+        m["schema_cache"] = bool(esquema)
+        if esquema:
+            print(f"[INFO] Schema em cache para '{tabela}' — inferência pulada.")
+            df, cols_conv = _etl_lote(df, set(esquema["numericas"]), esquema["nomes"])
+        else:
+            df, cols_conv = _etl_lote(df)
+            if tabela:
+                salvar_esquema(tabela, colunas_originais, df)
+    if cols_conv:
+        print(f"[INFO] Colunas convertidas para float: {', '.join(cols_conv)}")
+    else:
+        print("[INFO] Nenhuma coluna elegível para conversão numérica automática.")
 
     # 6) salva no mesmo diretório com sufixo _ETL
-    diretorio = os.path.dirname(caminho_arquivo)
-    nome = os.path.basename(caminho_arquivo)
-    base, ext = os.path.splitext(nome)
-    saida = os.path.join(diretorio, f"{base}_ETL{ext}")
-    df.to_excel(saida, index=False, engine="openpyxl")
+    saida = caminho_saida_etl(caminho_arquivo, formato)
+    with medir("etl_escrita", tabela=tabela, formato=formato, linhas=len(df)) as m:
+        if formato == "parquet":
+            salvar_parquet(df, saida)
+        else:
+            df.to_excel(saida, index=False, engine="openpyxl")
+        m["bytes"] = os.path.getsize(saida)
     print(f"[OK] ETL concluído. Arquivo salvo em:\n{saida}")
     return saida
 
+# ============= ETL em streaming (memória limitada) =============
+LOTE_STREAMING = 50_000   # linhas por lote; o pico de memória acompanha este valor
+
+def _nomes_cabecalho(cabecalho: tuple) -> list:
+    """Nomes como o read_excel daria: vazio -> 'Unnamed: i', repetido -> 'nome.1'."""
+    nomes, vistos = [], {}
+    for i, c in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if c is None else c
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+def iterar_lotes_relatorio(caminho_arquivo: str, skip_top: int = 0, skip_bottom: int = 0,
+                           tamanho_lote: int = LOTE_STREAMING):
+    """
+    Lê o xlsx com openpyxl em modo read_only e devolve DataFrames de até
+    `tamanho_lote` linhas, sem nunca carregar a planilha inteira.
+    skip_top pula as linhas antes do cabeçalho; o rodapé (skip_bottom) fica
+    retido numa deque e nunca é emitido. Linhas vazias no fim da planilha são
+    ignoradas antes de contar o rodapé, como no read_excel.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        linhas = wb.active.iter_rows(values_only=True)
+        for _ in range(skip_top):
+            next(linhas, None)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = _nomes_cabecalho(cabecalho)
+        largura = len(colunas)
+
+        def _montar(lote):
+            lote = [l if len(l) == largura else (tuple(l) + (None,) * largura)[:largura] for l in lote]
+            return pd.DataFrame(lote, columns=colunas)
+
+        retidas = deque()   # rodapé candidato + linhas vazias ainda sem dono
+        lote = []
+        for linha in linhas:
+            retidas.append(linha)
+            if any(v is not None for v in linha):
+                while len(retidas) > skip_bottom:
+                    lote.append(retidas.popleft())
+            if len(lote) >= tamanho_lote:
+                yield _montar(lote)
+                lote = []
+
+        while retidas and all(v is None for v in retidas[-1]):
+            retidas.pop()
+        for _ in range(min(skip_bottom, len(retidas))):
+            retidas.pop()
+        lote.extend(retidas)
+        if lote:
+            yield _montar(lote)
+    finally:
+        wb.close()
+
+class SaidaXlsxStreaming:
+    """Grava lotes num xlsx com openpyxl write_only (as linhas vão direto pro disco)."""
+
+    def __init__(self, caminho: str):
+        from openpyxl import Workbook
+
+        self.caminho = caminho
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet()
+        self._cabecalho_gravado = False
+
+    def escrever(self, df: pd.DataFrame) -> None:
+        if not self._cabecalho_gravado:
+            self._ws.append(list(df.columns))
+            self._cabecalho_gravado = True
+        valores = df.astype(object).where(df.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            self._ws.append(linha)
+
+    def fechar(self) -> str:
+        self._wb.save(self.caminho)
+        return self.caminho
+
+def etl_teste_streaming(caminho_arquivo: str, skip_top: int = 0, skip_bottom: int = 0,
+                        tamanho_lote: int = LOTE_STREAMING, saida=None, formato: str = "xlsx",
+                        tabela: str = None) -> str:
+    """
+    Versão em lotes do etl_teste para exports grandes (ex.: backfill de A_Receber).
+    Lê com iterar_lotes_relatorio, aplica o ETL em cada lote e grava cada lote
+    na saída assim que fica pronto; o pico de memória depende de `tamanho_lote`,
+    não do tamanho do arquivo.
+    Os tipos (numérica x texto) vêm do schema em cache de `tabela` ou são
+    decididos no primeiro lote. Diferente do
+    read_excel, células de texto só com dígitos não viram int sozinhas, então
+    colunas de EXCLUIR_NUMERICAS (cpf, contrato...) mantêm zeros à esquerda.
+    `saida`: objeto com escrever(df)/fechar(); padrão SaidaXlsxStreaming ou
+    SaidaParquetStreaming (conforme `formato`) no mesmo diretório com sufixo _ETL.
+    """
+    if saida is None:
+        destino = caminho_saida_etl(caminho_arquivo, formato)
+        saida = SaidaParquetStreaming(destino) if formato == "parquet" else SaidaXlsxStreaming(destino)
+
+    print(f"[INFO] Lendo arquivo em lotes de {tamanho_lote:,}: {caminho_arquivo}")
+    numericas, nomes, total = None, None, 0
+    lotes = iterar_lotes_relatorio(caminho_arquivo, skip_top, skip_bottom, tamanho_lote)
+    while True:
+        # uma medição por lote em cada etapa; o resumo soma leitura/transformação/escrita
+        with medir("etl_leitura", tabela=tabela) as m:
+            lote = next(lotes, None)
+            m["linhas"] = 0 if lote is None else len(lote)
+        if lote is None:
+            break
+        with medir("etl_transformacao", tabela=tabela, linhas=len(lote)):
+            if numericas is None:
+                colunas_originais = list(lote.columns)
+                esquema = esquema_valido(tabela, colunas_originais)
+                if esquema:
+                    print(f"[INFO] Schema em cache para '{tabela}' — inferência pulada.")
+                    numericas, nomes = set(esquema["numericas"]), esquema["nomes"]
+                lote, convertidas = _etl_lote(lote, numericas, nomes)
+                if not esquema:
+                    numericas = {c for c in lote.columns if pd.api.types.is_numeric_dtype(lote[c])}
+                    nomes = list(lote.columns)
+                    if tabela:
+                        salvar_esquema(tabela, colunas_originais, lote)
+                if convertidas:
+                    print(f"[INFO] Colunas convertidas para float: {', '.join(convertidas)}")
+                else:
+                    print("[INFO] Nenhuma coluna elegível para conversão numérica automática.")
+            else:
+                lote, _ = _etl_lote(lote, numericas, nomes)
+        with medir("etl_escrita", tabela=tabela, formato=formato, linhas=len(lote)):
+            saida.escrever(lote)
+        total += len(lote)
+
+    with medir("etl_escrita", tabela=tabela, formato=formato) as m:
+        destino = saida.fechar()
+        m["bytes"] = os.path.getsize(destino)
+    print(f"[OK] ETL em streaming concluído ({total} linhas). Arquivo salvo em:\n{destino}")
+    return destino
+
 # ============= Execução interativa =============
 if __name__ == "__main__":
-    caminho = r"C:\Users\OdontoClean\Downloads\ControleODONTO Fluxo de Caixa (28).xlsx"
-    etl_teste(caminho)
+    # python teste/teste_etl.py <arquivo.xlsx> [skip_top] [skip_bottom]
+    if len(sys.argv) > 1:
+        caminho = sys.argv[1]
+    else:
+        caminho = input("Caminho do relatório (.xlsx): ").strip().strip('"')
+    etl_teste(caminho, *(int(a) for a in sys.argv[2:4]))
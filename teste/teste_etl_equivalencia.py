@@ -0,0 +1,205 @@
+"""
+TESTE — Equivalência das otimizações do ETL
+-------------------------------------------
+Confere, em fixtures fixas, que as versões rápidas do teste_etl.py dão o mesmo
+resultado das implementações originais (célula a célula / em memória).
+Não acessa a rede nem o navegador.
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# === Corrige o path para importar de automacoes_codonto ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+import teste_etl
+from benchmark_etl import gravar_relatorio_xlsx
+from teste_etl import (
+    EXCLUIR_NUMERICAS,
+    SaidaParquetStreaming,
+    _parece_numerico_series,
+    converter_colunas_numericas,
+    converter_numero_br,
+    detectar_e_converter_numerico,
+    esquema_valido,
+    etl_teste,
+    etl_teste_streaming,
+    impressao_cabecalho,
+    normalizar_numeros_coluna,
+    remover_acentos,
+    remover_acentos_series,
+)
+from functions import log
+
+
+# ============= Remoção de acentos =============
+COLUNAS_ACENTOS = {
+    "misturada": ["José", "Conceição", None, np.nan, 12, 3.5, "ASCII", "", "Ação", "José", True, 1, 1.0],
+    "decomposta": ["é", "ﬁcha", "straße", "Brandão 🦷", "São Paulo", "é"],
+    "so_ascii": ["Pix", "Boleto", "Pix", None],
+    "so_nulos": [None, np.nan, None],
+    "inteiros": [1, 2, 3],
+    "reais": [1.5, np.nan, 2.0],
+}
+
+
+def testar_remover_acentos() -> None:
+    for nome, valores in COLUNAS_ACENTOS.items():
+        s = pd.Series(valores, name=nome, index=range(10, 10 + len(valores)))
+        esperado = s.map(remover_acentos)
+        obtido = remover_acentos_series(s)
+        pd.testing.assert_series_equal(obtido, esperado)
+        for a, b in zip(obtido, esperado):
+            assert type(a) is type(b), (nome, a, b)
+    log("✅ remover_acentos_series == map(remover_acentos), inclusive NaN e não-texto", "OK")
+
+
+# ============= Números no padrão BR =============
+def _colunas_numeros() -> dict:
+    rng = np.random.default_rng(0)
+    distintos = [f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for v in rng.uniform(-1e6, 1e6, 600)]
+    return {
+        "valores": ["1.234,56", "-1.234", "", "texto", "0,5", " 12 ", "15%", "1.000.000,00", None, np.nan],
+        "repetitiva": (["1.234,56", "10,00", "", "-3"] * 150) + ["abc"] * 40,
+        "distinta": distintos,
+        "poucos_numeros": ["12", "Pix", "Boleto", "Dinheiro", "Pix", "3,5"],
+        "nao_texto": [1, 2.5, None, "3,5", True],
+        "texto": ["Pix", "Boleto", "Dinheiro", None],
+    }
+
+
+def _detectar_original(s: pd.Series):
+    return normalizar_numeros_coluna(s) if _parece_numerico_series(s) else None
+
+
+def testar_numeros_br() -> None:
+    for nome, valores in _colunas_numeros().items():
+        s = pd.Series(valores, name=nome, dtype=object, index=range(5, 5 + len(valores)))
+        esperado, obtido = _detectar_original(s), detectar_e_converter_numerico(s)
+        assert (esperado is None) == (obtido is None), (nome, esperado, obtido)
+        if esperado is not None:
+            pd.testing.assert_series_equal(obtido.astype("float64"), esperado.astype("float64"))
+        pd.testing.assert_series_equal(converter_numero_br(s).astype("float64"),
+                                       normalizar_numeros_coluna(s).astype("float64"))
+
+    convertidos = converter_numero_br(pd.Series(["1.234,56", "-1.234", "", "texto"]))
+    assert convertidos.iloc[0] == 1234.56 and convertidos.iloc[1] == -1234.0, convertidos
+    assert convertidos.iloc[2:].isna().all(), convertidos
+
+    df = pd.DataFrame({
+        "cpf": ["123.456.789-01", "98765432100", "111.222.333-44"],
+        "contrato": ["00123", "00456", "1.234"],
+        "valor": ["1.234,56", "-1.234", ""],
+    })
+    assert {"cpf", "contrato"} <= EXCLUIR_NUMERICAS
+    original = df.copy()
+    df, convertidas = converter_colunas_numericas(df)
+    assert convertidas == ["valor"], convertidas
+    pd.testing.assert_frame_equal(df[["cpf", "contrato"]], original[["cpf", "contrato"]])
+    assert df["valor"].iloc[0] == 1234.56 and np.isnan(df["valor"].iloc[2]), df
+    log("✅ Conversão de números BR igual à original; colunas de EXCLUIR_NUMERICAS intactas", "OK")
+
+
+# ============= ETL em streaming x ETL em memória =============
+LINHAS_STREAMING = 23
+LOTES_STREAMING = (1, 2, 5, 7, 11, 22, 23, 100)   # rodapé caindo dentro, na borda e fora de um lote
+
+
+def _planilha_streaming() -> pd.DataFrame:
+    n = LINHAS_STREAMING
+    return pd.DataFrame({
+        "Data Pagamento": [f"{1 + i % 28:02d}/10/2025" for i in range(n)],
+        "Paciente": [["José Araújo", "Conceição Sá", "Ana Lima"][i % 3] for i in range(n)],
+        "Forma de Pagamento": [["Cartão de Crédito", "Pix", None][i % 3] for i in range(n)],
+        "Valor Recebido": [f"{(i + 1) * 1234.5:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                           for i in range(n)],
+        "Observação": ["" if i % 4 else "Manutenção" for i in range(n)],
+    })
+
+
+def testar_streaming_igual_ao_etl() -> None:
+    pasta = tempfile.mkdtemp(prefix="etl_stream_")
+    for skip_top, skip_bottom in ((0, 2), (2, 2), (2, 0)):
+        relatorio = gravar_relatorio_xlsx(_planilha_streaming(), os.path.join(pasta, f"rel_{skip_top}{skip_bottom}.xlsx"),
+                                          skip_top, skip_bottom)
+        esperado = pd.read_parquet(etl_teste(relatorio, skip_top, skip_bottom, formato="parquet"))
+        assert len(esperado) == LINHAS_STREAMING, esperado
+        for tamanho in LOTES_STREAMING:
+            destino = os.path.join(pasta, f"stream_{skip_top}{skip_bottom}_{tamanho}.parquet")
+            etl_teste_streaming(relatorio, skip_top, skip_bottom, tamanho_lote=tamanho,
+                                saida=SaidaParquetStreaming(destino))
+            pd.testing.assert_frame_equal(pd.read_parquet(destino), esperado, check_dtype=False)
+    log("✅ ETL em streaming == ETL em memória (skip_top/skip_bottom, lotes de vários tamanhos)", "OK")
+
+
+# ============= Cache de schema =============
+def testar_cache_de_schema() -> None:
+    pasta = tempfile.mkdtemp(prefix="etl_schema_")
+    teste_etl.PASTA_ESQUEMAS = os.path.join(pasta, "esquemas")
+    tabela = "Recebidos_Teste"
+
+    def etl(df: pd.DataFrame, nome: str, tabela_cache=None, streaming: bool = False) -> pd.DataFrame:
+        relatorio = gravar_relatorio_xlsx(df, os.path.join(pasta, f"{nome}.xlsx"), 0, 2)
+        if streaming:
+            destino = os.path.join(pasta, f"{nome}_stream.parquet")
+            etl_teste_streaming(relatorio, 0, 2, tamanho_lote=5, saida=SaidaParquetStreaming(destino), tabela=tabela_cache)
+            return pd.read_parquet(destino)
+        return pd.read_parquet(etl_teste(relatorio, 0, 2, formato="parquet", tabela=tabela_cache))
+
+    original = _planilha_streaming()
+    base = etl(original, "base")
+
+    # 1ª execução grava o schema; a 2ª usa o cache e dá o mesmo resultado
+    pd.testing.assert_frame_equal(etl(original, "cache_1", tabela), base)
+    assert esquema_valido(tabela, list(original.columns)) is not None
+    pd.testing.assert_frame_equal(etl(original, "cache_2", tabela), base, check_dtype=False)
+
+    # Layout mudou (coluna nova / ordem trocada): cache descartado, inferência completa
+    mudancas = {
+        "coluna_nova": original.assign(**{"Valor Devido": ["1.000,00", "2,50", ""] * 7 + ["3", "4"]}),
+        "ordem_trocada": original[list(reversed(original.columns))],
+    }
+    for nome, df in mudancas.items():
+        for streaming in (False, True):
+            teste_etl.salvar_esquema(tabela, list(original.columns), base)   # cache do layout antigo
+            assert esquema_valido(tabela, list(df.columns)) is None, nome
+            esperado = etl(df, f"{nome}_sem_cache", streaming=streaming)
+            obtido = etl(df, f"{nome}_com_cache", tabela, streaming=streaming)
+            pd.testing.assert_frame_equal(obtido, esperado)
+            assert "valor_devido" not in esperado or pd.api.types.is_float_dtype(obtido["valor_devido"]), obtido.dtypes
+            assert teste_etl.carregar_esquema(tabela)["impressao"] == impressao_cabecalho(df.columns), nome
+    log("✅ Schema em cache reaproveitado; layout diferente cai na inferência completa", "OK")
+
+
+# ============= Saída Parquet em lotes =============
+def testar_parquet_streaming_tipos() -> None:
+    destino = os.path.join(tempfile.mkdtemp(prefix="etl_parquet_"), "lotes.parquet")
+    saida = SaidaParquetStreaming(destino)
+    saida.escrever(pd.DataFrame({"paciente": ["Jose", "Ana"], "contrato": ["00123", ""], "valor": [1.0, 2.5]}))
+    # 2º lote: texto todo nulo (float64), texto que chegou numérico, numérica como texto/None
+    saida.escrever(pd.DataFrame({"paciente": [np.nan, np.nan], "contrato": [456, 789], "valor": [None, "3.5"]}))
+    saida.escrever(pd.DataFrame({"paciente": ["Sa", None], "contrato": [1.5, np.nan], "valor": [4, 5]}))
+    saida.fechar()
+
+    df = pd.read_parquet(destino)
+    assert df["paciente"].tolist() == ["Jose", "Ana", None, None, "Sa", None], df
+    assert df["contrato"].tolist() == ["00123", "", "456", "789", "1.5", None], df
+    assert df["valor"].tolist()[:2] == [1.0, 2.5] and np.isnan(df["valor"].iloc[2]), df
+    assert df["valor"].tolist()[3:] == [3.5, 4.0, 5.0], df
+    log("✅ Lotes com tipos diferentes do 1º são convertidos no schema do Parquet", "OK")
+
+
+# ==========================================================
+# Execução direta
+# ==========================================================
+if __name__ == "__main__":
+    testar_remover_acentos()
+    testar_numeros_br()
+    testar_streaming_igual_ao_etl()
+    testar_cache_de_schema()
+    testar_parquet_streaming_tipos()
@@ -0,0 +1,110 @@
+"""
+TESTE — Exportação direta via HTTP
+----------------------------------
+Sobe um servidor local que imita o endpoint de exportação do Codonto:
+com o cookie de sessão devolve o xlsx (filtrado pelas datas), sem o
+cookie devolve a página de login em HTML. Não abre navegador.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# === Corrige o path para importar de automacoes_codonto ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.append(ROOT_DIR)
+
+import pandas as pd
+
+from functions import criar_sessao_http, baixar_relatorio_http, ErroSessaoHttp, log
+
+COOKIE_SESSAO = {"name": "ASP.NET_SessionId", "value": "sessao-teste", "domain": "127.0.0.1", "path": "/"}
+NOME_ARQUIVO = "ControleODONTO - Títulos a Receber.xlsx"
+
+
+class _ServidorCodonto(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        logado = "sessao-teste" in (self.headers.get("Cookie") or "")
+
+        if url.path not in ("/exportar", "/truncado") or not logado:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            self.wfile.write(b"<html><input id='login'></html>")
+            return
+
+        params = parse_qs(url.query)
+        buffer = io.BytesIO()
+        pd.DataFrame({
+            "Vencimento": [params["DataInicio"][0], params["DataTermino"][0]],
+            "Valor Devido": ["1.000,00", "2.500,50"],
+        }).to_excel(buffer, index=False)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        self.send_header("Content-Disposition", f'attachment; filename="{NOME_ARQUIVO}"')
+        if url.path == "/truncado":
+            # conexão cai no meio do arquivo
+            self.send_header("Content-Length", str(len(buffer.getvalue())))
+            self.end_headers()
+            self.wfile.write(buffer.getvalue()[:100])
+            self.close_connection = True
+            return
+        self.end_headers()
+        self.wfile.write(buffer.getvalue())
+
+    def log_message(self, *args):
+        pass
+
+
+def testar_export_http() -> None:
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ServidorCodonto)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    export_conf = {
+        "url": f"http://127.0.0.1:{servidor.server_address[1]}/exportar",
+        "params": {"DataInicio": "{data_inicio}", "DataTermino": "{data_fim}"},
+    }
+    pasta = tempfile.mkdtemp(prefix="http_")
+
+    try:
+        # 1️⃣ Sessão válida → xlsx gravado com o nome do Content-Disposition
+        sessao = criar_sessao_http([COOKIE_SESSAO])
+        caminho = baixar_relatorio_http(sessao, export_conf, "01/10/2025", "31/10/2025", pasta, "A_Receber")
+        assert os.path.basename(caminho) == NOME_ARQUIVO, caminho
+        df = pd.read_excel(caminho)
+        assert list(df["Vencimento"]) == ["01/10/2025", "31/10/2025"], df
+        log(f"✅ Exportação HTTP OK: {caminho}", "OK")
+
+        # 2️⃣ Sem cookie → página de login → ErroSessaoHttp
+        try:
+            baixar_relatorio_http(criar_sessao_http(), export_conf, "01/10/2025", "31/10/2025", pasta, "A_Receber")
+            raise AssertionError("Sessão sem cookie deveria falhar")
+        except ErroSessaoHttp:
+            log("✅ Sessão expirada detectada corretamente", "OK")
+
+        # 3️⃣ Conexão cai no meio do download → erro e nenhum .part sobrando
+        pasta_truncado = tempfile.mkdtemp(prefix="http_")
+        try:
+            baixar_relatorio_http(sessao, {**export_conf, "url": export_conf["url"].replace("/exportar", "/truncado")},
+                                  "01/10/2025", "31/10/2025", pasta_truncado, "A_Receber")
+            raise AssertionError("Download truncado deveria falhar")
+        except AssertionError:
+            raise
+        except Exception:
+            assert os.listdir(pasta_truncado) == [], os.listdir(pasta_truncado)
+            log("✅ Download interrompido não deixa .part na pasta", "OK")
+    finally:
+        servidor.shutdown()
+
+
+# ==========================================================
+# Execução direta
+# ==========================================================
+if __name__ == "__main__":
+    testar_export_http()
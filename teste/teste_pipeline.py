@@ -0,0 +1,95 @@
+"""
+TESTE — Pipeline download → ETL → upload
+----------------------------------------
+Troca as etapas de `executar_pipeline` por versões falsas (sem navegador, ETL
+ou BigQuery) e confere que uma falha na limpeza de uma tarefa não derruba o
+worker: as demais tarefas terminam, a que falhou fica como False e o
+pipeline não trava nas filas limitadas. Confere também que um download sem
+arquivo conta como falha (e não como "pulado").
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+# === Corrige o path para importar de automacoes_codonto ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.append(ROOT_DIR)
+
+import functions
+from functions import executar_automacao, executar_pipeline, log
+
+TIMEOUT_PIPELINE_S = 20
+
+
+def _download_falso(tarefa, usuario, senha, pool=None, forcar=False) -> None:
+    caminho = os.path.join(tarefa["pasta_download"], "relatorio.xlsx")
+    open(caminho, "wb").close()
+    tarefa["caminho_arquivo"] = caminho
+
+
+def _limpeza_que_falha(limpar_original):
+    def limpar(tarefa: dict) -> None:
+        if tarefa["nome"].startswith("Quebra"):
+            raise OSError(f"pasta removida: {tarefa['pasta_download']}")
+        limpar_original(tarefa)
+    return limpar
+
+
+def testar_falha_na_limpeza() -> None:
+    originais = (functions._etapa_download, functions._etapa_etl, functions._etapa_upload, functions._limpar_tarefa)
+    functions._etapa_download = _download_falso
+    functions._etapa_etl = lambda tarefa: None
+    functions._etapa_upload = lambda tarefa, lote_upload=None: None
+    functions._limpar_tarefa = _limpeza_que_falha(originais[3])
+
+    inicio, fim = datetime(2025, 10, 1), datetime(2025, 10, 31)
+    nomes = ["Quebra1", "Recebidos", "Quebra2", "A_Receber", "Quebra3", "Contratos"]
+    tarefas = [(nome, None, {}, inicio, fim) for nome in nomes]
+    saida = {}
+    try:
+        execucao = threading.Thread(
+            target=lambda: saida.update(executar_pipeline(
+                tarefas, "u", "s", tempfile.mkdtemp(prefix="pipeline_"),
+                workers={"download": 2, "etl": 1, "upload": 1}, fila_max=1, incremental=False,
+            )),
+            daemon=True,
+        )
+        execucao.start()
+        execucao.join(TIMEOUT_PIPELINE_S)
+        assert not execucao.is_alive(), "pipeline travou após falha na limpeza"
+    finally:
+        (functions._etapa_download, functions._etapa_etl,
+         functions._etapa_upload, functions._limpar_tarefa) = originais
+
+    assert len(saida) == len(nomes), saida
+    for chave, sucesso in saida.items():
+        assert sucesso == (not chave.startswith("Quebra")), (chave, sucesso)
+    log("✅ Falha na limpeza marca a tarefa como False e o pipeline segue", "OK")
+
+
+def testar_download_sem_arquivo() -> None:
+    inicio, fim = datetime(2025, 10, 1), datetime(2025, 10, 31)
+    automacoes = {
+        "SemCaminho": lambda *args, **kwargs: None,
+        "CaminhoInexistente": lambda *args, **kwargs: "/tmp/nao_existe/relatorio.xlsx",
+    }
+    for nome, func_exec in automacoes.items():
+        pasta = tempfile.mkdtemp(prefix="download_")
+        assert executar_automacao(nome, func_exec, {}, "u", "s", inicio, fim, pasta, incremental=False) is False, nome
+
+    saida = executar_pipeline([(nome, func_exec, {}, inicio, fim) for nome, func_exec in automacoes.items()],
+                              "u", "s", tempfile.mkdtemp(prefix="pipeline_"), incremental=False)
+    assert saida and not any(saida.values()), saida
+    log("✅ Download sem arquivo conta como falha (sequencial e pipeline)", "OK")
+
+
+# ==========================================================
+# Execução direta
+# ==========================================================
+if __name__ == "__main__":
+    testar_falha_na_limpeza()
+    testar_download_sem_arquivo()
@@ -0,0 +1,138 @@
+"""
+TESTE — Upload BigQuery via staging + MERGE
+-------------------------------------------
+Usa um cliente falso no lugar do google-cloud-bigquery (mesmos métodos:
+get_table / load_table_from_dataframe / query) e confere o staging, o SQL
+gerado e o agrupamento de vários relatórios num único job. Não acessa a rede.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+from types import SimpleNamespace
+
+# === Corrige o path para importar de automacoes_codonto ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.append(ROOT_DIR)
+
+import pandas as pd
+
+from functions import carregar_merge_bigquery, LoteUploadBigQuery, log
+
+
+class NotFound(Exception):
+    """Mesmo nome da exceção do google.api_core para tabela inexistente."""
+
+
+class _JobFalso:
+    def __init__(self, erro: Exception = None):
+        self.job_id = "job_falso"
+        self._erro = erro
+
+    def result(self):
+        if self._erro:
+            raise self._erro
+        return self
+
+
+class ClienteBigQueryFalso:
+    """Registra stagings e scripts; `tabelas` = {ref: {coluna: tipo}} já existentes."""
+
+    def __init__(self, tabelas: dict = None, falhar_query: bool = False):
+        self.tabelas = tabelas or {}
+        self.falhar_query = falhar_query
+        self.stagings = {}
+        self.queries = []
+
+    def get_table(self, ref):
+        if ref not in self.tabelas:
+            raise NotFound(ref)
+        schema = [SimpleNamespace(name=n, field_type=t) for n, t in self.tabelas[ref].items()]
+        return SimpleNamespace(schema=schema)
+
+    def load_table_from_dataframe(self, df, ref):
+        self.stagings[ref] = df.copy()
+        return _JobFalso()
+
+    def query(self, sql):
+        self.queries.append(sql)
+        falhar = self.falhar_query and not sql.startswith("DROP")
+        return _JobFalso(RuntimeError("Syntax error (falso)") if falhar else None)
+
+
+def _conf(tabela: str, periodo_coluna: str) -> dict:
+    return {
+        "projeto": "projeto-teste",
+        "dataset": "Dados_Teste",
+        "tabela": tabela,
+        "periodo_coluna": periodo_coluna,
+        "coluna_validacao": "valor",
+        "chaves_particao": ["forma_de_pagamento"],
+    }
+
+
+def _artefato(pasta: str, nome: str, coluna_data: str) -> str:
+    caminho = os.path.join(pasta, f"{nome}_ETL.parquet")
+    pd.DataFrame({
+        coluna_data: ["01/10/2025", "15/10/2025", ""],
+        "forma_de_pagamento": ["Pix", "Dinheiro", "Pix"],
+        "valor": [10.5, 20.0, None],
+    }).to_parquet(caminho)
+    return caminho
+
+
+def testar_upload_bigquery() -> None:
+    pasta = tempfile.mkdtemp(prefix="bq_")
+    inicio, fim = datetime(2025, 10, 1), datetime(2025, 10, 31)
+    recebidos, a_receber = _conf("Recebidos", "data"), _conf("A_Receber", "vencimento")
+
+    # 1️⃣ Tabela nova: staging com DATE, CREATE particionado e MERGE num job só
+    cliente = ClienteBigQueryFalso()
+    resp = carregar_merge_bigquery(recebidos, _artefato(pasta, "recebidos", "data"), inicio, fim, cliente=cliente)
+    assert resp["sucesso"] and resp["linhas"] == 3, resp
+    assert len(cliente.queries) == 1, cliente.queries
+    staging = next(iter(cliente.stagings.values()))
+    assert staging["data"].tolist()[:2] == [date(2025, 10, 1), date(2025, 10, 15)], staging
+    script = cliente.queries[0]
+    assert "PARTITION BY `data`" in script and "CLUSTER BY `forma_de_pagamento`" in script, script
+    assert script.index("CREATE TABLE") < script.index("BEGIN TRANSACTION"), script
+    assert "ON FALSE" in script and "T.`data` BETWEEN DATE '2025-10-01' AND DATE '2025-10-31' THEN DELETE" in script
+    log("✅ Tabela nova: staging + CREATE + MERGE em um job", "OK")
+
+    # 2️⃣ Lote com dois relatórios: um job, período em texto na tabela existente
+    cliente = ClienteBigQueryFalso(tabelas={
+        "projeto-teste.Dados_Teste.A_Receber": {"vencimento": "STRING", "forma_de_pagamento": "STRING", "valor": "FLOAT"},
+    })
+    confirmados = []
+    lote = LoteUploadBigQuery(cliente)
+    assert lote.adicionar(recebidos, _artefato(pasta, "recebidos", "data"), inicio, fim,
+                          lambda r: confirmados.append("Recebidos"))
+    assert lote.adicionar(a_receber, _artefato(pasta, "a_receber", "vencimento"), inicio, fim,
+                          lambda r: confirmados.append("A_Receber"))
+    assert not cliente.queries and not confirmados, "MERGE só deve rodar no executar()"
+    resp = lote.executar()
+    assert resp["sucesso"] and len(cliente.queries) == 1, cliente.queries
+    script = cliente.queries[0]
+    assert script.count("MERGE `") == 2 and script.count("CREATE TABLE") == 1, script
+    assert "SAFE.PARSE_DATE('%d/%m/%Y', T.`vencimento`)" in script, script
+    assert sorted(confirmados) == ["A_Receber", "Recebidos"], confirmados
+    log("✅ Lote: dois relatórios, um job de MERGE, callbacks após o commit", "OK")
+
+    # 3️⃣ Falha no MERGE: sem callbacks e stagings removidos
+    cliente = ClienteBigQueryFalso(falhar_query=True)
+    confirmados = []
+    lote = LoteUploadBigQuery(cliente)
+    lote.adicionar(recebidos, _artefato(pasta, "recebidos", "data"), inicio, fim, lambda r: confirmados.append(r))
+    resp = lote.executar()
+    assert not resp["sucesso"] and not confirmados, resp
+    assert any(q.startswith("DROP TABLE IF EXISTS `projeto-teste.Dados_Teste._stg_Recebidos_") for q in cliente.queries)
+    log("✅ Falha no MERGE não confirma o upload e limpa o staging", "OK")
+
+
+# ==========================================================
+# Execução direta
+# ==========================================================
+if __name__ == "__main__":
+    testar_upload_bigquery()
@@ -0,0 +1,118 @@
+"""
+TESTE — Watermark incremental
+-----------------------------
+Usa um estado/ temporário (SQLite) e confere quando o watermark avança:
+só com upload verificado, e blocos que terminam fora de ordem entram no
+watermark quando o buraco anterior é preenchido.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# === Corrige o path para importar de automacoes_codonto ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.append(ROOT_DIR)
+
+import functions
+from functions import (
+    _confirmar_upload,
+    _nova_tarefa,
+    _upload_verificado,
+    arquivo_inalterado,
+    obter_watermark,
+    registrar_carga_incremental,
+    log,
+)
+
+CONF = {"tabela": "Recebidos_Teste", "periodo_coluna": "data", "incremental": True}
+OK = {"sucesso": True, "linhas": 10}
+
+
+def testar_upload_verificado() -> None:
+    assert _upload_verificado({"sucesso": True})
+    assert _upload_verificado({"status": "OK"})
+    assert _upload_verificado({"linhas": 10})
+    assert _upload_verificado({"linhas": 10, "linhas_carregadas": 10})
+    for resp in ({"linhas": 0}, {"original_path": "/tmp/x.xlsx"}, {"linhas": 10, "linhas_carregadas": 7},
+                 {"linhas": 10, "erro": "falhou"}, {"linhas": True}, {"sucesso": False, "linhas": 10}, {}, None):
+        assert not _upload_verificado(resp), resp
+    log("✅ Upload só é verificado com flag de sucesso ou linhas > 0", "OK")
+
+
+def testar_resposta_real_do_etl() -> None:
+    """Resposta no formato de `rodar_etl_generico`: só os caminhos, sem flag nem linhas."""
+    pasta = tempfile.mkdtemp(prefix="etl_resp_")
+    resp = {}
+    for chave, nome in (("original_path", "relatorio.xlsx"), ("arquivo_final", "tratado.xlsx"),
+                        ("csv_path", "tratado.csv")):
+        resp[chave] = os.path.join(pasta, nome)
+        open(resp[chave], "wb").close()
+    assert _upload_verificado(resp)
+    assert not _upload_verificado({"original_path": resp["original_path"]})
+    assert not _upload_verificado({**resp, "erro": "falhou"})
+
+    conf = {"tabela": "Resposta_Real", "periodo_coluna": "data", "incremental": True, "lookback_dias": 7}
+    pedido = (datetime(2025, 5, 1), datetime(2025, 5, 31))
+    tarefa = _nova_tarefa("Resposta_Real", None, conf, *pedido, pasta)
+    tarefa.update(sha256="hash-real", tamanho=1)
+    _confirmar_upload(tarefa, resp)
+    assert obter_watermark("Resposta_Real", "data") == datetime(2025, 5, 31)
+    assert arquivo_inalterado("Resposta_Real", *pedido, "hash-real")
+
+    tarefa = _nova_tarefa("Resposta_Real", None, conf, *pedido, pasta)
+    assert tarefa["data_inicio"] == datetime(2025, 5, 24), tarefa
+    log("✅ Resposta real do ETL (caminhos dos arquivos) avança watermark e manifesto", "OK")
+
+
+def testar_blocos_fora_de_ordem() -> None:
+    d = lambda dia, mes: datetime(2025, mes, dia)
+    registrar_carga_incremental(CONF, d(1, 1), d(31, 1), OK)
+    assert obter_watermark("Recebidos_Teste", "data") == d(31, 1)
+
+    # Março e abril terminam antes de fevereiro: watermark parado em janeiro
+    registrar_carga_incremental(CONF, d(1, 4), d(30, 4), OK)
+    registrar_carga_incremental(CONF, d(1, 3), d(31, 3), OK)
+    assert obter_watermark("Recebidos_Teste", "data") == d(31, 1)
+
+    # Upload não verificado não conta
+    registrar_carga_incremental(CONF, d(1, 2), d(28, 2), {"original_path": "/tmp/x.xlsx"})
+    assert obter_watermark("Recebidos_Teste", "data") == d(31, 1)
+
+    # Fevereiro chega: emenda março e abril de uma vez
+    registrar_carga_incremental(CONF, d(1, 2), d(28, 2), OK)
+    assert obter_watermark("Recebidos_Teste", "data") == d(30, 4)
+    log("✅ Blocos fora de ordem entram no watermark quando o buraco é preenchido", "OK")
+
+
+def testar_manifesto_periodo_pedido() -> None:
+    conf = {"tabela": "Manifesto_Teste", "periodo_coluna": "data", "incremental": True}
+    pedido = (datetime(2025, 1, 1), datetime(2025, 3, 31))
+
+    # 1ª carga: período inteiro; watermark avança até o fim do pedido
+    tarefa = _nova_tarefa("Manifesto_Teste", None, conf, *pedido, "/tmp")
+    tarefa.update(sha256="abc", tamanho=10)
+    _confirmar_upload(tarefa, OK)
+
+    # 2ª execução com o mesmo pedido: o período é estreitado, mas o manifesto
+    # continua achando o hash do último arquivo carregado
+    tarefa = _nova_tarefa("Manifesto_Teste", None, conf, *pedido, "/tmp")
+    assert (tarefa["data_inicio"], tarefa["data_fim"]) != pedido, tarefa
+    assert tarefa["periodo_pedido"] == pedido
+    assert arquivo_inalterado("Manifesto_Teste", *tarefa["periodo_pedido"], "abc")
+    assert not arquivo_inalterado("Manifesto_Teste", *tarefa["periodo_pedido"], "outro")
+    log("✅ Manifesto usa o período pedido, antes do estreitamento incremental", "OK")
+
+
+# ==========================================================
+# Execução direta
+# ==========================================================
+if __name__ == "__main__":
+    pasta_estado = tempfile.mkdtemp(prefix="estado_")
+    functions.get_estado_dir = lambda: pasta_estado
+    testar_upload_verificado()
+    testar_resposta_real_do_etl()
+    testar_blocos_fora_de_ordem()
+    testar_manifesto_periodo_pedido()